@@ -0,0 +1,81 @@
+'''
+This script compares ways of decoding Linear project responses on synthetic payloads: parsing JSON into dicts and
+building models from them, against validating the parsed JSON with a TypeAdapter, and against validating the raw bytes
+with it, for detailed pages and summary lists. The clients validate detailed pages from the bytes and summary lists from
+the parsed JSON; the speedup column is for the path the clients use.
+Usage: python3 benchmarks/decoding.py [--projects 20 250 1000] [--iterations 50]
+'''
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('PROJECT_PATH', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.fakes import Dataset
+from models.linear import Project
+from tools.linear.transport import response_type
+from tools.linear.service import PROJECTS_DATA, PROJECT_SUMMARIES_DATA
+
+SUMMARY_FIELDS = ["id", "name", "description", "state", "targetDate"]
+
+def page(nodes: list[dict]) -> bytes:
+    return json.dumps({"data": {"projects": {"nodes": nodes, "pageInfo": {"hasNextPage": False, "endCursor": None}}}}).encode()
+
+# The decoding the clients did before: JSON into dicts, then a Project per node
+def decode_dicts(content: bytes) -> list:
+    json_response = json.loads(content)
+    return [Project(**project) for project in json_response['data']['projects']['nodes']]
+
+# Median time of a single decode. Every decode starts from a collected heap, as a client decodes one page at a time
+# and keeps the models, rather than decoding the same page in a tight loop.
+def measure(fn, content: bytes, iterations: int) -> float:
+    durations = []
+    for _ in range(iterations):
+        gc.collect()
+        start = time.perf_counter()
+        fn(content)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+# Peak memory allocated while decoding, including the temporary objects
+def peak_memory(fn, content: bytes) -> int:
+    gc.collect()
+    tracemalloc.start()
+    fn(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark decoding of Linear project responses.")
+    parser.add_argument("--projects", type=int, nargs="+", default=[20, 250, 1000], help="Projects per payload")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    details_type, summaries_type = response_type(PROJECTS_DATA, from_bytes=True), response_type(PROJECT_SUMMARIES_DATA)
+    print(f"{'payload':<20} {'size (KB)':>10} {'dicts (ms)':>11} {'typed (ms)':>11} {'bytes (ms)':>11} {'speedup':>8} "
+          f"{'dicts peak (MB)':>16} {'typed peak (MB)':>16} {'bytes peak (MB)':>16}")
+    for project_count in args.projects:
+        projects = Dataset(project_count).projects
+        cases = [
+            ("details", page(projects), details_type),
+            ("summaries", page([{field: project[field] for field in SUMMARY_FIELDS} for project in projects]), summaries_type),
+        ]
+        for name, content, decoding in cases:
+            decoders = [
+                decode_dicts,
+                lambda content: decoding.adapter.validate_python(json.loads(content)).data['projects'].nodes,
+                lambda content: decoding.adapter.validate_json(content).data['projects'].nodes,
+            ]
+            seconds = [measure(decode, content, args.iterations) for decode in decoders]
+            peaks = [peak_memory(decode, content) for decode in decoders]
+            client_seconds = seconds[2] if decoding.from_bytes else seconds[1]
+            print(f"{f'{name} x {project_count}':<20} {len(content) / 1024:>10.1f} "
+                  + " ".join(f"{duration * 1000:>11.3f}" for duration in seconds)
+                  + f" {seconds[0] / client_seconds:>7.2f}x "
+                  + " ".join(f"{peak / 2**20:>16.2f}" for peak in peaks))
@@ -0,0 +1,365 @@
+'''
+Local stand-ins for the Linear GraphQL API, the Slack Web API and an OpenAI-compatible chat completions API, for
+benchmarking without touching production services. Every server sleeps for a configurable latency plus jitter before
+answering, and counts the calls it receives per operation.
+'''
+import re
+import json
+import time
+import uuid
+import random
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+EPD_TEAMS = ["Engineering", "Product", "Design"]
+OTHER_TEAMS = ["Support", "Sales", "Marketing", "Operations", "Finance"]
+TICKET_STATES = ["Backlog", "Todo", "In Progress", "In Review", "Done", "Canceled"]
+LABELS = ["Bug", "Feature", "Improvement"]
+PROJECT_STATES = ["started", "started", "started", "planned", "completed", "backlog"]
+
+UPDATE_SNIPPETS = [
+    "We shipped the first milestone to beta customers and feedback has been positive.",
+    "The integration with the billing service is taking longer than planned, the API contract changed twice.",
+    "We are blocked on a design review for the onboarding flow, and have asked for a decision by Friday.",
+    "Load testing surfaced a regression in the search index, we are rolling back and will re-plan the milestone.",
+    "All tasks for this sprint are done, next up is the rollout to the remaining workspaces.",
+    "Hiring for the team has slowed us down, we've descoped the reporting dashboard to keep the date.",
+]
+
+def linear_timestamp(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+# Synthetic Linear workspace: teams and users are stable for a seed, so Redis caches of them stay valid across runs,
+# while project ids are new for every dataset, so analyses stored by earlier runs are never reused.
+class Dataset:
+    def __init__(self, project_count: int, user_count: int = None, seed: int = 0):
+        rng = random.Random(seed)
+        self.teams = [{"id": f"team-{idx}", "name": name} for idx, name in enumerate(EPD_TEAMS + OTHER_TEAMS)]
+        self.states = [{"id": f"{team['id']}-state-{idx}", "name": name, "team": team}
+                       for team in self.teams for idx, name in enumerate(TICKET_STATES)]
+        self.labels = {team["id"]: [{"id": f"{team['id']}-label-{idx}", "name": name} for idx, name in enumerate(LABELS)]
+                       for team in self.teams}
+        user_count = user_count or max(5, project_count // 3)
+        self.users = [{"id": f"user-{idx}", "name": f"User {idx}", "email": f"user{idx}@example.com"} for idx in range(user_count)]
+        now = datetime.now()
+        self.projects = []
+        for idx in range(project_count):
+            lead = rng.choice(self.users)
+            updates = []
+            for update_idx in range(rng.randint(0, 3)):
+                # the latest update is recent for most projects, so most of them make it into the report
+                age = timedelta(days=rng.uniform(0, 4) if update_idx == 0 and rng.random() < 0.75 else rng.uniform(6, 30) + update_idx * 7)
+                updates.append({
+                    "id": str(uuid.uuid4()),
+                    "createdAt": linear_timestamp(now - age),
+                    "body": " ".join(rng.sample(UPDATE_SNIPPETS, 3)),
+                    "url": f"https://linear.app/example/project/update-{idx}-{update_idx}",
+                    "diffMarkdown": f"- Target date moved by {rng.randint(1, 14)} days" if rng.random() < 0.3 else None,
+                    "user": lead,
+                })
+            updates.sort(key=lambda update: update["createdAt"], reverse=True)
+            self.projects.append({
+                "id": str(uuid.uuid4()),
+                "name": f"Project {idx}",
+                "description": f"Synthetic project {idx} for benchmarking.",
+                "state": rng.choice(PROJECT_STATES),
+                "targetDate": (now + timedelta(days=rng.randint(7, 120))).strftime("%Y-%m-%d"),
+                "progress": round(rng.random(), 2),
+                "url": f"https://linear.app/example/project/project-{idx}",
+                "teams": {"nodes": [rng.choice(self.teams[:len(EPD_TEAMS)] if rng.random() < 0.8 else self.teams)]},
+                "projectUpdates": {"nodes": updates},
+                "projectMilestones": {"nodes": [{
+                    "id": str(uuid.uuid4()),
+                    "name": f"Milestone {milestone_idx + 1}",
+                    "description": f"Deliverable {milestone_idx + 1} of project {idx}.",
+                    "targetDate": (now + timedelta(days=14 * (milestone_idx + 1))).strftime("%Y-%m-%d"),
+                    "createdAt": linear_timestamp(now - timedelta(days=60)),
+                } for milestone_idx in range(rng.randint(1, 3))]},
+                "lead": lead,
+            })
+        self.projects_by_id = {project["id"]: project for project in self.projects}
+        self.issues = {}
+        self.lock = threading.Lock()
+
+    def filter_projects(self, project_filter: dict) -> list[dict]:
+        projects = self.projects
+        states = (project_filter or {}).get("state", {}).get("in")
+        if states:
+            projects = [project for project in projects if project["state"] in states]
+        team_names = (project_filter or {}).get("accessibleTeams", {}).get("some", {}).get("name", {}).get("in")
+        if team_names:
+            projects = [project for project in projects if any(team["name"] in team_names for team in project["teams"]["nodes"])]
+        return projects
+
+class FakeServer:
+    name = "fake"
+
+    def __init__(self, latency_seconds: float = 0, jitter_seconds: float = 0, seed: int = 0):
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+        self.first_request_at = None
+        self.lock = threading.Lock()
+        self.server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name=f"{self.name}-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def record(self, operation: str):
+        with self.lock:
+            self.calls[operation] += 1
+
+    # Returns the calls counted since the last reset, and starts counting afresh
+    def reset_calls(self) -> Counter:
+        with self.lock:
+            calls, self.calls = self.calls, Counter()
+            self.first_request_at = None
+        return calls
+
+    def _received(self):
+        with self.lock:
+            if self.first_request_at is None:
+                self.first_request_at = time.time()
+
+    def _delay(self):
+        with self.lock:
+            jitter = self.rng.uniform(0, self.jitter_seconds)
+        time.sleep(self.latency_seconds + jitter)
+
+    # Returns the status code, and the JSON body, of the response to a request
+    def handle(self, method: str, path: str, params: dict) -> tuple[int, dict]:
+        raise NotImplementedError
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive, so pooled clients reuse their connections as they would in production
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self, method: str):
+                fake._received()
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length", 0))
+                if length:
+                    body = self.rfile.read(length)
+                    if self.headers.get("Content-Type", "").startswith("application/json"):
+                        params.update(json.loads(body))
+                    else:
+                        params.update({key: values[0] for key, values in parse_qs(body.decode()).items()})
+                fake._delay()
+                try:
+                    status, payload = fake.handle(method, url.path, params)
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def log_message(self, format, *args):
+                return
+
+        return Handler
+
+class FakeLinear(FakeServer):
+    name = "linear"
+
+    def __init__(self, dataset: Dataset, **kwargs):
+        super().__init__(**kwargs)
+        self.dataset = dataset
+
+    def _page(self, projects: list[dict], variables: dict, default_page_size: int = 50) -> dict:
+        start = int(variables.get("after") or 0)
+        end = start + int(variables.get("first") or default_page_size)
+        return {"nodes": projects[start:end], "pageInfo": {"hasNextPage": end < len(projects), "endCursor": str(end)}}
+
+    def handle(self, method, path, params):
+        query, variables = params.get("query", ""), params.get("variables") or {}
+        dataset = self.dataset
+        aliased = re.findall(r"(op\d+): (\w+)\(", query)
+        if aliased:
+            return 200, {"data": {alias: self._batched(field, alias, variables) for alias, field in aliased}}
+        if "issueCreate(" in query:
+            self.record("issueCreate")
+            return 200, {"data": {"issueCreate": self._create_issue(variables["input"])}}
+        if "projects(" in query:
+            if "ProjectFields" in query:
+                self.record("projectsWithDetails")
+                return 200, {"data": {"projects": self._page(dataset.filter_projects(variables.get("filter")), variables)}}
+            self.record("projects")
+            summaries = [{key: project[key] for key in ["id", "name", "description", "state", "targetDate"]} for project in dataset.projects]
+            return 200, {"data": {"projects": self._page(summaries, variables)}}
+        if "project(" in query:
+            self.record("project")
+            return 200, {"data": {"project": dataset.projects_by_id.get(variables.get("id"))}}
+        if "workflowStates" in query:
+            self.record("workflowStates")
+            team_id = (variables.get("filter") or {}).get("team", {}).get("id", {}).get("eq")
+            return 200, {"data": {"workflowStates": {"nodes": [state for state in dataset.states if team_id in [None, state["team"]["id"]]]}}}
+        if "labels(" in query:
+            self.record("labels")
+            team_id = variables["filter"]["team"]["id"]["eq"]
+            return 200, {"data": {"labels": {"nodes": dataset.labels.get(team_id, [])}}}
+        if "teams" in query:
+            self.record("teams")
+            return 200, {"data": {"teams": {"nodes": dataset.teams}}}
+        return 400, {"errors": [{"message": "Unsupported query"}]}
+
+    def _batched(self, field: str, alias: str, variables: dict):
+        self.record(field)
+        if field == "issueCreate":
+            return self._create_issue(variables[f"{alias}_input"])
+        if field == "attachmentLinkSlack":
+            return {"success": True}
+        if field == "issue":
+            return self.dataset.issues.get(variables[f"{alias}_id"])
+        return None
+
+    def _create_issue(self, issue_input: dict) -> dict:
+        issue_id = issue_input.get("id") or str(uuid.uuid4())
+        issue = {"id": issue_id, "title": issue_input["title"], "description": issue_input["description"],
+                 "url": f"https://linear.app/example/issue/{issue_id}"}
+        with self.dataset.lock:
+            self.dataset.issues[issue_id] = issue
+        return {"issue": issue}
+
+class FakeSlack(FakeServer):
+    name = "slack"
+
+    def __init__(self, dataset: Dataset, **kwargs):
+        super().__init__(**kwargs)
+        self.dataset = dataset
+        self.posted = []
+
+    def handle(self, method, path, params):
+        api_method = path.rsplit("/", 1)[-1]
+        self.record(api_method)
+        if api_method in ["chat.postMessage", "chat.update"]:
+            with self.lock:
+                self.posted.append(params)
+            return 200, {"ok": True, "channel": params.get("channel"), "ts": params.get("ts") or f"{time.time():.6f}"}
+        if api_method == "conversations.info":
+            return 200, {"ok": True, "channel": {"id": params.get("channel"), "name": "product-feedback"}}
+        if api_method == "chat.getPermalink":
+            message_ts = str(params.get("message_ts", "")).replace(".", "")
+            return 200, {"ok": True, "permalink": f"https://example.slack.com/archives/{params.get('channel')}/p{message_ts}"}
+        if api_method == "users.list":
+            start, limit = int(params.get("cursor") or 0), int(params.get("limit") or 200)
+            users = self.dataset.users[start:start + limit]
+            next_cursor = str(start + limit) if start + limit < len(self.dataset.users) else ""
+            return 200, {"ok": True, "members": [{"id": f"U{user['id']}", "profile": {"email": user["email"]}} for user in users],
+                         "response_metadata": {"next_cursor": next_cursor}}
+        if api_method == "conversations.history":
+            return 200, {"ok": True, "messages": [{"type": "message", "user": "UREPORTER", "ts": params.get("latest"),
+                                                   "text": "The export button on the billing page fails with a 500 error."}]}
+        if api_method == "users.lookupByEmail":
+            for user in self.dataset.users:
+                if user["email"] == params.get("email"):
+                    return 200, {"ok": True, "user": {"id": f"U{user['id']}"}}
+            return 200, {"ok": False, "error": "users_not_found"}
+        return 200, {"ok": True}
+
+class FakeOpenAI(FakeServer):
+    name = "openai"
+
+    def __init__(self, worthy_ratio: float = 0.8, status_weights: tuple = (0.7, 0.2, 0.1), **kwargs):
+        super().__init__(**kwargs)
+        self.worthy_ratio = worthy_ratio
+        self.status_weights = status_weights
+
+    def handle(self, method, path, params):
+        if not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": f"Unsupported path {path}"}}
+        messages = params["messages"]
+        system = next((message["content"] for message in messages if message["role"] == "system"), "")
+        user = next((message["content"] for message in messages if message["role"] == "user"), "")
+        message, finish_reason = {"role": "assistant", "content": None}, "stop"
+        with self.lock:
+            if params.get("tools"):
+                function = params["tools"][0]["function"]
+                self.calls[f"tool:{function['name']}"] += 1
+                arguments = self._arguments(function["parameters"], system)
+                message["tool_calls"] = [{"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                                          "function": {"name": function["name"], "arguments": json.dumps(arguments)}}]
+                finish_reason = "tool_calls"
+            elif '"decisions"' in system:
+                self.calls["classify_items"] += 1
+                message["content"] = json.dumps({"decisions": self._decisions(system, user)})
+            elif '"can_proceed"' in system:
+                self.calls["can_proceed"] += 1
+                can_proceed = self.rng.random() < self.worthy_ratio
+                message["content"] = json.dumps({"chain_of_thought": "Synthetic reasoning.", "can_proceed": can_proceed,
+                                                 "follow_ups": None if can_proceed else "Could you share more details?"})
+            elif '"best_option"' in system:
+                self.calls["get_best_option"] += 1
+                options = re.findall(r"^\d+\. ", user, re.MULTILINE)
+                message["content"] = json.dumps({"chain_of_thought": "Synthetic reasoning.", "best_option": self.rng.randint(1, max(1, len(options)))})
+            else:
+                self.calls["completion"] += 1
+                message["content"] = "Synthetic title for a benchmark ticket"
+        prompt_tokens = sum(len(str(message.get("content") or "")) for message in messages) // 4
+        completion_tokens = len(json.dumps(message)) // 4
+        return 200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": params.get("model"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def _decisions(self, system: str, user: str) -> list[dict]:
+        options_section = system.split("# Options", 1)[-1].split("#", 1)[0]
+        option_count = len(re.findall(r"^\d+\. ", options_section, re.MULTILINE)) or 1
+        weights = list(self.status_weights[:option_count]) + [0] * max(0, option_count - len(self.status_weights))
+        items = re.findall(r"^## Item (\d+)$", user, re.MULTILINE)
+        return [{"item": int(item), "chain_of_thought": "Synthetic reasoning.",
+                 "best_option": self.rng.choices(range(1, option_count + 1), weights=weights)[0]} for item in items]
+
+    # Arguments for a structured output call, filled in from the function's JSON schema
+    def _arguments(self, schema: dict, system: str) -> dict:
+        # teams are listed as "- <team>: states <state>, <state>" when the prompt asks to pick one
+        teams = dict(re.findall(r"^- ([^:\n]+): states (.+)$", system, re.MULTILINE))
+        team = self.rng.choice([name for name in teams if name in EPD_TEAMS] or list(teams) or [None])
+        arguments = {}
+        for name, field in schema.get("properties", {}).items():
+            field_type = field.get("type") or next((option.get("type") for option in field.get("anyOf", []) if option.get("type") != "null"), "string")
+            if field_type == "boolean":
+                arguments[name] = self.rng.random() < self.worthy_ratio
+            elif field_type in ["integer", "number"]:
+                arguments[name] = 1
+            elif name == "team" and team:
+                arguments[name] = team
+            elif name == "state" and team:
+                states = [state.strip() for state in teams[team].split(",")]
+                arguments[name] = next((state for state in states if state == "Todo"), states[0])
+            else:
+                arguments[name] = f"Synthetic {name.replace('_', ' ')}"
+        return arguments
@@ -0,0 +1,255 @@
+'''
+This script benchmarks the report, the reminders and ticket creation end to end, against local stand-ins for Linear,
+Slack and OpenAI, and reports wall time, calls per service and p50/p95 latency per stage for every project count.
+Usage: python3 benchmarks/run.py [--projects 10 100 1000] [--repeats 3] [--messages 20] [--output results.json]
+'''
+import os
+import sys
+import json
+import time
+import argparse
+import inspect
+import logging
+import threading
+import functools
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('PROJECT_PATH', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.fakes import Dataset, FakeLinear, FakeSlack, FakeOpenAI
+
+CHANNEL_ID = "CBENCHMARK"
+# The benchmark writes fake teams, users and analyses under the production key names, so it gets a Redis database of
+# its own and never the default one
+BENCHMARK_REDIS_URL = "redis://localhost:6379/15"
+MESSAGES = [
+    "The export button on the billing page fails with a 500 error for workspace {idx}.",
+    "Could we add a dark mode to the settings page? Several customers asked for it this week ({idx}).",
+    "Search results take more than ten seconds to load for large workspaces, e.g. workspace {idx}.",
+    "The onboarding email links to a page that no longer exists, reported by customer {idx}.",
+]
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+class StageTimings:
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self.lock:
+            self.durations[stage].append(seconds)
+
+    # Replaces the method on the instance with one that records how long each call takes
+    def instrument(self, obj, method_name: str, stage: str):
+        method = getattr(obj, method_name)
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+            setattr(obj, method_name, timed_async)
+            return
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        setattr(obj, method_name, timed)
+
+    def summary(self) -> dict:
+        return {stage: {"calls": len(durations), "p50": percentile(durations, 0.5), "p95": percentile(durations, 0.95)}
+                for stage, durations in self.durations.items()}
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.dataset = Dataset(0, seed=args.seed)
+        self.linear = FakeLinear(self.dataset, latency_seconds=args.linear_latency_ms / 1000, jitter_seconds=args.linear_jitter_ms / 1000, seed=args.seed).start()
+        self.slack = FakeSlack(self.dataset, latency_seconds=args.slack_latency_ms / 1000, jitter_seconds=args.slack_jitter_ms / 1000, seed=args.seed).start()
+        self.openai = FakeOpenAI(latency_seconds=args.openai_latency_ms / 1000, jitter_seconds=args.openai_jitter_ms / 1000, seed=args.seed).start()
+        self.fakes = [self.linear, self.slack, self.openai]
+        # always overwritten, so a benchmark can never reach the real services
+        os.environ["LINEAR_API_URL"] = f"{self.linear.url}/graphql"
+        os.environ["SLACK_API_URL"] = f"{self.slack.url}/api/"
+        os.environ["OPENAI_BASE_URL"] = f"{self.openai.url}/v1"
+        os.environ["LINEAR_API_KEY"] = "lin_api_benchmark"
+        os.environ["SLACK_BOT_TOKEN"] = "xoxb-benchmark"
+        os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+        os.environ["REDIS_URL"] = benchmark_redis_url(args.redis_url)
+
+    def load(self, project_count: int, repeat: int):
+        dataset = Dataset(project_count, seed=self.args.seed + repeat)
+        self.linear.dataset = self.slack.dataset = dataset
+        for fake in self.fakes:
+            fake.reset_calls()
+
+    def calls(self) -> dict:
+        return {fake.name: dict(fake.reset_calls()) for fake in self.fakes}
+
+    def stop(self):
+        for fake in self.fakes:
+            fake.stop()
+
+    def run_scenario(self, name: str, project_count: int, run) -> dict:
+        timings = StageTimings()
+        wall_times, calls = [], defaultdict(lambda: defaultdict(int))
+        for repeat in range(self.args.repeats):
+            self.load(project_count, repeat)
+            start = time.perf_counter()
+            run(timings)
+            wall_times.append(time.perf_counter() - start)
+            for service, service_calls in self.calls().items():
+                for operation, count in service_calls.items():
+                    calls[service][operation] += count
+        return {
+            "scenario": name,
+            "projects": project_count,
+            "repeats": self.args.repeats,
+            "wall_seconds": {"p50": percentile(wall_times, 0.5), "p95": percentile(wall_times, 0.95), "max": max(wall_times)},
+            # calls per run, averaged over the repeats
+            "calls": {service: {operation: count / self.args.repeats for operation, count in sorted(service_calls.items())}
+                      for service, service_calls in calls.items()},
+            "stages": timings.summary(),
+        }
+
+# Refuses the default database, which production uses
+def benchmark_redis_url(url: str) -> str:
+    import redis
+    if redis.Redis.from_url(url).connection_pool.connection_kwargs.get("db", 0) == 0:
+        raise SystemExit(f"Refusing to benchmark against Redis database 0 ({url}), pick a dedicated database, e.g. {BENCHMARK_REDIS_URL}")
+    return url
+
+def redis_available() -> bool:
+    import redis
+    try:
+        return redis.Redis.from_url(os.environ["REDIS_URL"], socket_connect_timeout=1, retry_on_error=[]).ping()
+    except redis.RedisError:
+        return False
+
+def report_config():
+    from models.report import Config, EmailConfig
+    return Config(reporting_channel_id=CHANNEL_ID, roadmap_view_url="https://linear.app/example/view/roadmap",
+                  email=EmailConfig(domains=["example.com"], suffixes=[], mappings={}))
+
+def ticketer_config():
+    from models.ticket import TicketerConfig
+    from models.ticket.config import ChannelConfig
+    return TicketerConfig(slack_admin_user_id="UADMIN", slack_channel_configs=[ChannelConfig(channel_id=CHANNEL_ID)])
+
+def make_reporter(logger: logging.Logger, timings: StageTimings):
+    from tasks.report import Reporter
+    reporter = Reporter(logger=logger, config=report_config())
+    timings.instrument(reporter, "_get_current_projects", "fetch_projects")
+    # the report splits the projects as they're fetched, so this stage covers the fetch
+    timings.instrument(reporter, "_split_projects_by_update", "fetch_and_split_projects")
+    timings.instrument(reporter, "_enrich_projects_with_status", "classify_status")
+    timings.instrument(reporter, "_get_project_risks", "risk_summaries")
+    timings.instrument(reporter, "_get_best_update", "best_update")
+    timings.instrument(reporter, "_get_reminders", "group_reminders")
+    timings.instrument(reporter, "_get_reminder_block", "render_reminders")
+    timings.instrument(reporter, "_write_slack_message", "render_report")
+    timings.instrument(reporter.slack, "post_message", "post_message")
+    timings.instrument(reporter.slack, "update_message", "update_message")
+    return reporter
+
+def run_report(logger: logging.Logger):
+    def run(timings: StageTimings):
+        reporter = make_reporter(logger, timings)
+        timings.instrument(reporter, "trigger_report", "trigger_report")
+        reporter.trigger_report()
+        for stage, seconds in reporter.delivery_seconds.items():
+            timings.record(f"delivered:{stage}", seconds)
+    return run
+
+def run_reminder(logger: logging.Logger):
+    from models.report import ReminderType
+
+    def run(timings: StageTimings):
+        reporter = make_reporter(logger, timings)
+        timings.instrument(reporter, "send_reminder", "send_reminder")
+        reporter.send_reminder(type=ReminderType.UPDATE)
+    return run
+
+def run_tickets(logger: logging.Logger, message_count: int):
+    from tasks.ticket import Ticketer
+    from models.slack import Message
+
+    def run(timings: StageTimings):
+        ticketer = Ticketer(logger=logger, config=ticketer_config())
+        # the metadata cache may hold teams of an earlier run in Redis, and the consumer prefetches it on start
+        ticketer.linear.invalidate_metadata()
+        ticketer.prefetch_metadata()
+        timings.instrument(ticketer, "trigger_ticket_creation", "trigger_ticket_creation")
+        timings.instrument(ticketer, "_get_team_states", "team_states")
+        timings.instrument(ticketer, "_plan_ticket", "plan_ticket")
+        timings.instrument(ticketer, "_is_ticket_worthy", "is_ticket_worthy")
+        timings.instrument(ticketer.linear, "create_ticket_with_slack_message", "create_ticket")
+        timings.instrument(ticketer.slack, "reply_in_thread", "reply_in_thread")
+        for idx in range(message_count):
+            message = Message(text=MESSAGES[idx % len(MESSAGES)].format(idx=idx), user="UREPORTER", channel=CHANNEL_ID,
+                              ts=time.time() + idx)
+            ticketer.trigger_ticket_creation(message)
+    return run
+
+def print_result(result: dict):
+    wall = result["wall_seconds"]
+    print(f"\n== {result['scenario']} @ {result['projects']} projects: wall p50 {wall['p50']:.2f}s, p95 {wall['p95']:.2f}s ({result['repeats']} runs)")
+    for service, service_calls in result["calls"].items():
+        formatted_calls = ", ".join([f"{operation}={count:g}" for operation, count in service_calls.items()])
+        print(f"   {service:<7} {sum(service_calls.values()):>7g} calls  {formatted_calls}")
+    print(f"   {'stage':<24} {'calls':>6} {'p50 (s)':>9} {'p95 (s)':>9}")
+    for stage, summary in result["stages"].items():
+        print(f"   {stage:<24} {summary['calls']:>6} {summary['p50']:>9.3f} {summary['p95']:>9.3f}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark taskie against simulated Linear, Slack and OpenAI APIs.")
+    parser.add_argument("--projects", type=int, nargs="+", default=[10, 100, 1000], help="Project counts to benchmark at")
+    parser.add_argument("--scenarios", nargs="+", default=["report", "reminder", "tickets"], choices=["report", "reminder", "tickets"])
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per scenario and project count")
+    parser.add_argument("--messages", type=int, default=20, help="Slack messages per ticket creation run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--redis-url", default=BENCHMARK_REDIS_URL, help="A Redis database of the benchmark's own, never database 0")
+    for service, latency_ms, jitter_ms in [("linear", 100, 50), ("slack", 80, 40), ("openai", 800, 400)]:
+        parser.add_argument(f"--{service}-latency-ms", type=float, default=latency_ms)
+        parser.add_argument(f"--{service}-jitter-ms", type=float, default=jitter_ms)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    logger = logging.getLogger("benchmark")
+    harness = Harness(args)
+    if not redis_available():
+        logger.warning(f"Redis is not reachable at {os.environ['REDIS_URL']}; the Redis-backed caches will fail, and their connection "
+                       "retries will be part of the measured stages. Start a local Redis for representative numbers.")
+    results = []
+    try:
+        for project_count in args.projects:
+            if "report" in args.scenarios:
+                results.append(harness.run_scenario("trigger_report", project_count, run_report(logger)))
+                print_result(results[-1])
+            if "reminder" in args.scenarios:
+                results.append(harness.run_scenario("send_reminder", project_count, run_reminder(logger)))
+                print_result(results[-1])
+            if "tickets" in args.scenarios:
+                results.append(harness.run_scenario("trigger_ticket_creation", project_count, run_tickets(logger, args.messages)))
+                print_result(results[-1])
+    finally:
+        harness.stop()
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults written to {args.output}")
@@ -0,0 +1,89 @@
+'''
+This script measures the startup time of every CLI subcommand: the time from launching the process until its first
+request reaches one of the simulated services, along with the total run time, against a small synthetic workspace.
+Usage: python3 benchmarks/startup.py [--runs 5] [--projects 10]
+'''
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_PATH)
+from benchmarks.fakes import Dataset, FakeLinear, FakeSlack, FakeOpenAI
+from benchmarks.run import CHANNEL_ID, BENCHMARK_REDIS_URL, benchmark_redis_url, percentile
+
+REPORT_CONFIG = f'''reporting_channel_id: {CHANNEL_ID}
+roadmap_view_url: https://linear.app/example/view/roadmap
+email:
+  domains: [example.com]
+  suffixes: []
+  mappings: {{}}
+'''
+TICKET_CONFIG = f'''slack_admin_user_id: UADMIN
+queue_backend: local
+slack_channel_configs:
+  - channel_id: {CHANNEL_ID}
+'''
+COMMANDS = [
+    ("project_report (usage)", ["triggers/manual/project_report.py"]),
+    ("trigger-report", ["triggers/manual/project_report.py", "trigger-report"]),
+    ("send-update-reminder", ["triggers/manual/project_report.py", "send-update-reminder"]),
+    ("send-planning-reminder", ["triggers/manual/project_report.py", "send-planning-reminder"]),
+    ("ticket_from_slack", ["triggers/manual/ticket_from_slack.py", f"https://example.slack.com/archives/{CHANNEL_ID}/p1700000000000100"]),
+]
+
+# The CLIs read their config from PROJECT_PATH, so they run from a copy of the tree made of links to the repo's
+# packages, and the benchmark's own config
+def make_project_path(directory: str) -> str:
+    for package in ["models", "tasks", "tools", "triggers"]:
+        os.symlink(os.path.join(REPO_PATH, package), os.path.join(directory, package))
+    os.mkdir(os.path.join(directory, "config"))
+    with open(os.path.join(directory, "config", "report.yaml"), "w") as file:
+        file.write(REPORT_CONFIG)
+    with open(os.path.join(directory, "config", "ticket_config.yaml"), "w") as file:
+        file.write(TICKET_CONFIG)
+    return directory
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure the startup time of taskie's CLI subcommands.")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per subcommand")
+    parser.add_argument("--projects", type=int, default=10, help="Projects in the synthetic workspace")
+    parser.add_argument("--redis-url", default=BENCHMARK_REDIS_URL, help="A Redis database of the benchmark's own, never database 0")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    dataset = Dataset(args.projects)
+    fakes = [FakeLinear(dataset).start(), FakeSlack(dataset).start(), FakeOpenAI().start()]
+    with tempfile.TemporaryDirectory() as directory:
+        project_path = make_project_path(directory)
+        env = dict(os.environ,
+                   PROJECT_PATH=project_path,
+                   LINEAR_API_URL=f"{fakes[0].url}/graphql",
+                   SLACK_API_URL=f"{fakes[1].url}/api/",
+                   OPENAI_BASE_URL=f"{fakes[2].url}/v1",
+                   LINEAR_API_KEY="lin_api_benchmark",
+                   SLACK_BOT_TOKEN="xoxb-benchmark",
+                   OPENAI_API_KEY="sk-benchmark",
+                   REDIS_URL=benchmark_redis_url(args.redis_url))
+        print(f"{'subcommand':<26} {'startup p50 (s)':>16} {'startup p95 (s)':>16} {'total p50 (s)':>14}")
+        try:
+            for name, command in COMMANDS:
+                startups, totals = [], []
+                for _ in range(args.runs):
+                    for fake in fakes:
+                        fake.reset_calls()
+                    started_at = time.time()
+                    subprocess.run([sys.executable, os.path.join(project_path, command[0])] + command[1:], env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    totals.append(time.time() - started_at)
+                    first_requests = [fake.first_request_at for fake in fakes if fake.first_request_at]
+                    # a subcommand that never calls a service starts up in the time it takes to run
+                    startups.append(min(first_requests) - started_at if first_requests else totals[-1])
+                print(f"{name:<26} {percentile(startups, 0.5):>16.3f} {percentile(startups, 0.95):>16.3f} {percentile(totals, 0.5):>14.3f}")
+        finally:
+            for fake in fakes:
+                fake.stop()
@@ -0,0 +1 @@
+from .config import ResponseCacheConfig, CacheBackend
\ No newline at end of file
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from enum import Enum
+
+class CacheBackend(str, Enum):
+    REDIS = "redis"
+    SQLITE = "sqlite"
+
+class ResponseCacheConfig(BaseModel):
+    backend: CacheBackend = CacheBackend.SQLITE
+    # SQLite database file, relative to PROJECT_PATH unless absolute
+    path: str = ".cache/llm_responses.sqlite3"
+    ttl_seconds: int = 7 * 24 * 60 * 60
+    max_entries: int = 10000
+    # skip cached responses, but still store fresh ones
+    bypass: bool = False
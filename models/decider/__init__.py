@@ -0,0 +1 @@
+from .entities import ItemDecision, BatchDecision
\ No newline at end of file
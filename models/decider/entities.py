@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from pydantic.fields import Field
+from typing import Optional
+
+class ItemDecision(BaseModel):
+    item: int = Field(description="Number of the item, as listed in the input")
+    best_option: int = Field(description="Number of the best option for the item, as listed in the options")
+    chain_of_thought: Optional[str] = Field(None, description="The chain of thought that led to the decision")
+
+class BatchDecision(BaseModel):
+    decisions: list[ItemDecision]
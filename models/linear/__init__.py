@@ -1 +1 @@
-from .entities import Project, ProjectStates, User, Ticket, TicketState, Team, TicketLabel, ProjectStatus
\ No newline at end of file
+from .entities import Project, ProjectSummary, ProjectStates, User, Ticket, TicketState, Team, TicketLabel, ProjectStatus, PageInfo, Connection, EPD_TEAM_NAMES
\ No newline at end of file
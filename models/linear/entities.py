@@ -1,8 +1,10 @@
 from pydantic import BaseModel
 from pydantic.fields import Field
-from typing import Optional
+from typing import Generic, Optional, TypeVar
 from enum import Enum
 
+NodeType = TypeVar("NodeType")
+
 class ProjectStates(str, Enum):
     PLANNED = "planned"
     STARTED = "started"
@@ -10,6 +12,9 @@ class ProjectStates(str, Enum):
     CANCELED = "canceled"
     BACKLOG = "backlog"
 
+# Teams whose projects are covered by the project report
+EPD_TEAM_NAMES = ["Engineering", "Product", "Design"]
+
 class ProjectStatus(str, Enum):
     ON_TRACK = "on track"
     AT_RISK = "at risk"
@@ -26,7 +31,7 @@ class Team(BaseModel):
 
     # Check if team is related to engineering, product or design
     def is_epd(self):
-        return self.name in ["Engineering", "Product", "Design"]
+        return self.name in EPD_TEAM_NAMES
 
 class TicketState(BaseModel):
     id: str
@@ -76,6 +81,23 @@ class Project(BaseModel):
     teams: Optional[TeamsNode] = None
     diff: Optional[str] = Field(None, alias="diffMarkdown")
     
+# The fields of a project shown in list views, without any of its nested connections
+class ProjectSummary(BaseModel):
+    id: str
+    name: str
+    description: Optional[str] = Field(None, alias="description")
+    target_date: Optional[str] = Field(None, alias="targetDate")
+    state: ProjectStates = Field(None, alias="state")
+
+class PageInfo(BaseModel):
+    has_next_page: bool = Field(..., alias="hasNextPage")
+    end_cursor: Optional[str] = Field(None, alias="endCursor")
+
+# A page of a GraphQL connection, e.g. `projects { nodes { ... } pageInfo { ... } }`
+class Connection(BaseModel, Generic[NodeType]):
+    nodes: list[NodeType]
+    page_info: Optional[PageInfo] = Field(None, alias="pageInfo")
+
 class Ticket(BaseModel):
     id: str = Field(None, alias="id")
     title: str = Field(alias="title", description="A brief, descriptive, title for the ticket")
@@ -0,0 +1 @@
+from .entities import QueuedEvent
\ No newline at end of file
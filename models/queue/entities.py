@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+class QueuedEvent(BaseModel):
+    # id of the entry in the queue, used to acknowledge it
+    id: str
+    # id of the event at its source, used to drop duplicate deliveries
+    event_id: str
+    body: dict
+    attempts: int = 1
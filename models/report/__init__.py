@@ -1,2 +1,2 @@
-from .entities import Reminder, Report, RiskUpdate, ReminderType
-from .config import Config, EmailConfig
+from .entities import Reminder, Report, RiskUpdate, ReminderType, ProjectAnalysis, ReportRun, ReportCheckpoint
+from .config import Config, EmailConfig
\ No newline at end of file
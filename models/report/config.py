@@ -1,4 +1,10 @@
+import sys
+import os
+from typing import Optional
 from pydantic import BaseModel
+sys.path.append(os.environ['PROJECT_PATH'])
+from models.cache import ResponseCacheConfig
+from models.linear import ProjectStates, EPD_TEAM_NAMES
 
 class EmailConfig(BaseModel):
     domains: list[str]
@@ -11,3 +17,14 @@ class Config(BaseModel):
     reporting_channel_id: str
     roadmap_view_url: str
     email: EmailConfig
+    # the projects the report covers, by state and by the names of their teams
+    project_states: list[ProjectStates] = [ProjectStates.STARTED]
+    team_names: list[str] = EPD_TEAM_NAMES
+    llm_cache: Optional[ResponseCacheConfig] = None
+    # maximum number of LLM calls in flight while generating the report, across all of its thread pools. Reports run
+    # together share a single limit, the smallest of their configs'.
+    llm_concurrency: int = 8
+    # estimated token budget for the rendering of a single project in a prompt
+    prompt_token_budget: int = 1000
+    # directory for the checkpoints of report runs, relative to PROJECT_PATH unless absolute
+    checkpoint_path: str = ".cache/report_runs"
@@ -5,7 +5,7 @@ from pydantic.fields import Field
 from enum import Enum
 from typing import Optional
 sys.path.append(os.environ['PROJECT_PATH'])
-from models.linear import Project, User
+from models.linear import Project, User, ProjectStatus
 
 class ReminderType(Enum):
     UPDATE = "update"
@@ -21,9 +21,33 @@ class RiskUpdate(BaseModel):
     why: str = Field(None, description="A VERY BRIEF reason for why the project is at risk")
     what_next: str = Field(None, description="A VERY BRIEF summary of what the project lead has shared as the next steps")
 
+# Result of analysing a project's latest update, reused until the project gets a newer update
+class ProjectAnalysis(BaseModel):
+    project_id: str
+    update_id: str
+    status: ProjectStatus
+    risk: Optional[RiskUpdate] = None
+
 class Report(BaseModel):
     best_update: Project = None
     risks : list[RiskUpdate] = None
     reminders: list[Reminder] = None
     projects_with_updates: list[Project] = None
     projects_without_updates: list[Project] = None
+
+# Outcome of the report for one config, when several run in one process
+class ReportRun(BaseModel):
+    config_name: str
+    wall_seconds: float
+    error: Optional[str] = None
+
+# Progress of a report run, saved after every stage so that a run that fails part way can be resumed
+class ReportCheckpoint(BaseModel):
+    run_id: str
+    report: Report
+    # "projects" once the projects are fetched, then the name of every report section as it completes
+    completed: list[str]
+    failed: list[str]
+    # the message the report was posted as, and the blocks last rendered for it
+    message_ts: Optional[str] = None
+    blocks: Optional[list[dict]] = None
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from pydantic.fields import Field
+from typing import Optional
 
 class Message(BaseModel):
     id: str = Field(alias="client_msg_id", default=None)
@@ -8,6 +9,8 @@ class Message(BaseModel):
     channel_id: str = Field(alias="channel", default=None)
     timestamp: float = Field(alias="ts")
     is_reply: bool = Field(alias="is_thread_reply", default=False)
+    subtype: Optional[str] = Field(alias="subtype", default=None)
+    bot_id: Optional[str] = Field(alias="bot_id", default=None)
     
     def get_message_from_event(event: dict):
         message = Message(**event)
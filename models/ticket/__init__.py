@@ -1 +1,2 @@
-from .config import TicketerConfig
\ No newline at end of file
+from .config import TicketerConfig, QueueBackend, PreFilterConfig
+from .entities import TicketPlan
\ No newline at end of file
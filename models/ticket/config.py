@@ -1,10 +1,33 @@
 from pydantic import BaseModel
 from pydantic.fields import Field
+from enum import Enum
+
+class QueueBackend(str, Enum):
+    REDIS = "redis"
+    LOCAL = "local"
+
+class PreFilterConfig(BaseModel):
+    # messages shorter than this, once emoji, mentions and punctuation are stripped, are never ticket-worthy
+    min_length: int = 8
+    # messages matching any of these skip the remaining rules
+    allow_patterns: list[str] = []
+    deny_patterns: list[str] = [
+        r"^\W*(thanks|thank you|thx|ty|ok|okay|cool|great|nice|awesome|lgtm|done|\+1)\W*$",
+    ]
+    ignored_subtypes: list[str] = ["bot_message", "channel_join", "channel_leave", "channel_topic", "channel_purpose", "channel_name"]
 
 class ChannelConfig(BaseModel):
     channel_id: str
     mandatory_label_ids: list[str] = Field(alias="mandatory_label_ids", default=None)
+    # replaces the global pre-filter rules for this channel
+    prefilter: PreFilterConfig = Field(alias="prefilter", default=None)
 
 class TicketerConfig(BaseModel):
     slack_admin_user_id: str
-    slack_channel_configs: list[ChannelConfig]
\ No newline at end of file
+    slack_channel_configs: list[ChannelConfig]
+    prefilter: PreFilterConfig = PreFilterConfig()
+    # decide worthiness, title, team and state in one structured LLM call, falling back to one call per decision
+    use_ticket_plan: bool = True
+    # workers processing queued Slack events in the consumer
+    worker_count: int = 4
+    queue_backend: QueueBackend = QueueBackend.REDIS
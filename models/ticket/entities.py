@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from pydantic.fields import Field
+from typing import Optional
+
+class TicketPlan(BaseModel):
+    chain_of_thought: str = Field(description="The chain of thought that led to the decisions below")
+    is_ticket_worthy: bool = Field(description="Whether the message requires a Linear ticket to be created")
+    follow_up: Optional[str] = Field(None, description="A follow-up question, ONLY IF the message is not ticket-worthy and more information is needed")
+    title: Optional[str] = Field(None, description="A brief, descriptive title for the ticket, in at most 10 words, if ticket-worthy")
+    team: Optional[str] = Field(None, description="Name of the team best equipped to act on the ticket, exactly as listed, if ticket-worthy")
+    state: Optional[str] = Field(None, description="Name of the TODO state of the chosen team, exactly as listed, if ticket-worthy")
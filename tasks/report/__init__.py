@@ -1 +1,2 @@
-from .service import Reporter
\ No newline at end of file
+from .service import Reporter, SharedClients, load_config, DEFAULT_CONFIG_PATH
+from .runner import run_reports
\ No newline at end of file
@@ -0,0 +1,57 @@
+'''
+The checkpoint store keeps the progress of every report run on local disk, as gzipped JSON in one file per run id, so
+that a run that fails part way can be resumed, or its report rendered and posted again, without redoing finished stages.
+'''
+import os
+import sys
+import gzip
+import time
+import uuid
+import logging
+from datetime import datetime
+sys.path.append(os.environ['PROJECT_PATH'])
+from models.report import ReportCheckpoint
+
+CHECKPOINT_SUFFIX = ".json.gz"
+CHECKPOINT_RETENTION_SECONDS = 14 * 24 * 60 * 60
+
+# Run ids sort by the time the run started
+def new_run_id() -> str:
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+class CheckpointStore:
+    def __init__(self, path: str, logger=logging.getLogger(__name__)):
+        self.directory = path if os.path.isabs(path) else os.path.join(os.environ['PROJECT_PATH'], path)
+        self.logger = logger
+
+    def _path(self, run_id: str) -> str:
+        return os.path.join(self.directory, f"{run_id}{CHECKPOINT_SUFFIX}")
+
+    # Written to a temporary file and moved into place, so that a crash mid-write never leaves a corrupt checkpoint.
+    # A checkpoint that can't be saved only costs the ability to resume, so it doesn't fail the run.
+    def save(self, checkpoint: ReportCheckpoint):
+        path = self._path(checkpoint.run_id)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with gzip.open(f"{path}.tmp", "wb", compresslevel=6) as file:
+                # fields left at their default are left out, e.g. sections not generated yet, which default to None
+                # without allowing it
+                file.write(checkpoint.model_dump_json(by_alias=True, exclude_unset=True).encode())
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            self.logger.warning(f"Saving the checkpoint of run {checkpoint.run_id} failed: {e}")
+
+    def load(self, run_id: str) -> ReportCheckpoint:
+        with gzip.open(self._path(run_id), "rb") as file:
+            return ReportCheckpoint.model_validate_json(file.read())
+
+    def prune(self, max_age_seconds: int = CHECKPOINT_RETENTION_SECONDS):
+        if not os.path.isdir(self.directory):
+            return
+        for file_name in os.listdir(self.directory):
+            path = os.path.join(self.directory, file_name)
+            try:
+                if file_name.endswith(CHECKPOINT_SUFFIX) and time.time() - os.path.getmtime(path) > max_age_seconds:
+                    os.remove(path)
+            except OSError as e:
+                self.logger.warning(f"Removing the expired checkpoint {file_name} failed: {e}")
@@ -0,0 +1,42 @@
+'''
+Compact renderings of projects for the report's LLM prompts. Each decision only gets the fields it needs, most
+important first, so the prompt compactor trims the least useful context when a project exceeds the token budget.
+'''
+import os
+import sys
+from datetime import date
+sys.path.append(os.environ['PROJECT_PATH'])
+from models.linear import Project
+from tools.prompt import PromptCompactor
+
+UPCOMING_MILESTONES_LIMIT = 3
+
+def _render_upcoming_milestones(project: Project) -> str:
+    if not project.milestones or not project.milestones.nodes:
+        return None
+    today = date.today().isoformat()
+    milestones = sorted([milestone for milestone in project.milestones.nodes if milestone.target_date],
+                        key=lambda milestone: milestone.target_date)
+    upcoming = [milestone for milestone in milestones if milestone.target_date >= today][:UPCOMING_MILESTONES_LIMIT]
+    overdue = len(milestones) - len([milestone for milestone in milestones if milestone.target_date >= today])
+    lines = [f"- {milestone.name} (target: {milestone.target_date})" for milestone in upcoming]
+    if overdue:
+        lines.append(f"- {overdue} milestones past their target date")
+    return "Upcoming milestones:\n" + "\n".join(lines) if lines else None
+
+# Latest update first, then the project's plan, then the previous update for trend
+def render_project_for_status(project: Project, compactor: PromptCompactor) -> str:
+    updates = project.project_updates.nodes if project.project_updates else []
+    header = f"Project: {project.name}\nTarget date: {project.target_date or 'not set'}"
+    if project.progress is not None:
+        header += f"\nProgress: {round(project.progress * 100)}%"
+    sections = [header]
+    if updates:
+        sections.append(f"Latest update ({updates[0].created_at}):\n{updates[0].body}")
+    sections.append(_render_upcoming_milestones(project))
+    if len(updates) > 1:
+        sections.append(f"Previous update ({updates[1].created_at}):\n{updates[1].body}")
+    return compactor.fit([section for section in sections if section], baseline=project.model_dump_json())
+
+def render_latest_update(project: Project, compactor: PromptCompactor) -> str:
+    return compactor.fit([f"{project.name} - {project.project_updates.nodes[0].body}"])
@@ -0,0 +1,36 @@
+'''
+The runner generates the report, or a reminder, for several configs at once, e.g. one per org or team, in a single
+process. Every config runs in its own worker with its own reporter, and a config that fails doesn't affect the others.
+'''
+import os
+import sys
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+sys.path.append(os.environ['PROJECT_PATH'])
+from models.report import Config, ReportRun
+from tasks.report.service import Reporter, SharedClients
+
+def run_reports(configs: dict[str, Config], task: Callable[[Reporter], None], logger=logging.getLogger(__name__)) -> List[ReportRun]:
+    # the configs share a single limit on LLM calls, the tightest of theirs
+    shared = SharedClients(logger, llm_concurrency=min([config.llm_concurrency for config in configs.values()], default=None))
+    shared.warm()
+
+    def run(config_name: str, config: Config) -> ReportRun:
+        started_at = time.perf_counter()
+        error = None
+        try:
+            task(Reporter(logger=logger.getChild(config_name), config=config, shared=shared))
+        except Exception as e:
+            logger.error(f"Run for {config_name} failed: {e}")
+            error = str(e)
+        return ReportRun(config_name=config_name, wall_seconds=time.perf_counter() - started_at, error=error)
+
+    with ThreadPoolExecutor(max_workers=max(len(configs), 1), thread_name_prefix="report") as executor:
+        runs = list(executor.map(run, configs.keys(), configs.values()))
+
+    for report_run in runs:
+        outcome = f"failed: {report_run.error}" if report_run.error else "done"
+        logger.info(f"{report_run.config_name}: {outcome} in {report_run.wall_seconds:.1f}s")
+    return runs
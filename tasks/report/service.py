@@ -3,33 +3,182 @@ The reporter service is responsible for generating the project report.
 '''
 import sys
 import os
+import time
 import logging
+import queue
+import threading
 import yaml
 import redis
 from datetime import datetime, timedelta
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cached_property
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List
 from tqdm import tqdm
 sys.path.append(os.environ['PROJECT_PATH'])
-from tools.linear import LinearClient
+from tools.linear import LinearClient, RequestPriority
 from tools.slack import SlackClient
 from models.linear import ProjectStates, Project, ProjectStatus
-from models.report import Reminder, Config, Report, RiskUpdate, ReminderType
-from tools.decider import Decider
-from tools.writer import Writer
+from models.report import Reminder, Config, Report, RiskUpdate, ReminderType, ProjectAnalysis, ReportCheckpoint
+from tools.cache import ResponseCache, redis_client
+from tasks.report.store import AnalysisStore
+from tasks.report.checkpoints import CheckpointStore, new_run_id
+from tasks.report.prompts import render_project_for_status, render_latest_update
+from tools.prompt import PromptCompactor
+from tools.metrics import record_report_delivery
 
 PROJECT_UPDATE_CUTOFF_DAYS = 5
+# Report field filled in by each section, in the order the sections appear in the message
+REPORT_SECTIONS = {"best update": "best_update", "risks": "risks", "reminders": "reminders"}
+
+DEFAULT_CONFIG_PATH = "config/report.yaml"
+# Reports starting within this long of each other reuse the same fetch of the current projects
+SHARED_PROJECTS_MAX_AGE_SECONDS = 60
+# Projects analysed together, in a single status classification call
+ANALYSIS_CHUNK_SIZE = 20
+
+def load_config(path: str = DEFAULT_CONFIG_PATH) -> Config:
+    with open(os.path.join(os.environ['PROJECT_PATH'], path), 'r') as file:
+        config_data = yaml.safe_load(file)
+    return Config(**config_data)
+
+# The clients that don't depend on the report config, and the projects fetched with them. Reports for several configs
+# running in one process share them, and so their connection pools, the Linear rate limit budget, the Slack user
+# directory and a single fetch of the current projects per scope of project states and teams. Given `llm_concurrency`,
+# they also share a single limit on the LLM calls in flight.
+class SharedClients:
+    def __init__(self, logger=logging.getLogger(__name__), llm_concurrency: int = None):
+        self.logger = logger
+        self.llm_limit = threading.BoundedSemaphore(llm_concurrency) if llm_concurrency else None
+        # scope -> the stream of its latest fetch
+        self._projects = {}
+        self._projects_lock = threading.Lock()
+
+    @cached_property
+    def linear(self) -> LinearClient:
+        # report fetches yield to interactive ticket creation when the Linear rate limit budget runs low
+        return LinearClient(self.logger, priority=RequestPriority.BACKGROUND)
+
+    @cached_property
+    def slack(self) -> SlackClient:
+        return SlackClient(logger=self.logger)
+
+    @cached_property
+    def cache(self) -> redis.Redis:
+        return redis_client()
+
+    # Builds the clients up front, so that workers started afterwards share a single instance of each
+    def warm(self):
+        self.linear
+        self.slack
+        self.cache
+
+    # Yields the current projects of the scope as they arrive. Reports of the same scope share a single fetch, which is
+    # fetched again once it's older than SHARED_PROJECTS_MAX_AGE_SECONDS, or if it failed.
+    def iter_current_projects(self, states: List[ProjectStates], team_names: List[str]) -> Iterator[Project]:
+        scope = (tuple(sorted(states)), tuple(sorted(team_names)))
+        with self._projects_lock:
+            stream = self._projects.get(scope)
+            if stream is None or stream.error or time.monotonic() - stream.started_at > SHARED_PROJECTS_MAX_AGE_SECONDS:
+                # state and team filters are applied by Linear, so a handful of paginated requests fetch everything
+                stream = ProjectStream(self.linear.iter_projects(list(states), list(team_names), details=True))
+                self._projects[scope] = stream
+        return iter(stream)
+
+    def get_current_projects(self, states: List[ProjectStates], team_names: List[str]) -> List[Project]:
+        return list(self.iter_current_projects(states, team_names))
+
+# The projects of a single fetch, kept as they arrive, so that every report reading them starts on the first page while
+# later pages are still being fetched, and reports starting later replay them without fetching again
+class ProjectStream:
+    def __init__(self, projects: Iterator[Project]):
+        self.source = projects
+        self.projects = []
+        self.done = False
+        self.error = None
+        # held while taking the next project from the source, which a single reader at a time can do
+        self.lock = threading.Lock()
+        self.started_at = time.monotonic()
+
+    # Yields copies of the projects, as every report sets the status on its own copies
+    def __iter__(self) -> Iterator[Project]:
+        idx = 0
+        while True:
+            with self.lock:
+                if idx == len(self.projects) and not self.done:
+                    self._take_next()
+                if idx == len(self.projects):
+                    return
+                project = self.projects[idx]
+            idx += 1
+            yield project.model_copy()
+
+    # A failed fetch fails every reader, rather than ending the stream early for the readers after the first
+    def _take_next(self):
+        if self.error:
+            raise self.error
+        try:
+            self.projects.append(next(self.source))
+        except StopIteration:
+            self.done = True
+        except Exception as e:
+            self.error = e
+            raise e
 
 class Reporter:
-    def __init__(self, logger=logging.getLogger(__name__)):
+    def __init__(self, logger=logging.getLogger(__name__), config: Config = None, shared: SharedClients = None):
         self.logger = logger
-        self.linear = LinearClient(logger)
-        self.decider = Decider(logger=logger, model="gpt-4o")
-        with open(f"{os.environ['PROJECT_PATH']}/config/report.yaml", 'r') as file:
-            config_data = yaml.safe_load(file)
-        self.config = Config(**config_data)
-        self.writer = Writer(logger=logger, model="gpt-4o")
-        self.slack = SlackClient(logger=logger)
-        self.cache = redis.Redis()
+        self.config = config or load_config()
+        self.prompts = PromptCompactor(self.config.prompt_token_budget)
+        self.shared = shared or SharedClients(logger)
+
+    # Clients are built on first use, so that a run only pays for the clients it needs, e.g. reminders never use an LLM
+
+    @property
+    def linear(self) -> LinearClient:
+        return self.shared.linear
+
+    # Held for every LLM call, whichever of the report's thread pools makes it
+    @cached_property
+    def llm_limit(self) -> threading.Semaphore:
+        return self.shared.llm_limit or threading.BoundedSemaphore(self.config.llm_concurrency)
+
+    @cached_property
+    def llm_cache(self) -> ResponseCache:
+        return ResponseCache.from_config(self.config.llm_cache, self.logger) if self.config.llm_cache else None
+
+    # The LLM clients are imported here, as importing openai and instructor takes longer than the rest of the reporter
+    @cached_property
+    def decider(self):
+        from tools.decider import Decider
+        return Decider(logger=self.logger, model="gpt-4o", cache=self.llm_cache, limit=self.llm_limit)
+
+    @cached_property
+    def writer(self):
+        from tools.writer import Writer
+        return Writer(logger=self.logger, model="gpt-4o", cache=self.llm_cache, limit=self.llm_limit)
+
+    @property
+    def slack(self) -> SlackClient:
+        return self.shared.slack
+
+    @property
+    def cache(self) -> redis.Redis:
+        return self.shared.cache
+
+    @cached_property
+    def analyses(self) -> AnalysisStore:
+        return AnalysisStore(self.cache, self.logger)
+
+    @cached_property
+    def checkpoints(self) -> CheckpointStore:
+        return CheckpointStore(self.config.checkpoint_path, self.logger)
+
+    # Builds the clients the report sections use before they run concurrently, so that they share a single instance of each
+    def _warm_clients(self):
+        self.decider
+        self.writer
+        self.analyses
 
     def send_reminder(self, type: ReminderType):
         current_projects = self._get_current_projects()
@@ -40,15 +189,107 @@ class Reporter:
             reminder_block = self._get_reminder_block(reminders=reminders, intro="Hey team! A gentle reminder to the following folks to update/add new project milestones today, for next sprint's planning:")
         self.slack.post_message(blocks=[reminder_block], channel_id=self.config.reporting_channel_id)
                
-    def trigger_report(self):
-        report = None
-        report = self._generate_report()
+    # Posts the report as soon as the projects are fetched, with the counts, and fills in every section with an
+    # update to the same message as soon as it's ready. A section that fails is flagged, without losing the others.
+    # Every completed stage is checkpointed, and given the id of an earlier run, the run resumes from its checkpoint:
+    # only the sections that didn't complete are generated, and the report's message is updated in place.
+    def trigger_report(self, run_id: str = None):
+        started_at = time.perf_counter()
+        self.delivery_seconds = {}
+        if run_id:
+            checkpoint = self.checkpoints.load(run_id)
+            self.logger.info(f"Resuming report run {run_id}, completed: {', '.join(checkpoint.completed) or 'nothing'}")
+        else:
+            self.checkpoints.prune()
+            checkpoint = ReportCheckpoint(run_id=new_run_id(), report=Report(), completed=[], failed=[])
+            self.logger.info(f"Generating report, run {checkpoint.run_id} ...")
+        report = checkpoint.report
+        self._warm_clients()
+
+        with ThreadPoolExecutor(max_workers=len(REPORT_SECTIONS)) as executor:
+            futures = {}
+            if "projects" not in checkpoint.completed:
+                # projects with an update are analysed as they arrive, while later pages are still being fetched
+                projects_with_updates = queue.Queue()
+                futures[executor.submit(self.analyse_projects, iter(projects_with_updates.get, None))] = "risks"
+                try:
+                    report.projects_with_updates, report.projects_without_updates = self._split_projects_by_update(
+                        self._iter_current_projects(), on_project_with_update=projects_with_updates.put)
+                finally:
+                    projects_with_updates.put(None)
+                self._save_checkpoint(checkpoint, completed="projects")
+            sections = {section: task for section, task in self._get_sections(report).items() if section not in checkpoint.completed}
+            pending, checkpoint.failed = list(sections), []
+            self._deliver_report(checkpoint, pending, "first_content", started_at)
+
+            for section, (fn, projects) in sections.items():
+                if section not in futures.values():
+                    futures[executor.submit(fn, projects)] = section
+            for future in as_completed(futures):
+                section = futures[future]
+                try:
+                    setattr(report, REPORT_SECTIONS[section], future.result())
+                    checkpoint.completed.append(section)
+                except Exception as e:
+                    self.logger.error(f"Generating the {section} section failed: {e}")
+                    checkpoint.failed.append(section)
+                pending.remove(section)
+                self._deliver_report(checkpoint, pending, section, started_at)
+
         self.logger.debug(f"Report: {report}")
-        slack_message_blocks = self._write_slack_message(report)
-        self.slack.post_message(blocks=slack_message_blocks, channel_id=self.config.reporting_channel_id)
-        self.logger.info(f"Report sent to {self.config.reporting_channel_id}")
+        self.logger.info(f"Prompt compaction trimmed {self.prompts.stats.tokens_trimmed} tokens across {self.prompts.stats.prompts} prompts")
+        self._record_delivery("complete", started_at)
+        self.logger.info(f"Report of run {checkpoint.run_id} sent to {self.config.reporting_channel_id}, first content after "
+                         f"{self.delivery_seconds['first_content']:.1f}s, complete after {self.delivery_seconds['complete']:.1f}s")
         return
 
+    # Renders the report of an earlier run from its checkpoint and posts it as a new message, without fetching or
+    # generating anything. Sections the run didn't complete are flagged.
+    def repost_report(self, run_id: str):
+        started_at = time.perf_counter()
+        self.delivery_seconds = {}
+        checkpoint = self.checkpoints.load(run_id)
+        if "projects" not in checkpoint.completed:
+            raise ValueError(f"Report run {run_id} didn't get as far as fetching the projects, resume it instead")
+        checkpoint.failed = [section for section in self._get_sections(checkpoint.report) if section not in checkpoint.completed]
+        checkpoint.message_ts = None
+        self._deliver_report(checkpoint, [], "repost", started_at)
+        self.logger.info(f"Report of run {run_id} posted again to {self.config.reporting_channel_id}")
+
+    # The sections of the report, each with the function that generates it and the projects it takes
+    def _get_sections(self, report: Report) -> dict[str, tuple[Callable, List[Project]]]:
+        sections = {"reminders": (self._get_reminders, report.projects_without_updates),
+                    "risks": (self.analyse_projects, report.projects_with_updates)}
+        if report.projects_with_updates:
+            sections["best update"] = (self._get_best_update, report.projects_with_updates)
+        return sections
+
+    def _save_checkpoint(self, checkpoint: ReportCheckpoint, completed: str = None):
+        if completed:
+            checkpoint.completed.append(completed)
+        self.checkpoints.save(checkpoint)
+
+    # Posts the report on the first call, and updates the posted message on later ones. If an update fails, the
+    # report so far is posted as a new message, so that later sections aren't lost with it. The rendered blocks are
+    # checkpointed before they're sent, and the message they were sent as after.
+    def _deliver_report(self, checkpoint: ReportCheckpoint, pending: List[str], stage: str, started_at: float):
+        checkpoint.blocks = self._write_slack_message(checkpoint.report, pending=pending, failed=checkpoint.failed)
+        self._save_checkpoint(checkpoint)
+        if checkpoint.message_ts:
+            try:
+                self.slack.update_message(channel_id=self.config.reporting_channel_id, message_ts=checkpoint.message_ts, blocks=checkpoint.blocks)
+                self._record_delivery(stage, started_at)
+                return
+            except Exception as e:
+                self.logger.error(f"Updating the report failed, posting it again: {e}")
+        checkpoint.message_ts = self.slack.post_message(blocks=checkpoint.blocks, channel_id=self.config.reporting_channel_id)
+        self._save_checkpoint(checkpoint)
+        self._record_delivery(stage, started_at)
+
+    def _record_delivery(self, stage: str, started_at: float):
+        self.delivery_seconds[stage] = time.perf_counter() - started_at
+        record_report_delivery(stage, self.delivery_seconds[stage])
+
     def _get_best_update(self, projects: List[Project]) -> Project:
         # ignore all projects by admin, if admin is populated
         if self.config.admin_user_email:
@@ -62,10 +303,7 @@ highlight it in the report and share it with the team."
             "Update flags risks, if any, to the set timelines and provides a clear path forward",
             "Update reflects on misses, if any, and how they were addressed",
         ]
-        options = []
-        for project in projects:
-                latest_update = project.project_updates.nodes[0]
-                options.append(f"{project.name} - {latest_update.body}")
+        options = [render_latest_update(project, self.prompts) for project in projects]
         best_project_index, chain_of_thought = self.decider.get_best_option(context, options, criteria, with_chain_of_thought=True)
         
         self.logger.info(f"Best updated project: {projects[best_project_index].name}")
@@ -98,8 +336,9 @@ highlight it in the report and share it with the team."
             }
         return block
 
-    def _write_slack_message(self, report: Report):
-        
+    # Sections still pending get a placeholder, and sections that failed are flagged
+    def _write_slack_message(self, report: Report, pending: List[str] = None, failed: List[str] = None):
+        pending, failed = pending or [], failed or []
         message_blocks = []
         
         message_blocks.append({
@@ -169,6 +408,21 @@ highlight it in the report and share it with the team."
             })
             message_blocks.append(self._get_reminder_block(reminders=report.reminders,
                 intro="The following projects are missing an update from their leads -- a gentle reminder to add one ASAP:"))
+        status_notes = []
+        if pending:
+            status_notes.append(f"⏳ Still putting together the {', '.join([section for section in REPORT_SECTIONS if section in pending])} ...")
+        if failed:
+            status_notes.append(f"⚠️ Couldn't put together the {', '.join([section for section in REPORT_SECTIONS if section in failed])} this time.")
+        if status_notes:
+            message_blocks.append({
+                "type": "context",
+                "elements": [
+                    {
+                        "type": "mrkdwn",
+                        "text": "\n".join(status_notes)
+                    }
+                ]
+            })
         cc_user_id = self.config.reporting_cc
         if cc_user_id:
             message_blocks.append({
@@ -182,83 +436,152 @@ highlight it in the report and share it with the team."
             })
         return message_blocks
 
-    def _get_project_risks(self, projects: List[Project]) -> List[RiskUpdate]:
-        risky_projects = [project for project in projects if project.status is not ProjectStatus.ON_TRACK]
+    # Runs `fn` over `items` on a bounded thread pool and returns the results in input order.
+    # An item that fails is logged and yields None, without affecting the others.
+    def _map_concurrently(self, fn: Callable, items: list, desc: str) -> list:
+        results = [None] * len(items)
+        if not items:
+            return results
+        with ThreadPoolExecutor(max_workers=self.config.llm_concurrency) as executor:
+            futures = {executor.submit(fn, item): idx for idx, item in enumerate(items)}
+            for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+                idx = futures[future]
+                try:
+                    results[idx] = future.result()
+                except Exception as e:
+                    self.logger.error(f"{desc} failed for item {idx}: {e}")
+        return results
+
+    # Returns the risks of the risky projects by project id, leaving out projects whose risk summary failed
+    def _get_project_risks(self, projects: List[Project]) -> dict[str, RiskUpdate]:
+        risky_projects = [project for project in projects if project.status in [ProjectStatus.AT_RISK, ProjectStatus.OFF_TRACK]]
         self.logger.info(f"Getting risks for {len(risky_projects)} projects")
-        
-        project_risks = []
-        
-        for project in tqdm(risky_projects, desc="Processing risky projects"):
-            risk_update = self.writer.parse(
-                context='''Project leads have provided updates on projects that are off track, or at risk. Our goal is to write an excellent
+        project_risks = self._map_concurrently(self._get_project_risk, risky_projects, desc="Processing risky projects")
+        return {project.id: risk_update for project, risk_update in zip(risky_projects, project_risks) if risk_update is not None}
+
+    def _get_project_risk(self, project: Project) -> RiskUpdate:
+        risk_update = self.writer.parse(
+            context='''Project leads have provided updates on projects that are off track, or at risk. Our goal is to write an excellent
 executive summary of the risk with these projects and emphasize on the WHY by taking insights from the shared update. The output MUST
 be in the provided output format.
 ''',
-                input=f"{project.name} - {project.project_updates.nodes[0].body}",
-                output_model=RiskUpdate
-            )
-            self.logger.debug(risk_update)
-            risk_update.project_name = project.name
-            project_risks.append(risk_update)
-        return project_risks
+            input=render_latest_update(project, self.prompts),
+            output_model=RiskUpdate
+        )
+        self.logger.debug(risk_update)
+        risk_update.project_name = project.name
+        return risk_update
 
     def _enrich_projects_with_status(self, projects: List[Project]) -> List[Project]:
-        for idx, project in tqdm(enumerate(projects), desc="Updating project statuses"):
-            status_idx = self.decider.get_best_option(
-                context=f'''Project Leads have provided updates on the projects they are leading. Based on the provided updates, you have to figure out 
-what's the best current status for the project. Here are the details about the project:
-{project.model_dump_json()}''', 
-                options=[status.value for status in ProjectStatus],
-                criteria=[
-                    "If the project lead explicitly mentions the project's status, then that's the obvious correct choice.",
-                    "If the lead flags a risk, or a delay, in the project, then the status should be set accordingly.",
-                    "Use the project's latest update to infer the status.",
-                ])
-            projects[idx].status = list(ProjectStatus)[status_idx] 
+        # all projects share the options and criteria, so they are classified together in as few calls as possible
+        status_idxs = self.decider.classify_items(
+            context='''Project Leads have provided updates on the projects they are leading. Based on the provided updates, you have to figure out 
+what's the best current status for each project. Each item holds the details about one project.''',
+            items=[render_project_for_status(project, self.prompts) for project in projects],
+            options=[status.value for status in ProjectStatus],
+            criteria=[
+                "If the project lead explicitly mentions the project's status, then that's the obvious correct choice.",
+                "If the lead flags a risk, or a delay, in the project, then the status should be set accordingly.",
+                "Use the project's latest update to infer the status.",
+            ],
+            concurrency=self.config.llm_concurrency)
+        for project, status_idx in zip(projects, status_idxs):
+            project.status = list(ProjectStatus)[status_idx] if status_idx is not None else None
         return projects
 
-    def _generate_report(self) -> Report:
-        self.logger.info(f"Generating report ...")
-        current_projects = self._get_current_projects()
-        
+    # Sets the status of every project and returns the risks for the risky ones, in the order of the projects. Projects
+    # are analysed in chunks as they arrive, so the analysis starts while later pages of the projects are still being
+    # fetched.
+    def analyse_projects(self, projects: Iterable[Project]) -> List[RiskUpdate]:
+        projects = iter(projects)
+        with ThreadPoolExecutor(max_workers=self.config.llm_concurrency) as executor:
+            futures = []
+            while chunk := list(islice(projects, ANALYSIS_CHUNK_SIZE)):
+                futures.append(executor.submit(self._analyse_chunk, chunk))
+            return [risk for future in futures for risk in future.result()]
+
+    # Projects whose latest update was already analysed reuse the stored status and risk; only projects with a new
+    # update are sent to the LLM.
+    def _analyse_chunk(self, projects: List[Project]) -> List[RiskUpdate]:
+        stored_analyses = self.analyses.get_many([project.id for project in projects])
+        stale_projects = []
+        for project in projects:
+            analysis = stored_analyses.get(project.id)
+            if analysis and analysis.update_id == project.project_updates.nodes[0].id:
+                project.status = analysis.status
+            else:
+                stale_projects.append(project)
+        self.logger.info(f"Analysing {len(stale_projects)} projects with new updates, reusing {len(projects) - len(stale_projects)} analyses")
+
+        self._enrich_projects_with_status(stale_projects)
+        new_risks = self._get_project_risks(stale_projects)
+
+        new_analyses = []
+        for project in stale_projects:
+            if project.status is None:
+                continue
+            risk = new_risks.get(project.id)
+            # a risky project whose risk summary failed is analysed again on the next run
+            if project.status is not ProjectStatus.ON_TRACK and risk is None:
+                continue
+            new_analyses.append(ProjectAnalysis(project_id=project.id, update_id=project.project_updates.nodes[0].id,
+                                                status=project.status, risk=risk))
+        self.analyses.save_many(new_analyses)
+
+        stale_project_ids = set(project.id for project in stale_projects)
+        risks = []
+        for project in projects:
+            if project.status not in [ProjectStatus.AT_RISK, ProjectStatus.OFF_TRACK]:
+                continue
+            if project.id in stale_project_ids:
+                risk = new_risks.get(project.id)
+            else:
+                risk = stored_analyses[project.id].risk
+            if risk:
+                risks.append(risk)
+        return risks
+
+    # Whether the report covers the project, by its state and teams
+    def covers_project(self, project: Project) -> bool:
+        team_names = [team.name for team in project.teams.nodes] if project.teams else []
+        return project.state in self.config.project_states and any(team_name in self.config.team_names for team_name in team_names)
+
+    # Analyses a single project ahead of the report, e.g. when Linear notifies us of a new project update. The project is
+    # fetched unless it's given, so that reporters for several configs can share a fetch.
+    def precompute_project(self, project_id: str, project: Project = None):
+        project = (project or self.linear.get_project_by_id(project_id)).model_copy()
+        if not self.covers_project(project) or not project.project_updates or not project.project_updates.nodes:
+            self.logger.info(f"Skipping precomputation for {project.name}")
+            return
+        self.analyse_projects([project])
+        self.logger.info(f"Precomputed status for {project.name}: {project.status}")
+
+    # Splits projects into those with an update in the last few days, and those without, as they arrive. Each project
+    # with an update is also handed to `on_project_with_update`, so that the next stage can start on it right away.
+    def _split_projects_by_update(self, projects: Iterable[Project], on_project_with_update: Callable[[Project], None] = None
+                                  ) -> tuple[List[Project], List[Project]]:
         projects_with_updates, projects_without_updates = [], []
-        for project in current_projects:
+        for project in projects:
             if not project.project_updates or len(project.project_updates.nodes) == 0:
                 projects_without_updates.append(project)
                 continue
             
             created_at_timestamp = datetime.strptime(project.project_updates.nodes[0].created_at, "%Y-%m-%dT%H:%M:%S.%fZ")
             
-            if project.project_updates and \
-                len(project.project_updates.nodes) > 0 and \
-                created_at_timestamp > datetime.now() - timedelta(days=PROJECT_UPDATE_CUTOFF_DAYS):
+            if created_at_timestamp > datetime.now() - timedelta(days=PROJECT_UPDATE_CUTOFF_DAYS):
                 projects_with_updates.append(project)
+                if on_project_with_update:
+                    on_project_with_update(project)
                 
             else:
                 projects_without_updates.append(project)
                 
         self.logger.info(f"{len(projects_with_updates)} projects with updates, {len(projects_without_updates)} projects without updates")
-        
-        projects_with_updates = self._enrich_projects_with_status(projects_with_updates)
-
-        return Report(
-            reminders=self._get_reminders(projects_without_updates),
-            best_update=self._get_best_update(projects_with_updates),
-            risks=self._get_project_risks(projects_with_updates),
-            projects_with_updates=projects_with_updates,
-            projects_without_updates=projects_without_updates
-        )
+        return projects_with_updates, projects_without_updates
 
     def _get_current_projects(self) -> List[Project]:
-        projects = self.linear.list_projects()
-        projects = [project for project in projects if project.state in [ProjectStates.STARTED]]
-        current_projects = []
-        for project in tqdm(projects):
-            fetched_project = self.linear.get_project_by_id(project.id)
-            for team in fetched_project.teams.nodes:
-                if team.is_epd():
-                    current_projects.append(fetched_project)
-                    break
-            
-        return current_projects
+        return self.shared.get_current_projects(self.config.project_states, self.config.team_names)
+
+    def _iter_current_projects(self) -> Iterator[Project]:
+        return self.shared.iter_current_projects(self.config.project_states, self.config.team_names)
 
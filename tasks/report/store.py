@@ -0,0 +1,50 @@
+'''
+The analysis store persists, per project, the latest project update the reporter analysed along with the resulting
+status and risk, so that later runs only spend LLM calls on projects with a new update.
+'''
+import os
+import sys
+import logging
+import redis
+sys.path.append(os.environ['PROJECT_PATH'])
+from models.report import ProjectAnalysis
+
+ANALYSIS_KEY_PREFIX = "taskie:report:analysis"
+ANALYSIS_TTL_SECONDS = 90 * 24 * 60 * 60
+
+class AnalysisStore:
+    def __init__(self, cache: redis.Redis, logger=logging.getLogger(__name__)):
+        self.cache = cache
+        self.logger = logger
+
+    def _key(self, project_id: str) -> str:
+        return f"{ANALYSIS_KEY_PREFIX}:{project_id}"
+
+    def get_many(self, project_ids: list[str]) -> dict[str, ProjectAnalysis]:
+        if not project_ids:
+            return {}
+        try:
+            values = self.cache.mget([self._key(project_id) for project_id in project_ids])
+        except redis.RedisError as e:
+            self.logger.warning(f"Reading project analyses failed, analysing all projects: {e}")
+            return {}
+        analyses = {}
+        for project_id, value in zip(project_ids, values):
+            if value is None:
+                continue
+            try:
+                analyses[project_id] = ProjectAnalysis.model_validate_json(value)
+            except Exception as e:
+                self.logger.warning(f"Ignoring unreadable analysis for project {project_id}: {e}")
+        return analyses
+
+    def save_many(self, analyses: list[ProjectAnalysis]):
+        if not analyses:
+            return
+        try:
+            pipeline = self.cache.pipeline()
+            for analysis in analyses:
+                pipeline.setex(self._key(analysis.project_id), ANALYSIS_TTL_SECONDS, analysis.model_dump_json())
+            pipeline.execute()
+        except redis.RedisError as e:
+            self.logger.warning(f"Saving project analyses failed: {e}")
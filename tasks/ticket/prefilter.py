@@ -0,0 +1,72 @@
+'''
+The pre-filter rejects messages that are obviously not ticket-worthy (thank-yous, emoji-only messages, bot echoes, join
+notices) using local rules only, before the ticketer spends a Slack call and an LLM call deciding on them.
+'''
+import os
+import re
+import sys
+import logging
+import threading
+from typing import Optional
+from pydantic import BaseModel
+sys.path.append(os.environ['PROJECT_PATH'])
+from models.slack import Message
+from models.ticket import TicketerConfig, PreFilterConfig
+
+# emoji shortcodes, user/channel mentions and links carry no content of their own
+NOISE_PATTERN = re.compile(r":[a-z0-9_+\-']+:|<[@#!][^>]*>|<https?://[^>]*>")
+NON_WORD_PATTERN = re.compile(r"[^\w\s]+|_")
+# the worthiness check costs one conversations.info call and one LLM call
+LLM_CALLS_PER_CHECK = 1
+
+class PreFilterStats(BaseModel):
+    checked: int = 0
+    rejected: int = 0
+    llm_calls_saved: int = 0
+    rejections_by_reason: dict[str, int] = {}
+
+class CompiledRules:
+    def __init__(self, config: PreFilterConfig):
+        self.min_length = config.min_length
+        self.allow_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in config.allow_patterns]
+        self.deny_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in config.deny_patterns]
+        self.ignored_subtypes = set(config.ignored_subtypes)
+
+class PreFilter:
+    def __init__(self, config: TicketerConfig, logger=logging.getLogger(__name__)):
+        self.logger = logger
+        self.default_rules = CompiledRules(config.prefilter)
+        self.channel_rules = {
+            channel_config.channel_id: CompiledRules(channel_config.prefilter)
+            for channel_config in config.slack_channel_configs if channel_config.prefilter
+        }
+        self.stats = PreFilterStats()
+        self.lock = threading.Lock()
+
+    # Returns why the message was rejected, or None if it should go on to the worthiness check
+    def rejection_reason(self, message: Message) -> Optional[str]:
+        rules = self.channel_rules.get(message.channel_id, self.default_rules)
+        if message.subtype in rules.ignored_subtypes:
+            return f"subtype:{message.subtype}"
+        if message.bot_id:
+            return "bot"
+        if any(pattern.search(message.text) for pattern in rules.allow_patterns):
+            return None
+        if any(pattern.search(message.text) for pattern in rules.deny_patterns):
+            return "deny_pattern"
+        content = " ".join(NON_WORD_PATTERN.sub(" ", NOISE_PATTERN.sub(" ", message.text)).split())
+        if len(content) < rules.min_length:
+            return "too_short"
+        return None
+
+    def allows(self, message: Message) -> bool:
+        reason = self.rejection_reason(message)
+        with self.lock:
+            self.stats.checked += 1
+            if reason:
+                self.stats.rejected += 1
+                self.stats.llm_calls_saved += LLM_CALLS_PER_CHECK
+                self.stats.rejections_by_reason[reason] = self.stats.rejections_by_reason.get(reason, 0) + 1
+        if reason:
+            self.logger.info(f"Pre-filter rejected message ({reason}), {self.stats.llm_calls_saved} LLM calls saved so far")
+        return reason is None
@@ -6,96 +6,219 @@ import os
 import logging
 import yaml
 import uuid
+import asyncio
+from typing import Optional
+from pydantic import ValidationError
 from rich import print as rprint
 sys.path.append(os.environ['PROJECT_PATH'])
-from tools.linear import LinearClient
+from tools.linear import LinearClient, MetadataCache
 from tools.slack import SlackClient
 from tools.decider import Decider
 from tools.writer import Writer
 from models.slack import Message
 from models.linear import Ticket, Team, TicketState, TicketLabel
-from models.ticket import TicketerConfig
+from models.ticket import TicketerConfig, TicketPlan
+from tasks.ticket.prefilter import PreFilter
+from tools.metrics import record_event
+from tools.cache import redis_client
 
 
 BASE_CONTEXT = "We are creating a Linear ticket to take further action, \
 based on the shared Slack message. You'd be shared the content of the Slack message."
+WORTHINESS_CRITERIA = [
+    "The message expresses a problem, a suggestion, or an improvement with the intent of getting it resolved",
+    "The message REQUIRES further action, and isn't an FYI on an action already taken",
+    "The message is not a general announcement or a social message",
+]
+
+# Namespace for the ids of tickets created from Slack messages
+TICKET_ID_NAMESPACE = uuid.UUID("6f1c2b1e-4d3a-5b8e-9c7f-2a1d0e3b4c5d")
+
+# The ticket for a Slack event always gets the same id, so a redelivered event finds the ticket created for it, and
+# Linear, which rejects a second ticket with the same id, never creates two
+def ticket_id_for_event(event: Message, event_id: str = None) -> str:
+    return str(uuid.uuid5(TICKET_ID_NAMESPACE, event_id or f"{event.channel_id}:{event.timestamp}"))
+
+def get_worthiness_context(channel_name: str) -> str:
+    return f'''- Someone has posted a Slack message on a channel: {channel_name}.
+- We're evaluating whether the message requires further action, through the creation of a Linear ticket or not.
+- A Linear ticket if required if the message flags an issue, suggestion, or improvement which requires some action to be taken.
+- The message might often not have enough context to be directly actionable, but that's okay, what matters is the intent behind the message.
+'''
 class Ticketer:
-    def __init__(self, logger=logging.getLogger(__name__)):
-        self.linear = LinearClient(logger)
+    def __init__(self, logger=logging.getLogger(__name__), config: TicketerConfig = None):
+        self.linear = LinearClient(logger, metadata_cache=MetadataCache(logger=logger, redis_client=redis_client()))
         self.decider = Decider(model="gpt-4-turbo", logger=logger)
         self.writer = Writer(model="gpt-4-turbo", logger=logger)
         self.slack = SlackClient()
         self.logger = logger
-        with open(f"{os.environ['PROJECT_PATH']}/config/ticket_config.yaml", 'r') as file:
-            config_data = yaml.safe_load(file)
-        self.config = TicketerConfig(**config_data)
+        if config is None:
+            with open(f"{os.environ['PROJECT_PATH']}/config/ticket_config.yaml", 'r') as file:
+                config_data = yaml.safe_load(file)
+            config = TicketerConfig(**config_data)
+        self.config = config
+        self.prefilter = PreFilter(self.config, logger)
     
+    # Loads the teams and their states, which every ticket reads, into the metadata cache in two requests, so that the
+    # first tickets after a start don't wait for them
+    def prefetch_metadata(self):
+        self.linear.prefetch_metadata(include_labels=False)
+
     def is_relevant(self, event: Message) -> bool:
         return event.channel_id in [config.channel_id for config in self.config.slack_channel_configs]
     
-    def trigger_ticket_creation(self, event: Message):
+    # `event_id` is the id Slack gave the event, if known, which the ticket's id is derived from
+    def trigger_ticket_creation(self, event: Message, event_id: str = None):
         print(f"Event: {event.model_dump_json()}")
         if event.is_reply:
             # TODO: check if parent message has a ticket associated with it
             # if no, then consider this ticket for ticket creation
             # BUG: this logic is faulty. `is reply` is true for all messages in a thread, including the parent message
+            record_event("reply")
             return
-        if not self._is_ticket_worthy(event):
+        if not self.prefilter.allows(event):
+            record_event("prefiltered")
             return
-        ticket = self._parse_ticket(event)
-        self.linear.create_ticket(ticket)
-        self.linear.attach_slack_message_to_ticket(ticket)
-        ticket.url = self.linear.get_ticket_by_id(ticket.id).url
-        self.slack.reply_in_thread(event.channel_id, f"Ticket created: {ticket.url}\n\ncc <@{self.config.slack_admin_user_id}>", event.timestamp)
-        
-    def _is_ticket_worthy(self, event: Message) -> bool:
-        channel = self.slack.get_channel_by_id(event.channel_id)
+        asyncio.run(self._run_pipeline(event, ticket_id_for_event(event, event_id)))
+
+    # The pipeline runs as a dependency graph: independent Slack and Linear lookups start together, and each step
+    # starts as soon as its inputs are ready. The clients are blocking, so every call runs on a thread.
+    async def _run_pipeline(self, event: Message, ticket_id: str):
+        existing_task = asyncio.create_task(asyncio.to_thread(self.linear.find_ticket_by_id, ticket_id))
+        channel_task = asyncio.create_task(asyncio.to_thread(self.slack.get_channel_by_id, event.channel_id))
+        permalink_task = asyncio.create_task(asyncio.to_thread(self.slack.get_permalink_for_message, event))
+        metadata_task = asyncio.create_task(self._get_team_states())
+        tasks = [existing_task, channel_task, permalink_task, metadata_task]
+        try:
+            # an earlier attempt at this event got as far as creating the ticket, so only the steps after it are redone
+            existing_ticket = await existing_task
+            if existing_ticket is not None:
+                self.logger.info(f"Ticket {ticket_id} already exists for this message, skipping creation")
+                existing_ticket.slack_message_url = await permalink_task
+                await asyncio.to_thread(self.linear.attach_slack_message_to_ticket, existing_ticket)
+                self._reply_ticket_created(event, existing_ticket)
+                return
+            ticket = None
+            if self.config.use_ticket_plan:
+                try:
+                    channel, (teams, team_states) = await asyncio.gather(channel_task, metadata_task)
+                    plan, team, state = await asyncio.to_thread(self._plan_ticket, event, channel, teams, team_states)
+                    if not plan.is_ticket_worthy:
+                        record_event("rejected")
+                        if plan.follow_up:
+                            self._ask_follow_up(event, plan.follow_up)
+                        return
+                    ticket = Ticket(id=ticket_id, title=plan.title, description=event.text, team=team, state=state)
+                # only a plan that doesn't parse or validate falls back, errors calling OpenAI are raised
+                except (ValueError, ValidationError) as e:
+                    self.logger.warning(f"Ticket plan failed, falling back to one call per decision: {e}")
+            if ticket is None:
+                ticket = await self._decide_ticket(event, ticket_id, channel_task, metadata_task, tasks)
+                if ticket is None:
+                    record_event("rejected")
+                    return
+            ticket.slack_message_url = await permalink_task
+            self.logger.debug(f"Ticket: {ticket.model_dump()}")
+            # creating the ticket, attaching the message and reading the URL back share one request
+            await asyncio.to_thread(self.linear.create_ticket_with_slack_message, ticket)
+            record_event("ticketed")
+            self._reply_ticket_created(event, ticket)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # Replies are sent in the background, so that a burst of tickets isn't held up by Slack's rate limits
+    def _reply_ticket_created(self, event: Message, ticket: Ticket):
+        self.slack.queue_reply(event.channel_id, f"Ticket created: {ticket.url}\n\ncc <@{self.config.slack_admin_user_id}>", event.timestamp)
+
+    # Decides worthiness, title, team and state with one LLM call each. Title, team and state are decided speculatively
+    # while worthiness is pending, and cancelled if the message is rejected. Calls already running on a thread finish,
+    # but nothing that depends on them is started.
+    async def _decide_ticket(self, event: Message, ticket_id: str, channel_task: asyncio.Task, metadata_task: asyncio.Task, tasks: list) -> Optional[Ticket]:
+        async def is_ticket_worthy():
+            return await asyncio.to_thread(self._is_ticket_worthy, event, await channel_task)
+
+        async def select_team_and_state():
+            teams, team_states = await metadata_task
+            team = await asyncio.to_thread(self._get_team, event, teams)
+            state = await asyncio.to_thread(self._get_ticket_state, event, team, team_states[team.id])
+            return team, state
+
+        worthy_task = asyncio.create_task(is_ticket_worthy())
+        title_task = asyncio.create_task(asyncio.to_thread(self._get_title, event))
+        team_and_state_task = asyncio.create_task(select_team_and_state())
+        tasks += [worthy_task, title_task, team_and_state_task]
+        if not await worthy_task:
+            return None
+        title, (team, state) = await asyncio.gather(title_task, team_and_state_task)
+        return Ticket(id=ticket_id, title=title, description=event.text, team=team, state=state)
+
+    # Fetches teams, then the states of every team concurrently
+    async def _get_team_states(self) -> tuple[list[Team], dict[str, list[TicketState]]]:
+        teams = await asyncio.to_thread(self.linear.list_teams)
+        states = await asyncio.gather(*[asyncio.to_thread(self.linear.list_states_for_team, team) for team in teams])
+        return teams, {team.id: team_states for team, team_states in zip(teams, states)}
+
+    def _is_ticket_worthy(self, event: Message, channel: dict = None) -> bool:
+        channel = channel or self.slack.get_channel_by_id(event.channel_id)
         decision_input = {
             "message": event.text,
             "channel_name": channel["name"],
         }
         decision, follow_up = self.decider.can_proceed(
-            context = f'''- Someone has posted a Slack message on a channel: {channel['name']}.
-- We're evaluating whether the message requires further action, through the creation of a Linear ticket or not.
-- A Linear ticket if required if the message flags an issue, suggestion, or improvement which requires some action to be taken.
-- The message might often not have enough context to be directly actionable, but that's okay, what matters is the intent behind the message.
-''',
+            context = get_worthiness_context(channel['name']),
             action = "Create a Linear ticket from the message, for either the engineering team, or the design team to look in to.",
             input = str(decision_input),
-            criteria = [
-                "The message expresses a problem, a suggestion, or an improvement with the intent of getting it resolved",
-                "The message REQUIRES further action, and isn't an FYI on an action already taken",
-                "The message is not a general announcement or a social message",
-            ]
+            criteria = WORTHINESS_CRITERIA
         )
         self.logger.debug(f"Decision: {decision}, Follow-up: {follow_up}")  
         if not decision and follow_up:
             self._ask_follow_up(event, follow_up)
         return decision
 
-    def _parse_ticket(self, event: Message) -> Ticket:
-        self.logger.debug(f"Event: {event.model_dump_json()}")
-        ticket = Ticket(
-            id= str(uuid.uuid4()),
-            title = self.writer.summarize(context= f"{BASE_CONTEXT} You must come up with a great title. DO NOT use the word title.", word_limit=10, input=event.text),
-            description = event.text,
-            slack_message_url = self.slack.get_permalink_for_message(event),
-            team = self._get_team(event),
+    # Decides worthiness, title, team and state in a single structured LLM call. Returns the plan, with the chosen team
+    # and state if the message is ticket-worthy. Raises if the plan doesn't validate against Linear's teams and states.
+    def _plan_ticket(self, event: Message, channel: dict, teams: list[Team], team_states: dict[str, list[TicketState]]) -> tuple[TicketPlan, Optional[Team], Optional[TicketState]]:
+        formatted_teams = "\n".join([f"- {team.name}: states {', '.join([state.name for state in team_states[team.id]])}" for team in teams])
+        formatted_criteria = "\n".join([f"{i+1}. {criterion}" for i, criterion in enumerate(WORTHINESS_CRITERIA)])
+        plan = self.writer.parse(
+            context=f'''{get_worthiness_context(channel['name'])}
+# Ticket-worthiness Criteria (sorted by importance)
+{formatted_criteria}
+
+# If the message is ticket-worthy
+{BASE_CONTEXT} You must come up with a great title, in at most 10 words. DO NOT use the word title.
+You must pick the team best equipped to act on the next steps for the ticket, and the TODO state of that team, so that the team can act on the ticket.
+
+# Teams and their states
+{formatted_teams}
+''',
+            input=str({"message": event.text, "channel_name": channel["name"]}),
+            output_model=TicketPlan,
         )
-        ticket.state = self._get_ticket_state(event, ticket.team)
-        # ticket.labels = self._get_ticket_labels(event, ticket.team)
-        self.logger.debug(f"Ticket: {ticket.model_dump()}")
-        return ticket
+        self.logger.debug(f"Ticket plan: {plan}")
+        if not plan.is_ticket_worthy:
+            return plan, None, None
+        matching_teams = [team for team in teams if team.name == plan.team]
+        if not plan.title or not matching_teams:
+            raise ValueError(f"Invalid ticket plan: {plan}")
+        matching_states = [state for state in team_states[matching_teams[0].id] if state.name == plan.state]
+        if not matching_states:
+            raise ValueError(f"Invalid state in ticket plan: {plan}")
+        return plan, matching_teams[0], matching_states[0]
+
+    def _get_title(self, event: Message) -> str:
+        return self.writer.summarize(context= f"{BASE_CONTEXT} You must come up with a great title. DO NOT use the word title.", word_limit=10, input=event.text)
 
-    def _get_team(self, event: Message) -> Team:
-        teams = self.linear.list_teams()
+    def _get_team(self, event: Message, teams: list[Team] = None) -> Team:
+        teams = teams or self.linear.list_teams()
         team_names = [team.name for team in teams]
         team_idx = self.decider.get_best_option(context= f"{BASE_CONTEXT} You must decide the best team pick the ticket up, and execute on it. Slack message: {event.text}", 
                                                 options=team_names, criteria=["The team must be the best equipped to act on the next steps for the ticket"])
         return teams[team_idx]
 
-    def _get_ticket_state(self, event: Message, team: Team) -> TicketState:
-        team_states = self.linear.list_states_for_team(team)
+    def _get_ticket_state(self, event: Message, team: Team, team_states: list[TicketState] = None) -> TicketState:
+        team_states = team_states or self.linear.list_states_for_team(team)
         state_names = [state.name for state in team_states]
         state_idx = self.decider.get_best_option(context= f"{BASE_CONTEXT} You must choose the TODO state, so that the team can act on the ticket. Slack message: {event.text}", 
                                                 options=state_names, criteria=["Figure out the TODO state from the available states."])
@@ -108,4 +231,4 @@ class Ticketer:
 
     def _ask_follow_up(self, event: Message, follow_up: str) -> bool:
         tagged_follow_up = f"{follow_up}\n\ncc: <@{self.config.slack_admin_user_id}>\n\nPS: I can't create tickets from replies today, I'll be smarter soon!"
-        self.slack.reply_in_thread(event.channel_id, tagged_follow_up, event.timestamp)
+        self.slack.queue_reply(event.channel_id, tagged_follow_up, event.timestamp)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the modules import each other relative to PROJECT_PATH
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('PROJECT_PATH', PROJECT_PATH)
+sys.path.append(PROJECT_PATH)
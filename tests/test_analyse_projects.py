@@ -0,0 +1,46 @@
+'''
+Tests for the analysis of projects ahead of the report: every risky project gets its own risk, even when projects
+share a name, and the stored analyses are reused on the next run.
+'''
+import pytest
+import fakeredis
+from models.linear import Project, ProjectStatus
+from models.report import Config, EmailConfig, RiskUpdate
+from tasks.report import Reporter, SharedClients
+from tasks.report.store import AnalysisStore
+
+def make_project(id: str, name: str) -> Project:
+    update = {"id": f"{id}-update", "createdAt": "2024-01-01T00:00:00Z", "body": "Blocked on a vendor", "url": "https://linear.app",
+              "user": {"id": "u1", "name": "Lead", "email": "lead@example.com"}, "diffMarkdown": None}
+    return Project(id=id, name=name, projectUpdates={"nodes": [update]})
+
+@pytest.fixture
+def reporter(monkeypatch) -> Reporter:
+    config = Config(reporting_channel_id="C1", roadmap_view_url="https://linear.app",
+                    email=EmailConfig(domains=[], suffixes=[], mappings={}))
+    reporter = Reporter(config=config, shared=SharedClients())
+    reporter.analyses = AnalysisStore(fakeredis.FakeRedis())
+    reporter.risk_calls = []
+    def enrich(projects):
+        for project in projects:
+            project.status = ProjectStatus.AT_RISK
+    def get_risk(project):
+        reporter.risk_calls.append(project.id)
+        return RiskUpdate(project_name=project.name, project_milestone="Launch", why=f"risk of {project.id}", what_next="Escalate")
+    monkeypatch.setattr(reporter, "_enrich_projects_with_status", enrich)
+    monkeypatch.setattr(reporter, "_get_project_risk", get_risk)
+    return reporter
+
+def test_projects_with_the_same_name_keep_their_own_risks(reporter):
+    projects = [make_project("p1", "Migration"), make_project("p2", "Migration")]
+    risks = reporter.analyse_projects(projects)
+    assert [risk.why for risk in risks] == ["risk of p1", "risk of p2"]
+    stored = reporter.analyses.get_many(["p1", "p2"])
+    assert stored["p1"].risk.why == "risk of p1"
+    assert stored["p2"].risk.why == "risk of p2"
+
+def test_stored_analyses_are_reused(reporter):
+    reporter.analyse_projects([make_project("p1", "Migration"), make_project("p2", "Migration")])
+    risks = reporter.analyse_projects([make_project("p1", "Migration"), make_project("p2", "Migration")])
+    assert sorted(reporter.risk_calls) == ["p1", "p2"]
+    assert [risk.why for risk in risks] == ["risk of p1", "risk of p2"]
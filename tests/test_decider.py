@@ -0,0 +1,95 @@
+'''
+Tests for the decider: errors calling OpenAI reach the caller, malformed responses are handled, only responses that
+validate are cached, and a shared limit bounds the calls in flight.
+'''
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import httpx
+import openai
+import pytest
+import fakeredis
+from tools.cache import ResponseCache, RedisCacheBackend
+from tools.decider import Decider
+
+class FakeCompletions:
+    def __init__(self, contents: list):
+        self.contents = contents
+        self.calls = []
+        self.delay = 0
+        self.in_flight, self.max_in_flight = 0, 0
+        self.lock = threading.Lock()
+
+    def create(self, model, messages, temperature):
+        with self.lock:
+            self.calls.append(messages)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        content = self.contents[min(len(self.calls), len(self.contents)) - 1]
+        if isinstance(content, Exception):
+            raise content
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+@pytest.fixture
+def completions(monkeypatch):
+    # the module level client is only built on first use, and needs a key
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    def install(*contents) -> FakeCompletions:
+        fake = FakeCompletions(list(contents))
+        monkeypatch.setattr(openai.chat.completions, "create", fake.create)
+        return fake
+    return install
+
+def test_best_option_raises_openai_errors(completions):
+    completions(openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com")))
+    with pytest.raises(openai.APIConnectionError):
+        Decider().get_best_option("context", ["a", "b"], ["criterion"])
+
+def test_best_option_returns_malformed_response_errors(completions):
+    completions("not json", '{"chain_of_thought": "no option"}')
+    decider = Decider()
+    assert isinstance(decider.get_best_option("context", ["a", "b"], ["criterion"]), ValueError)
+    assert isinstance(decider.get_best_option("context", ["a", "b"], ["criterion"]), KeyError)
+
+def test_best_option(completions):
+    completions('{"chain_of_thought": "b fits", "best_option": 2}')
+    assert Decider().get_best_option("context", ["a", "b"], ["criterion"], with_chain_of_thought=True) == (1, "b fits")
+
+def classify(decider: Decider) -> list:
+    return decider.classify_items("context", ["first item", "second item"], ["a", "b"], ["criterion"])
+
+def test_malformed_classification_is_retried_without_the_cache(completions):
+    valid = '{"decisions": [{"item": 1, "best_option": 1}, {"item": 2, "best_option": 2}]}'
+    fake = completions('{"decisions": "none"}', valid, valid)
+    decider = Decider(cache=ResponseCache(RedisCacheBackend(fakeredis.FakeRedis(), max_entries=100), ttl_seconds=60))
+    assert classify(decider) == [0, 1]
+    assert len(fake.calls) == 2
+    # neither the malformed response nor the retry was cached, the next run's valid response is
+    assert classify(decider) == [0, 1]
+    assert len(fake.calls) == 3
+    assert classify(decider) == [0, 1]
+    assert len(fake.calls) == 3
+
+def test_cached_response_that_does_not_validate_is_ignored(completions):
+    fake = completions('{"decisions": [{"item": 1, "best_option": 2}, {"item": 2, "best_option": 1}]}')
+    cache = ResponseCache(RedisCacheBackend(fakeredis.FakeRedis(), max_entries=100), ttl_seconds=60)
+    decider = Decider(cache=cache)
+    classify(decider)
+    key = cache.backend.client.zrange(cache.backend.index_key, 0, -1)[0].decode()
+    cache.set(key, '{"decisions": "none"}')
+    assert classify(decider) == [1, 0]
+    assert len(fake.calls) == 2
+
+def test_shared_limit_bounds_calls_in_flight(completions):
+    fake = completions('{"chain_of_thought": "b fits", "best_option": 2}')
+    fake.delay = 0.05
+    limit = threading.BoundedSemaphore(2)
+    deciders = [Decider(limit=limit), Decider(limit=limit)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda idx: deciders[idx % 2].get_best_option("context", ["a", "b"], ["criterion"]), range(8)))
+    assert results == [1] * 8
+    assert fake.max_in_flight == 2
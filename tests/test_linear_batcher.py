@@ -0,0 +1,68 @@
+'''
+Tests for the Linear batcher: every caller's future is resolved, with its own result or error, even when the batch
+request fails, or its operations or response are malformed.
+'''
+import pytest
+from tools.linear.service import LinearBatcher, GraphQLOperation, issue_operation
+from tools.linear.transport import LinearAPIError
+
+class FakeTransport:
+    def __init__(self, response=None, error: Exception = None):
+        self.response = response
+        self.error = error
+        self.requests = []
+
+    def execute(self, document, variables, **kwargs):
+        self.requests.append((document, variables))
+        if self.error:
+            raise self.error
+        return self.response
+
+def send(transport: FakeTransport, operations: list) -> list:
+    batcher = LinearBatcher(transport, max_batch_size=len(operations))
+    return [batcher.submit(operation) for operation in operations]
+
+def test_results_and_errors_go_to_their_own_callers():
+    transport = FakeTransport({
+        "data": {"op0": {"id": "a"}, "op1": None},
+        "errors": [{"message": "Entity not found", "path": ["op1"]}],
+    })
+    found, missing = send(transport, [issue_operation("a"), issue_operation("b")])
+    assert len(transport.requests) == 1
+    assert found.result(timeout=1) == {"id": "a"}
+    with pytest.raises(LinearAPIError):
+        missing.result(timeout=1)
+
+def test_transport_error_fails_every_caller():
+    futures = send(FakeTransport(error=ConnectionError("connection lost")), [issue_operation("a"), issue_operation("b")])
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result(timeout=1)
+
+def test_unexpected_response_fails_every_caller():
+    futures = send(FakeTransport(response=None), [issue_operation("a"), issue_operation("b")])
+    for future in futures:
+        with pytest.raises(LinearAPIError):
+            future.result(timeout=1)
+
+def test_malformed_response_fails_every_caller():
+    futures = send(FakeTransport(response={"data": ["not", "an", "object"]}), [issue_operation("a"), issue_operation("b")])
+    for future in futures:
+        with pytest.raises(LinearAPIError):
+            future.result(timeout=1)
+
+def test_merge_error_fails_every_caller():
+    # an argument without a (type, value) pair can't be merged into the document
+    broken = GraphQLOperation("query", "issue", {'id': "a"}, "id")
+    transport = FakeTransport({"data": {}})
+    futures = send(transport, [issue_operation("a"), broken])
+    assert not transport.requests
+    for future in futures:
+        with pytest.raises(LinearAPIError):
+            future.result(timeout=1)
+
+def test_timer_flush_resolves_futures():
+    batcher = LinearBatcher(FakeTransport(response=None), window_seconds=0.01)
+    future = batcher.submit(issue_operation("a"))
+    with pytest.raises(LinearAPIError):
+        future.result(timeout=1)
@@ -0,0 +1,67 @@
+'''
+Tests for the Linear transport: decoding response bodies into typed responses, from the bytes or the parsed JSON, backing
+off for as long as Linear asks, and exporting how requests were paced.
+'''
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+from tools.linear import transport as transport_module
+from tools.linear.transport import GraphQLResponse, RateLimitScheduler, _backoff_delay, _parse_body, response_type
+from tools.linear.service import PROJECT_DATA
+
+PROJECT = b'{"data": {"project": {"id": "p1", "name": "Migration", "state": "started"}}}'
+
+@pytest.mark.parametrize("from_bytes", [True, False])
+def test_body_is_decoded_into_the_response_type(from_bytes):
+    body = _parse_body(httpx.Response(200, content=PROJECT), response_type(PROJECT_DATA, from_bytes))
+    assert isinstance(body, GraphQLResponse)
+    assert body.data["project"].name == "Migration"
+
+@pytest.mark.parametrize("from_bytes", [True, False])
+def test_body_that_does_not_match_is_decoded_as_json(from_bytes):
+    content = b'{"errors": [{"message": "Entity not found"}], "data": {"project": {"id": "p1"}}}'
+    body = _parse_body(httpx.Response(200, content=content), response_type(PROJECT_DATA, from_bytes))
+    assert body == {"errors": [{"message": "Entity not found"}], "data": {"project": {"id": "p1"}}}
+
+def test_body_that_is_not_json_is_none():
+    assert _parse_body(httpx.Response(502, content=b"Bad gateway"), response_type(PROJECT_DATA, True)) is None
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(transport_module.random, "uniform", lambda low, high: high)
+
+def test_backoff_grows_exponentially_up_to_the_maximum(no_jitter):
+    delays = [_backoff_delay(attempt, None) for attempt in range(10)]
+    assert delays[:3] == [transport_module.BACKOFF_BASE_SECONDS * 2 ** attempt for attempt in range(3)]
+    assert delays[-1] == transport_module.BACKOFF_MAX_SECONDS
+
+def test_backoff_waits_for_retry_after(no_jitter):
+    response = httpx.Response(429, headers={"Retry-After": "12"})
+    assert _backoff_delay(0, response) == 12 + transport_module.BACKOFF_BASE_SECONDS
+
+def test_backoff_waits_for_the_exhausted_budget_to_reset(no_jitter, monkeypatch):
+    monkeypatch.setattr(transport_module.time, "time", lambda: 1000.0)
+    response = httpx.Response(400, headers={"x-ratelimit-requests-remaining": "5",
+                                            "x-ratelimit-complexity-remaining": "0",
+                                            "x-ratelimit-complexity-reset": "1030000"})
+    assert _backoff_delay(0, response) == 30 + transport_module.BACKOFF_BASE_SECONDS
+
+def test_backoff_ignores_a_reset_in_the_past(no_jitter, monkeypatch):
+    monkeypatch.setattr(transport_module.time, "time", lambda: 1000.0)
+    response = httpx.Response(400, headers={"x-ratelimit-requests-remaining": "0", "x-ratelimit-requests-reset": "990000"})
+    assert _backoff_delay(0, response) == transport_module.BACKOFF_BASE_SECONDS
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, {"service": "linear", **labels}) or 0
+
+def test_pacing_is_exported_as_metrics():
+    before = [sample("taskie_throttle_seconds_total"), sample("taskie_retries_total", reason="rate_limited"),
+              sample("taskie_backoff_seconds_total"), sample("taskie_rate_limited_requests_total")]
+    scheduler = RateLimitScheduler()
+    assert scheduler.try_acquire(1, transport_module.RequestPriority.INTERACTIVE) == 0
+    scheduler.record_throttle(1.5)
+    scheduler.record_retry(2.0, rate_limited=True)
+    after = [sample("taskie_throttle_seconds_total"), sample("taskie_retries_total", reason="rate_limited"),
+             sample("taskie_backoff_seconds_total"), sample("taskie_rate_limited_requests_total")]
+    assert [later - earlier for earlier, later in zip(before, after)] == [1.5, 1, 2.0, 1]
+    assert (scheduler.stats.throttle_seconds, scheduler.stats.retries, scheduler.stats.backoff_seconds) == (1.5, 1, 2.0)
@@ -0,0 +1,64 @@
+'''
+Tests for the Linear metadata cache: entries are kept in memory briefly in front of Redis, so an invalidation in one
+process reaches the others, and a prefetch leaves nothing for the ticket pipeline to read from Linear.
+'''
+import pytest
+import fakeredis
+from tools.linear import LinearClient, MetadataCache
+from tools.linear import cache as cache_module
+from tools.linear.service import TEAMS_QUERY, ALL_WORKFLOW_STATES_QUERY
+
+TEAMS = [{"id": "t1", "name": "Engineering"}, {"id": "t2", "name": "Design"}]
+STATES = [{"id": f"{team['id']}-todo", "name": "Todo", "team": team} for team in TEAMS]
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+class FakeTransport:
+    def __init__(self):
+        self.queries = []
+
+    def execute(self, query, variables, priority=None, **kwargs):
+        self.queries.append(query)
+        if query == TEAMS_QUERY:
+            return {"data": {"teams": {"nodes": TEAMS}}}
+        if query == ALL_WORKFLOW_STATES_QUERY:
+            return {"data": {"workflowStates": {"nodes": STATES}}}
+        team_id = variables["filter"]["team"]["id"]["eq"]
+        return {"data": {"workflowStates": {"nodes": [state for state in STATES if state["team"]["id"] == team_id]}}}
+
+def test_memory_entries_expire_before_redis_ones(clock):
+    cache = MetadataCache(redis_client=fakeredis.FakeRedis(), ttl_seconds=3600, memory_ttl_seconds=60)
+    cache.set("teams", TEAMS)
+    assert cache.get("teams") == TEAMS
+    clock[0] += 61
+    assert cache.get("teams") == TEAMS
+    assert (cache.stats.memory_hits, cache.stats.redis_hits) == (1, 1)
+
+def test_invalidation_reaches_other_processes_within_the_memory_ttl(clock):
+    shared_redis = fakeredis.FakeRedis()
+    first = MetadataCache(redis_client=shared_redis, memory_ttl_seconds=60)
+    second = MetadataCache(redis_client=shared_redis, memory_ttl_seconds=60)
+    first.set("teams", TEAMS)
+    assert second.get("teams") == TEAMS
+    first.invalidate()
+    clock[0] += 61
+    assert second.get("teams") is None
+
+def test_without_redis_memory_keeps_entries_for_the_full_ttl(clock):
+    cache = MetadataCache(ttl_seconds=3600, memory_ttl_seconds=60)
+    cache.set("teams", TEAMS)
+    clock[0] += 61
+    assert cache.get("teams") == TEAMS
+
+def test_prefetch_leaves_no_metadata_reads():
+    transport = FakeTransport()
+    linear = LinearClient(transport=transport, metadata_cache=MetadataCache(redis_client=fakeredis.FakeRedis()))
+    linear.prefetch_metadata(include_labels=False)
+    assert len(transport.queries) == 2
+    teams = linear.list_teams()
+    assert [[state.id for state in linear.list_states_for_team(team)] for team in teams] == [["t1-todo"], ["t2-todo"]]
+    assert len(transport.queries) == 2
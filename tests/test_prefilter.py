@@ -0,0 +1,62 @@
+'''
+Tests for the pre-filter: bot messages, noise and short messages are rejected before the worthiness check, allow patterns
+win over deny patterns, and a channel's own rules replace the global ones.
+'''
+import pytest
+from models.slack import Message
+from models.ticket import TicketerConfig, PreFilterConfig
+from tasks.ticket.prefilter import PreFilter
+
+BUG_REPORT = "The export button crashes the app on Safari"
+
+def make_message(text: str, channel: str = "C1", **fields) -> Message:
+    return Message(text=text, user="U1", channel=channel, ts=1700000000.0, **fields)
+
+def make_prefilter(prefilter: PreFilterConfig = PreFilterConfig(), channel_configs: list = ()) -> PreFilter:
+    return PreFilter(TicketerConfig(slack_admin_user_id="U0", prefilter=prefilter, slack_channel_configs=list(channel_configs)))
+
+@pytest.mark.parametrize("fields, reason", [
+    ({"subtype": "channel_join"}, "subtype:channel_join"),
+    ({"bot_id": "B1"}, "bot"),
+])
+def test_bot_messages_and_notices_are_rejected(fields, reason):
+    prefilter = make_prefilter()
+    message = make_message(BUG_REPORT, **fields)
+    assert prefilter.rejection_reason(message) == reason
+    assert not prefilter.allows(message)
+    assert prefilter.stats.rejections_by_reason == {reason: 1}
+
+def test_ordinary_subtypes_are_allowed():
+    assert make_prefilter().allows(make_message(BUG_REPORT, subtype="thread_broadcast"))
+
+def test_allow_patterns_win_over_deny_patterns():
+    prefilter = make_prefilter(PreFilterConfig(allow_patterns=[r"\bbug\b"], deny_patterns=[r"^thanks"]))
+    assert prefilter.rejection_reason(make_message("thanks, found a bug")) is None
+    assert prefilter.rejection_reason(make_message("thanks, all sorted now")) == "deny_pattern"
+
+def test_allow_patterns_skip_the_length_check():
+    prefilter = make_prefilter(PreFilterConfig(allow_patterns=[r"\bbug\b"]))
+    assert prefilter.allows(make_message("bug!"))
+
+@pytest.mark.parametrize("text, reason", [
+    ("<@U123> :tada: :+1: <https://example.com|link>", "too_short"),
+    ("<@U123> fix it :fire:", "too_short"),
+    ("<@U123> prod is down :fire:", None),
+    ("thanks!!", "deny_pattern"),
+])
+def test_length_is_checked_after_stripping_mentions_emoji_and_punctuation(text, reason):
+    assert make_prefilter().rejection_reason(make_message(text)) == reason
+
+def test_channel_rules_replace_the_global_ones():
+    channel_configs = [{"channel_id": "C2", "prefilter": {"min_length": 2, "deny_patterns": [], "ignored_subtypes": []}}]
+    prefilter = make_prefilter(channel_configs=channel_configs)
+    assert prefilter.rejection_reason(make_message("fix it", channel="C1")) == "too_short"
+    assert prefilter.rejection_reason(make_message("fix it", channel="C2")) is None
+    assert prefilter.rejection_reason(make_message("thanks", channel="C2")) is None
+    assert prefilter.rejection_reason(make_message(BUG_REPORT, channel="C2", subtype="channel_join")) is None
+
+def test_stats_count_llm_calls_saved():
+    prefilter = make_prefilter()
+    for text in ["thanks", "ok", BUG_REPORT]:
+        prefilter.allows(make_message(text))
+    assert (prefilter.stats.checked, prefilter.stats.rejected, prefilter.stats.llm_calls_saved) == (3, 2, 2)
@@ -0,0 +1,94 @@
+'''
+Tests for the work queues: dropping duplicate deliveries, redelivering events that weren't acknowledged, and
+dead-lettering events that run out of attempts.
+'''
+import time
+import pytest
+import fakeredis
+import redis
+from tools.queue import RedisStreamQueue, LocalQueue
+from tools.queue import service as queue_service
+
+STREAM = "test:events"
+
+@pytest.fixture
+def cache():
+    return fakeredis.FakeRedis()
+
+def make_queue(cache, **kwargs) -> RedisStreamQueue:
+    return RedisStreamQueue(cache, STREAM, group="testers", visibility_timeout_ms=0, **kwargs)
+
+def test_duplicate_delivery_is_dropped(cache):
+    work_queue = make_queue(cache)
+    assert work_queue.enqueue("Ev1", {"n": 1})
+    assert not work_queue.enqueue("Ev1", {"n": 1})
+    assert work_queue.depth() == 1
+
+def test_failed_enqueue_does_not_mark_event_as_seen(cache, monkeypatch):
+    work_queue = make_queue(cache)
+    def failing_xadd(*args, **kwargs):
+        raise redis.ConnectionError("connection lost")
+    monkeypatch.setattr(cache, "xadd", failing_xadd)
+    with pytest.raises(redis.ConnectionError):
+        work_queue.enqueue("Ev1", {"n": 1})
+    monkeypatch.undo()
+    # Slack's retry of the delivery is accepted
+    assert work_queue.enqueue("Ev1", {"n": 1})
+    assert work_queue.depth() == 1
+
+def test_acknowledged_event_is_removed(cache):
+    work_queue = make_queue(cache)
+    work_queue.enqueue("Ev1", {"n": 1})
+    event = work_queue.dequeue("worker-1", block_ms=10)
+    assert event.event_id == "Ev1" and event.body == {"n": 1} and event.attempts == 1
+    work_queue.ack(event)
+    assert work_queue.depth() == 0
+    assert work_queue.dequeue("worker-1", block_ms=10) is None
+
+def test_nacked_event_is_redelivered(cache):
+    work_queue = make_queue(cache)
+    work_queue.enqueue("Ev1", {"n": 1})
+    first = work_queue.dequeue("worker-1", block_ms=10)
+    work_queue.nack(first)
+    time.sleep(0.01)
+    second = work_queue.dequeue("worker-2", block_ms=10)
+    assert second.id == first.id
+    assert second.attempts == 2
+
+def test_event_out_of_attempts_is_dead_lettered(cache):
+    work_queue = make_queue(cache, max_attempts=2)
+    work_queue.enqueue("Ev1", {"n": 1})
+    for _ in range(2):
+        event = work_queue.dequeue("worker-1", block_ms=10)
+        work_queue.nack(event)
+        time.sleep(0.01)
+    assert work_queue.depth() == 0
+    assert work_queue.dequeue("worker-1", block_ms=10) is None
+    dead_letters = cache.xrange(work_queue.dead_letter_stream)
+    assert len(dead_letters) == 1
+    assert dead_letters[0][1][b"event_id"] == b"Ev1"
+
+def test_local_queue_redelivers_and_drops_duplicates():
+    work_queue = LocalQueue(max_attempts=2)
+    assert work_queue.enqueue("Ev1", {"n": 1})
+    assert not work_queue.enqueue("Ev1", {"n": 1})
+    event = work_queue.dequeue("worker-1", block_ms=10)
+    work_queue.nack(event)
+    event = work_queue.dequeue("worker-1", block_ms=10)
+    assert event.attempts == 2
+    # out of attempts, so it's dropped
+    work_queue.nack(event)
+    assert work_queue.dequeue("worker-1", block_ms=10) is None
+
+def test_local_queue_remembers_a_bounded_number_of_events(monkeypatch):
+    monkeypatch.setattr(queue_service, "MAX_LOCAL_SEEN_EVENTS", 3)
+    work_queue = LocalQueue()
+    for idx in range(5):
+        work_queue.enqueue(f"Ev{idx}", {})
+    assert list(work_queue.seen_event_ids) == ["Ev2", "Ev3", "Ev4"]
+
+def test_local_queue_forgets_expired_events(monkeypatch):
+    work_queue = LocalQueue()
+    work_queue.enqueue("Ev1", {})
+    monkeypatch.setattr(queue_service, "DEDUPE_TTL_SECONDS", 0)
+    assert work_queue.enqueue("Ev1", {})
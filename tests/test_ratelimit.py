@@ -0,0 +1,32 @@
+'''
+Tests for the token bucket: how long a call waits for its cost, with and without a reserve, as the bucket refills.
+'''
+from tools.ratelimit import TokenBucket
+
+START = 100.0
+
+def make_bucket(capacity: float = 60, refill_period_seconds: float = 60) -> TokenBucket:
+    bucket = TokenBucket(capacity, refill_period_seconds)
+    bucket.updated_at = START
+    return bucket
+
+def test_full_bucket_does_not_wait():
+    assert make_bucket().wait_time(10, now=START + 1) == 0
+
+def test_wait_time_is_the_time_to_refill_the_shortfall():
+    bucket = make_bucket()
+    bucket.consume(60)
+    assert bucket.wait_time(10, now=START + 1) == 9
+    # tokens refilled while waiting count towards the next call
+    assert bucket.wait_time(10, now=START + 10) == 0
+
+def test_reserve_is_left_untouched():
+    bucket = make_bucket()
+    bucket.consume(50)
+    assert bucket.wait_time(5, now=START) == 0
+    assert bucket.wait_time(5, reserve=6, now=START) == 1
+
+def test_cost_beyond_capacity_waits_only_for_a_full_bucket():
+    bucket = make_bucket()
+    bucket.consume(60)
+    assert bucket.wait_time(100, now=START + 1) == 59
@@ -0,0 +1,203 @@
+'''
+Tests for generating the report: the analysis starts on the first projects while later pages are still being fetched,
+projects are precomputed only for the configs that cover them, and runs are checkpointed so that they can be resumed
+or posted again.
+'''
+import os
+import time
+from datetime import datetime
+import pytest
+import fakeredis
+from models.linear import Project, ProjectStatus
+from models.report import Config, EmailConfig, Report, ReportCheckpoint, RiskUpdate
+from tasks.report import Reporter, SharedClients
+from tasks.report import service as report_service
+from tasks.report.checkpoints import CHECKPOINT_SUFFIX, CheckpointStore
+
+LEAD = {"id": "u1", "name": "Lead", "email": "lead@example.com"}
+
+def make_project(id: str, updated: bool = True, team_name: str = "Engineering") -> Project:
+    updates = [{"id": f"{id}-update", "createdAt": datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%fZ"), "body": "On track",
+                "url": "https://linear.app", "user": LEAD, "diffMarkdown": None}] if updated else []
+    return Project(id=id, name=f"Project {id}", state="started", lead=LEAD, projectUpdates={"nodes": updates},
+                   teams={"nodes": [{"id": f"{team_name}-id", "name": team_name}]})
+
+class FakeLinear:
+    def __init__(self, pages: list[list[Project]], others: list[Project] = ()):
+        self.pages = pages
+        # projects outside the report's scope, only fetched by id
+        self.others = list(others)
+        self.fetches = 0
+        # called between pages, with the number of pages already yielded
+        self.between_pages = lambda pages_yielded: None
+        self.fetched_ids = []
+
+    def iter_projects(self, states, team_names, details=False):
+        self.fetches += 1
+        for idx, page in enumerate(self.pages):
+            if idx:
+                self.between_pages(idx)
+            yield from page
+
+    def get_project_by_id(self, project_id):
+        self.fetched_ids.append(project_id)
+        return next(project for project in sum(self.pages, self.others) if project.id == project_id)
+
+class FakeSlack:
+    def __init__(self):
+        self.posts = []
+        self.updates = []
+
+    def post_message(self, channel_id, message=None, blocks=None):
+        self.posts.append(blocks)
+        return f"ts{len(self.posts)}"
+
+    def update_message(self, channel_id, message_ts, message=None, blocks=None):
+        self.updates.append((message_ts, blocks))
+
+    def get_tag_for_user(self, email, email_config):
+        return email
+
+class FakeDecider:
+    def get_best_option(self, context, options, criteria, with_chain_of_thought=False):
+        return 0, "the first one"
+
+def make_shared() -> SharedClients:
+    shared = SharedClients()
+    shared.linear = FakeLinear([[make_project("p1"), make_project("p2")], [make_project("p3"), make_project("p4", updated=False)]],
+                               others=[make_project("s1", team_name="Sales")])
+    shared.slack = FakeSlack()
+    shared.cache = fakeredis.FakeRedis()
+    return shared
+
+def make_reporter(monkeypatch, checkpoint_path: str, shared: SharedClients, **config) -> Reporter:
+    config = Config(reporting_channel_id="C1", roadmap_view_url="https://linear.app", checkpoint_path=checkpoint_path,
+                    email=EmailConfig(domains=[], suffixes=[], mappings={}), **config)
+    reporter = Reporter(config=config, shared=shared)
+    reporter.decider, reporter.writer = FakeDecider(), None
+    reporter.analysed = []
+    def enrich(projects):
+        reporter.analysed.extend(project.id for project in projects)
+        for project in projects:
+            project.status = ProjectStatus.AT_RISK
+    monkeypatch.setattr(reporter, "_enrich_projects_with_status", enrich)
+    monkeypatch.setattr(reporter, "_get_project_risk", lambda project: RiskUpdate(
+        project_name=project.name, project_milestone="Launch", why=f"risk of {project.id}", what_next="Escalate"))
+    return reporter
+
+@pytest.fixture
+def reporter(tmp_path, monkeypatch) -> Reporter:
+    return make_reporter(monkeypatch, str(tmp_path), make_shared())
+
+def test_analysis_starts_while_projects_are_fetched(reporter, monkeypatch):
+    monkeypatch.setattr(report_service, "ANALYSIS_CHUNK_SIZE", 2)
+    analysed_before_second_page = []
+    def between_pages(pages_yielded):
+        # give the analysis of the first page a moment to start
+        for _ in range(100):
+            if reporter.analysed:
+                break
+            time.sleep(0.01)
+        analysed_before_second_page.extend(reporter.analysed)
+    reporter.linear.between_pages = between_pages
+    reporter.trigger_report()
+    assert analysed_before_second_page == ["p1", "p2"]
+    report = reporter.checkpoints.load(latest_run_id(reporter)).report
+    assert [risk.why for risk in report.risks] == ["risk of p1", "risk of p2", "risk of p3"]
+    assert [project.id for project in report.projects_without_updates] == ["p4"]
+    assert reporter.linear.fetches == 1
+
+def test_precompute_skips_projects_outside_the_configured_teams(reporter):
+    reporter.precompute_project("s1")
+    reporter.precompute_project("p4")
+    assert reporter.analysed == []
+    reporter.precompute_project("p1")
+    assert reporter.analysed == ["p1"]
+
+def test_webhook_precomputes_for_every_config_covering_the_project(tmp_path, monkeypatch):
+    from triggers.linear.webhook import ProjectUpdateWorker
+    shared = make_shared()
+    engineering = make_reporter(monkeypatch, str(tmp_path), shared)
+    sales = make_reporter(monkeypatch, str(tmp_path), shared, team_names=["Sales"])
+    everyone = make_reporter(monkeypatch, str(tmp_path), shared, team_names=["Engineering", "Sales"])
+    worker = ProjectUpdateWorker([engineering, sales, everyone])
+    worker.precompute("s1")
+    worker.precompute("p1")
+    # the analyses are stored for every config, so the config covering both teams reuses them
+    assert (engineering.analysed, sales.analysed, everyone.analysed) == (["p1"], ["s1"], [])
+    assert shared.linear.fetched_ids == ["s1", "p1"]
+
+def latest_run_id(reporter: Reporter) -> str:
+    return sorted(os.listdir(reporter.checkpoints.directory))[-1].removesuffix(CHECKPOINT_SUFFIX)
+
+def test_checkpoint_round_trip(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    checkpoint = ReportCheckpoint(run_id="20240101-090000-abcdef", report=Report(projects_with_updates=[make_project("p1")]),
+                                  completed=["projects"], failed=[], message_ts="ts1", blocks=[{"type": "divider"}])
+    store.save(checkpoint)
+    assert store.load(checkpoint.run_id) == checkpoint
+    assert os.listdir(tmp_path) == [f"{checkpoint.run_id}{CHECKPOINT_SUFFIX}"]
+
+def test_completed_run_is_checkpointed(reporter):
+    reporter.trigger_report()
+    checkpoint = reporter.checkpoints.load(latest_run_id(reporter))
+    assert sorted(checkpoint.completed) == ["best update", "projects", "reminders", "risks"]
+    assert checkpoint.failed == []
+    assert checkpoint.report.best_update.id == "p1"
+    assert (checkpoint.message_ts, checkpoint.blocks) == ("ts1", reporter.slack.updates[-1][1])
+
+def test_resume_only_generates_sections_that_did_not_complete(reporter, monkeypatch):
+    def fail(*args, **kwargs):
+        raise ConnectionError("connection lost")
+    monkeypatch.setattr(reporter.decider, "get_best_option", fail, raising=False)
+    reporter.trigger_report()
+    run_id = latest_run_id(reporter)
+    assert reporter.checkpoints.load(run_id).failed == ["best update"]
+    monkeypatch.undo()
+    monkeypatch.setattr(reporter, "_get_reminders", fail)
+    monkeypatch.setattr(reporter, "analyse_projects", fail)
+    reporter.trigger_report(run_id)
+    checkpoint = reporter.checkpoints.load(run_id)
+    assert checkpoint.failed == []
+    assert checkpoint.report.best_update.id == "p1"
+    # the projects were neither fetched nor analysed again, and the report's message was updated in place
+    assert reporter.linear.fetches == 1
+    assert len(reporter.slack.posts) == 1
+    assert reporter.slack.updates[-1] == ("ts1", checkpoint.blocks)
+    assert os.listdir(reporter.checkpoints.directory) == [f"{run_id}{CHECKPOINT_SUFFIX}"]
+
+def test_repost_renders_the_checkpoint_as_a_new_message(reporter):
+    reporter.trigger_report()
+    run_id = latest_run_id(reporter)
+    blocks = reporter.checkpoints.load(run_id).blocks
+    reporter.repost_report(run_id)
+    assert reporter.slack.posts[-1] == blocks
+    assert reporter.checkpoints.load(run_id).message_ts == "ts2"
+    assert reporter.linear.fetches == 1
+
+def test_repost_needs_the_projects(reporter):
+    reporter.checkpoints.save(ReportCheckpoint(run_id="20240101-090000-abcdef", report=Report(), completed=[], failed=[]))
+    with pytest.raises(ValueError):
+        reporter.repost_report("20240101-090000-abcdef")
+    assert reporter.slack.posts == []
+
+def test_prune_removes_only_expired_checkpoints(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    for run_id in ["old", "new"]:
+        store.save(ReportCheckpoint(run_id=run_id, report=Report(), completed=[], failed=[]))
+    (tmp_path / "notes.txt").write_text("kept")
+    expired_at = time.time() - 15 * 24 * 60 * 60
+    for file_name in [f"old{CHECKPOINT_SUFFIX}", "notes.txt"]:
+        os.utime(tmp_path / file_name, (expired_at, expired_at))
+    store.prune()
+    assert sorted(os.listdir(tmp_path)) == [f"new{CHECKPOINT_SUFFIX}", "notes.txt"]
+
+def test_prune_without_a_directory_does_nothing(tmp_path):
+    CheckpointStore(str(tmp_path / "missing")).prune()
+
+def test_reports_run_together_share_one_llm_limit(tmp_path, monkeypatch):
+    shared = make_shared()
+    assert make_reporter(monkeypatch, str(tmp_path), shared).llm_limit is not make_reporter(monkeypatch, str(tmp_path), shared).llm_limit
+    shared.llm_limit = SharedClients(llm_concurrency=2).llm_limit
+    first, second = make_reporter(monkeypatch, str(tmp_path), shared), make_reporter(monkeypatch, str(tmp_path), shared)
+    assert first.llm_limit is second.llm_limit is shared.llm_limit
@@ -0,0 +1,64 @@
+'''
+Tests for the clients shared by reports for several configs: the current projects are fetched once per scope of
+project states and teams, as a stream every report reads from the first page, and every report gets its own copies.
+'''
+import pytest
+from models.linear import Project, ProjectStates
+from tasks.report import SharedClients
+
+class FakeLinear:
+    def __init__(self, fail_after: int = None):
+        self.fetches = []
+        self.fail_after = fail_after
+
+    def iter_projects(self, states, team_names, details=False):
+        self.fetches.append((states, team_names))
+        for idx, team_name in enumerate(team_names):
+            if idx == self.fail_after:
+                raise ConnectionError("connection lost")
+            yield Project(id=f"{team_name}-project", name=f"{team_name} project", state=states[0])
+
+def make_shared(linear: FakeLinear = None) -> SharedClients:
+    shared = SharedClients()
+    shared.linear = linear or FakeLinear()
+    return shared
+
+def test_projects_are_fetched_once_per_scope():
+    shared = make_shared()
+    first = shared.get_current_projects([ProjectStates.STARTED], ["Engineering", "Design"])
+    second = shared.get_current_projects([ProjectStates.STARTED], ["Design", "Engineering"])
+    assert len(shared.linear.fetches) == 1
+    assert [project.id for project in first] == [project.id for project in second]
+    assert first[0] is not second[0]
+
+def test_scopes_are_fetched_separately():
+    shared = make_shared()
+    engineering = shared.get_current_projects([ProjectStates.STARTED], ["Engineering"])
+    sales = shared.get_current_projects([ProjectStates.PLANNED, ProjectStates.STARTED], ["Sales"])
+    assert shared.linear.fetches == [
+        ([ProjectStates.STARTED], ["Engineering"]),
+        ([ProjectStates.PLANNED, ProjectStates.STARTED], ["Sales"]),
+    ]
+    assert [project.id for project in engineering] == ["Engineering-project"]
+    assert [project.id for project in sales] == ["Sales-project"]
+
+def test_readers_share_a_fetch_in_progress():
+    shared = make_shared()
+    first = shared.iter_current_projects([ProjectStates.STARTED], ["Engineering", "Design"])
+    second = shared.iter_current_projects([ProjectStates.STARTED], ["Engineering", "Design"])
+    assert next(first).id == "Engineering-project"
+    assert [project.id for project in second] == ["Engineering-project", "Design-project"]
+    assert [project.id for project in first] == ["Design-project"]
+    assert len(shared.linear.fetches) == 1
+
+def test_failed_fetch_fails_every_reader_and_is_fetched_again():
+    shared = make_shared(FakeLinear(fail_after=1))
+    first = shared.iter_current_projects([ProjectStates.STARTED], ["Engineering", "Design"])
+    second = shared.iter_current_projects([ProjectStates.STARTED], ["Engineering", "Design"])
+    with pytest.raises(ConnectionError):
+        list(first)
+    with pytest.raises(ConnectionError):
+        list(second)
+    shared.linear.fail_after = None
+    assert len(shared.get_current_projects([ProjectStates.STARTED], ["Engineering", "Design"])) == 2
+    assert len(shared.linear.fetches) == 2
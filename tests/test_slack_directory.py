@@ -0,0 +1,50 @@
+'''
+Tests for the Slack user directory: users are resolved from a single users.list, and a failed users.list isn't retried
+on every lookup.
+'''
+import pytest
+import fakeredis
+from models.report import EmailConfig
+from tools.slack.directory import UserDirectory
+
+EMAIL_CONFIG = EmailConfig(domains=["acme.com"], suffixes=["-ext"], mappings={})
+
+class FakeClient:
+    def __init__(self, members: list = None, error: Exception = None):
+        self.members = members or []
+        self.error = error
+        self.calls = 0
+
+    def users_list(self, limit, cursor=None):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return {"members": self.members, "response_metadata": {"next_cursor": ""}}
+
+def member(user_id: str, email: str) -> dict:
+    return {"id": user_id, "profile": {"email": email}}
+
+def test_users_are_resolved_from_one_users_list():
+    client = FakeClient([member("U1", "Jane@acme.com"), member("U2", "joe@acme.com")])
+    directory = UserDirectory(client, cache=fakeredis.FakeRedis())
+    assert directory.resolve("jane@acme.com", EMAIL_CONFIG) == "U1"
+    assert directory.resolve("joe-ext@acme.io", EMAIL_CONFIG) == "U2"
+    assert directory.resolve("nobody@acme.com", EMAIL_CONFIG) is None
+    assert client.calls == 1
+
+def test_failed_users_list_is_not_retried_within_the_refresh_interval():
+    client = FakeClient(error=PermissionError("missing_scope"))
+    directory = UserDirectory(client)
+    for _ in range(3):
+        with pytest.raises(PermissionError):
+            directory.resolve("jane@acme.com", EMAIL_CONFIG)
+    assert client.calls == 1
+
+def test_failed_users_list_is_retried_after_the_refresh_interval():
+    client = FakeClient(error=PermissionError("missing_scope"))
+    directory = UserDirectory(client, refresh_interval_seconds=0)
+    with pytest.raises(PermissionError):
+        directory.load()
+    client.error, client.members = None, [member("U1", "jane@acme.com")]
+    assert directory.get_user_id("jane@acme.com") == "U1"
+    assert client.calls == 2
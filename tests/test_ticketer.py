@@ -0,0 +1,131 @@
+'''
+Tests for the ticketer's single-call ticket plan: plans naming a team or state Linear doesn't have are rejected, a plan
+that doesn't parse or validate falls back to one call per decision, and errors calling OpenAI are raised. Replies and
+pre-filtered messages are counted apart.
+'''
+import asyncio
+import logging
+import httpx
+import openai
+import pytest
+from prometheus_client import REGISTRY
+from pydantic import ValidationError
+from models.linear import Team, TicketState
+from models.slack import Message
+from models.ticket import TicketerConfig, TicketPlan
+from tasks.ticket import service as ticket_service
+from tasks.ticket.prefilter import PreFilter
+
+TEAMS = [Team(id="t1", name="Engineering"), Team(id="t2", name="Design")]
+TEAM_STATES = {team.id: [TicketState(id=f"{team.id}-todo", name="Todo"), TicketState(id=f"{team.id}-done", name="Done")] for team in TEAMS}
+MESSAGE = Message(text="The export button crashes the app on Safari", user="U1", channel="C1", ts=1700000000.0)
+
+def make_plan(**fields) -> TicketPlan:
+    return TicketPlan(**{"chain_of_thought": "a bug report", "is_ticket_worthy": True, "title": "Export crashes on Safari",
+                         "team": "Engineering", "state": "Todo", **fields})
+
+class FakeLinear:
+    def __init__(self):
+        self.created = []
+
+    def find_ticket_by_id(self, ticket_id):
+        return None
+
+    def list_teams(self):
+        return TEAMS
+
+    def list_states_for_team(self, team):
+        return TEAM_STATES[team.id]
+
+    def create_ticket_with_slack_message(self, ticket):
+        ticket.url = f"https://linear.app/{ticket.id}"
+        self.created.append(ticket)
+
+class FakeSlack:
+    def __init__(self):
+        self.replies = []
+
+    def get_channel_by_id(self, channel_id):
+        return {"name": "bugs"}
+
+    def get_permalink_for_message(self, message):
+        return "https://slack.com/archives/C1/p1700000000"
+
+    def queue_reply(self, channel_id, message, thread_ts):
+        self.replies.append(message)
+
+class FakeWriter:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def parse(self, context, input, output_model):
+        if isinstance(self.plan, Exception):
+            raise self.plan
+        return self.plan
+
+    def summarize(self, context, word_limit, input):
+        return "Decided title"
+
+class FakeDecider:
+    def can_proceed(self, context, action, input, criteria):
+        return True, None
+
+    def get_best_option(self, context, options, criteria):
+        return len(options) - 1
+
+@pytest.fixture
+def ticketer():
+    def make(plan) -> ticket_service.Ticketer:
+        ticketer = ticket_service.Ticketer.__new__(ticket_service.Ticketer)
+        ticketer.logger = logging.getLogger(__name__)
+        ticketer.config = TicketerConfig(slack_admin_user_id="U0", slack_channel_configs=[{"channel_id": "C1"}])
+        ticketer.prefilter = PreFilter(ticketer.config)
+        ticketer.linear, ticketer.slack = FakeLinear(), FakeSlack()
+        ticketer.writer, ticketer.decider = FakeWriter(plan), FakeDecider()
+        return ticketer
+    return make
+
+def run_pipeline(ticketer):
+    asyncio.run(ticketer._run_pipeline(MESSAGE, "ticket-1"))
+    return ticketer.linear.created
+
+def test_plan_is_resolved_to_linear_team_and_state(ticketer):
+    plan, team, state = ticketer(make_plan())._plan_ticket(MESSAGE, {"name": "bugs"}, TEAMS, TEAM_STATES)
+    assert (team.id, state.id) == ("t1", "t1-todo")
+
+@pytest.mark.parametrize("fields", [{"team": "Marketing"}, {"state": "In Review"}, {"title": None}])
+def test_plan_with_unknown_team_or_state_is_rejected(ticketer, fields):
+    with pytest.raises(ValueError):
+        ticketer(make_plan(**fields))._plan_ticket(MESSAGE, {"name": "bugs"}, TEAMS, TEAM_STATES)
+
+def test_planned_ticket_is_created(ticketer):
+    [ticket] = run_pipeline(ticketer(make_plan()))
+    assert (ticket.title, ticket.team.name, ticket.state.id) == ("Export crashes on Safari", "Engineering", "t1-todo")
+
+def test_invalid_plan_falls_back_to_one_call_per_decision(ticketer):
+    [ticket] = run_pipeline(ticketer(make_plan(team="Marketing")))
+    assert (ticket.title, ticket.team.name, ticket.state.id) == ("Decided title", "Design", "t2-done")
+
+def test_plan_that_does_not_validate_falls_back(ticketer):
+    with pytest.raises(ValidationError) as error:
+        TicketPlan.model_validate({"chain_of_thought": "no decision"})
+    [ticket] = run_pipeline(ticketer(error.value))
+    assert ticket.title == "Decided title"
+
+def test_openai_errors_are_raised(ticketer):
+    ticketer = ticketer(openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com")))
+    with pytest.raises(openai.APIConnectionError):
+        run_pipeline(ticketer)
+    assert ticketer.linear.created == []
+
+def events(outcome: str) -> float:
+    return REGISTRY.get_sample_value("taskie_slack_events_total", {"outcome": outcome}) or 0
+
+def test_replies_and_prefiltered_messages_are_counted_apart(ticketer):
+    ticketer = ticketer(make_plan())
+    before = events("reply"), events("prefiltered")
+    ticketer.trigger_ticket_creation(MESSAGE.model_copy(update={"is_reply": True}))
+    ticketer.trigger_ticket_creation(MESSAGE.model_copy(update={"text": "thanks!"}))
+    ticketer.trigger_ticket_creation(MESSAGE.model_copy(update={"text": "ok"}))
+    assert (events("reply") - before[0], events("prefiltered") - before[1]) == (1, 2)
+    assert ticketer.linear.created == []
@@ -0,0 +1 @@
+from .service import ResponseCache, SQLiteCacheBackend, RedisCacheBackend, redis_client
\ No newline at end of file
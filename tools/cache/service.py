@@ -0,0 +1,147 @@
+'''
+ResponseCache is a content-addressed cache for LLM responses. Responses are keyed by a hash of everything that determines
+them (model, messages, temperature and, for structured outputs, the response schema), so re-running a pipeline on
+unchanged inputs reuses earlier responses instead of paying for them again.
+'''
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional
+import redis
+sys.path.append(os.environ['PROJECT_PATH'])
+from models.cache import ResponseCacheConfig, CacheBackend
+
+BYPASS_ENV_VAR = "TASKIE_LLM_CACHE_BYPASS"
+REDIS_URL_ENV_VAR = "REDIS_URL"
+
+# Every Redis client connects to REDIS_URL, e.g. redis://localhost:6379/0, or to the local default database if unset
+def redis_client() -> redis.Redis:
+    url = os.environ.get(REDIS_URL_ENV_VAR)
+    return redis.Redis.from_url(url) if url else redis.Redis()
+
+class SQLiteCacheBackend:
+    def __init__(self, path: str, max_entries: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )''')
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self.connection.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.connection.commit()
+                return None
+            self.connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.connection.commit()
+            return row[0]
+
+    def set(self, key: str, value: str, ttl_seconds: int):
+        now = time.time()
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, value, now + ttl_seconds, now))
+            self.connection.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            # least recently used entries go first once the cache is full
+            self.connection.execute('''
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )''', (self.max_entries,))
+            self.connection.commit()
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM responses")
+            self.connection.commit()
+
+class RedisCacheBackend:
+    def __init__(self, client: redis.Redis, max_entries: int, namespace: str = "taskie:llm:responses"):
+        self.client = client
+        self.max_entries = max_entries
+        self.namespace = namespace
+        # insertion order of keys, used to trim the cache down to max_entries
+        self.index_key = f"{namespace}:index"
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(f"{self.namespace}:{key}")
+        return value.decode() if value is not None else None
+
+    def set(self, key: str, value: str, ttl_seconds: int):
+        pipeline = self.client.pipeline()
+        pipeline.setex(f"{self.namespace}:{key}", ttl_seconds, value)
+        pipeline.zadd(self.index_key, {key: time.time()})
+        pipeline.execute()
+        overflow = self.client.zcard(self.index_key) - self.max_entries
+        if overflow > 0:
+            evicted = self.client.zpopmin(self.index_key, overflow)
+            self.client.delete(*[f"{self.namespace}:{evicted_key.decode()}" for evicted_key, _ in evicted])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f"{self.namespace}:*"))
+        if keys:
+            self.client.delete(*keys)
+
+class ResponseCache:
+    def __init__(self, backend, ttl_seconds: int, bypass: bool = False, logger=logging.getLogger(__name__)):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.bypass = bypass or os.environ.get(BYPASS_ENV_VAR, "").lower() in ["1", "true", "yes"]
+        self.logger = logger
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config: ResponseCacheConfig, logger=logging.getLogger(__name__)) -> "ResponseCache":
+        if config.backend == CacheBackend.REDIS:
+            backend = RedisCacheBackend(redis_client(), max_entries=config.max_entries)
+        else:
+            path = config.path if os.path.isabs(config.path) else os.path.join(os.environ['PROJECT_PATH'], config.path)
+            backend = SQLiteCacheBackend(path, max_entries=config.max_entries)
+        return cls(backend, ttl_seconds=config.ttl_seconds, bypass=config.bypass, logger=logger)
+
+    @staticmethod
+    def key(model: str, messages: list[dict], temperature: float, schema: dict = None) -> str:
+        payload = json.dumps({
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "schema": schema,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if self.bypass:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            self.logger.warning(f"LLM response cache read failed: {e}")
+            return None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: str):
+        try:
+            self.backend.set(key, value, self.ttl_seconds)
+        except Exception as e:
+            self.logger.warning(f"LLM response cache write failed: {e}")
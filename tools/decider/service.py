@@ -1,15 +1,69 @@
 '''
 Decider is an intelligent servie. It exposes methods to help make the best choice.
 '''
+import os
+import sys
 import openai
 import json
 import logging
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
+from pydantic import BaseModel
+sys.path.append(os.environ['PROJECT_PATH'])
+from tools.cache import ResponseCache
+from tools.metrics import track, record_token_usage
+from models.decider import BatchDecision
+
+# Chunk limits for batched classification, keeping each prompt well within the context window
+MAX_ITEMS_PER_CHUNK = 20
+MAX_CHARS_PER_CHUNK = 40000
+
+def _parse_response(content: str, output_model: type[BaseModel] = None) -> Union[dict, BaseModel]:
+    return output_model.model_validate_json(content) if output_model else json.loads(content)
+
 class Decider:
-    def __init__(self, model="gpt-3.5-turbo", logger=logging.getLogger(__name__)):
+    # `limit` is held while calling OpenAI, so that the clients sharing it keep at most its value of calls in flight
+    def __init__(self, model="gpt-3.5-turbo", logger=logging.getLogger(__name__), cache: ResponseCache = None,
+                 limit: threading.Semaphore = None):
         self.model = model
         self.logger = logger
+        self.cache = cache
+        self.limit = limit or nullcontext()
         return
 
+    # Returns the JSON response for the given messages, validated into output_model if given, from the response cache
+    # when possible. Only responses that parse and validate are cached, so a malformed response is retried on the next run.
+    def _complete_json(self, messages: list[dict], temperature: float, operation: str, output_model: type[BaseModel] = None,
+                       use_cache: bool = True) -> Union[dict, BaseModel]:
+        cache_key = None
+        if self.cache and use_cache:
+            cache_key = ResponseCache.key(self.model, messages, temperature)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                try:
+                    return _parse_response(cached, output_model)
+                except ValueError as e:
+                    self.logger.warning(f"Ignoring cached response that doesn't validate: {e}")
+        with self.limit, track("openai", operation):
+            response = openai.chat.completions.create(
+                model = self.model,
+                messages = messages,
+                temperature=temperature
+            )
+        record_token_usage(self.model, response.usage)
+        self.logger.debug(f"Response: {response}")
+        content = response.choices[0].message.content
+        try:
+            result = _parse_response(content, output_model)
+        except Exception as e:
+            self.logger.error(f"Response: {response}")
+            raise e
+        if cache_key:
+            self.cache.set(cache_key, content)
+        return result
+
     # This method should return the best option provided the decision criteria and the options
     def get_best_option(self, context: str, options: list[str], criteria: list[str], with_chain_of_thought=False):
         formatted_options = "\n".join([f"{i+1}. {option}" for i, option in enumerate(options)])
@@ -44,24 +98,115 @@ Options:
     "best_option": (index of the best option)
 }}
 '''
-        response = openai.chat.completions.create(
-            model = self.model,
-            messages = [
+        messages = [
             {"role": "system", "content": system_instruction},
             {"role": "user", "content": f"Options:\n{formatted_options}"}
-            ],
-            temperature=0.1
-        )
+            ]
+        # only a malformed response is handled here, errors calling OpenAI are raised to the caller
         try:
-            response_json = json.loads(response.choices[0].message.content)
-        except Exception as e:
+            response_json = self._complete_json(messages, temperature=0.1, operation="get_best_option")
+            self.logger.debug(f"Response: {response_json}")
+            if with_chain_of_thought:
+                return response_json["best_option"]-1, response_json["chain_of_thought"]
+            return response_json["best_option"]-1
+        except (json.JSONDecodeError, KeyError) as e:
             self.logger.error(f"Error in parsing decider response: {e}")
-            self.logger.error(f"Response: {response}")
             return e
-        self.logger.debug(f"Response: {response_json}")
-        if with_chain_of_thought:
-            return response_json["best_option"]-1, response_json["chain_of_thought"]
-        return response_json["best_option"]-1
+
+    # This method should return the best option for each of the items, sharing the options and criteria across items.
+    # Items are sent in as few calls as the chunk limits allow; an item without a valid decision maps to None.
+    def classify_items(self, context: str, items: list[str], options: list[str], criteria: list[str],
+                       max_items_per_chunk: int = MAX_ITEMS_PER_CHUNK, max_chars_per_chunk: int = MAX_CHARS_PER_CHUNK,
+                       concurrency: int = 1) -> list[int]:
+        chunks, chunk, chunk_chars = [], [], 0
+        for idx, item in enumerate(items):
+            if chunk and (len(chunk) >= max_items_per_chunk or chunk_chars + len(item) > max_chars_per_chunk):
+                chunks.append(chunk)
+                chunk, chunk_chars = [], 0
+            chunk.append(idx)
+            chunk_chars += len(item)
+        if chunk:
+            chunks.append(chunk)
+        self.logger.info(f"Classifying {len(items)} items in {len(chunks)} chunks")
+
+        def classify_chunk(chunk: list[int]) -> dict[int, int]:
+            decisions = self._classify_chunk(context, [items[idx] for idx in chunk], options, criteria)
+            # retry once, with only the items that came back missing or malformed
+            missing = [position for position in range(len(chunk)) if position not in decisions]
+            if missing:
+                self.logger.warning(f"Retrying classification for {len(missing)} of {len(chunk)} items")
+                # the response cache is skipped, as a retry of every item would get the failed response back from it
+                retried = self._classify_chunk(context, [items[chunk[position]] for position in missing], options, criteria, use_cache=False)
+                for retry_position, option_idx in retried.items():
+                    decisions[missing[retry_position]] = option_idx
+            return {chunk[position]: option_idx for position, option_idx in decisions.items()}
+
+        results = [None] * len(items)
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            for decisions in executor.map(classify_chunk, chunks):
+                for idx, option_idx in decisions.items():
+                    results[idx] = option_idx
+        return results
+
+    # Returns the 0-based option index per 0-based item position, for the items that got a valid decision
+    def _classify_chunk(self, context: str, items: list[str], options: list[str], criteria: list[str],
+                        use_cache: bool = True) -> dict[int, int]:
+        formatted_options = "\n".join([f"{i+1}. {option}" for i, option in enumerate(options)])
+        formatted_criteria = "\n".join([f"{i+1}. {criterion}" for i, criterion in enumerate(criteria)])
+        formatted_items = "\n\n".join([f"## Item {i+1}\n{item}" for i, item in enumerate(items)])
+        system_instruction = f'''
+# Mission
+You are an expert at deciding the best option for any situation. Your mission is to return the best option for EACH of \
+the given items, out of a shared set of options, by carefully considering the decision criteria.
+
+# Context
+{context}
+
+# Options
+{formatted_options}
+
+# Decision Criteria (sorted by importance)
+{formatted_criteria}
+
+# Instructions
+1. Think carefully from first principles and decide the best option for every item independently, based on the context and the decision criteria.
+2. You MUST return exactly one decision per item, for all {len(items)} items.
+3. Your response MUST be a valid JSON. DO NOT include an introduction before the JSON.
+
+# Format
+
+## Input
+## Item 1
+(details of item 1)
+... (as many as the number of items)
+
+## Output -- a valid JSON with the following fields only:
+{{
+    "decisions": [
+        {{
+            "item": (number of the item),
+            "chain_of_thought": (a brief chain of thought that led to the decision),
+            "best_option": (number of the best option)
+        }}
+    ]
+}}
+'''
+        messages = [
+            {"role": "system", "content": system_instruction},
+            {"role": "user", "content": formatted_items}]
+        try:
+            batch = self._complete_json(messages, temperature=0.1, operation="classify_items", output_model=BatchDecision,
+                                        use_cache=use_cache)
+        except Exception as e:
+            self.logger.error(f"Error in parsing batch decider response: {e}")
+            return {}
+        decisions = {}
+        for decision in batch.decisions:
+            if not 1 <= decision.item <= len(items) or not 1 <= decision.best_option <= len(options):
+                self.logger.warning(f"Ignoring out of range decision: {decision}")
+                continue
+            decisions.setdefault(decision.item - 1, decision.best_option - 1)
+        return decisions
 
     # This method should return whether to proceed with an action or not, along with follow-ups if any
     def can_proceed(self, context: str, action: str, input: str, criteria: list[str], examples: list[str] = []):
@@ -107,11 +252,5 @@ with the given action by carefully considering the provided context, and the dec
             {"role": "system", "content": system_instruction},
             {"role": "user", "content": input}]
         self.logger.debug(f"Messages: {messages}")
-        response = openai.chat.completions.create(
-            model = self.model,
-            messages = messages,
-            temperature=0
-        )
-        self.logger.debug(f"Response: {response}")
-        response_json = json.loads(response.choices[0].message.content)
+        response_json = self._complete_json(messages, temperature=0, operation="can_proceed")
         return response_json["can_proceed"], response_json.get("follow_ups", None)
\ No newline at end of file
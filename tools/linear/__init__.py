@@ -1 +1,3 @@
-from .service import LinearClient
\ No newline at end of file
+from .service import LinearClient, LinearBatcher, GraphQLOperation
+from .transport import LinearTransport, LinearAPIError, RequestPriority, TransportStats
+from .cache import MetadataCache, CacheStats
\ No newline at end of file
@@ -0,0 +1,118 @@
+'''
+MetadataCache keeps rarely changing Linear workspace metadata (teams, workflow states, labels) close to the caller:
+an in-process LRU with a TTL in front of Redis, so repeated lookups cost neither a Linear request nor a Redis round trip.
+Entries are kept in memory for a short while only, so an invalidation, which clears Redis, reaches every process soon.
+'''
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+import redis
+from pydantic import BaseModel
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MEMORY_TTL_SECONDS = 60
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_NAMESPACE = "taskie:linear:metadata"
+
+class CacheStats(BaseModel):
+    memory_hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.memory_hits + self.redis_hits + self.misses
+        return (self.memory_hits + self.redis_hits) / lookups if lookups else 0.0
+
+class MetadataCache:
+    def __init__(self, logger=logging.getLogger(__name__), redis_client: redis.Redis = None,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 namespace: str = DEFAULT_NAMESPACE, memory_ttl_seconds: int = DEFAULT_MEMORY_TTL_SECONDS):
+        self.logger = logger
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        # without Redis, memory is the only tier and keeps entries for the full TTL
+        self.memory_ttl_seconds = min(memory_ttl_seconds, ttl_seconds) if redis_client is not None else ttl_seconds
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    return value
+                del self._entries[key]
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(self._redis_key(key))
+            except redis.RedisError as e:
+                self.logger.warning(f"Metadata cache read from Redis failed: {e}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self._remember(key, value)
+                with self._lock:
+                    self.stats.redis_hits += 1
+                return value
+        with self._lock:
+            self.stats.misses += 1
+        return None
+
+    def set(self, key: str, value: Any):
+        self._remember(key, value)
+        if self.redis is not None:
+            try:
+                self.redis.setex(self._redis_key(key), self.ttl_seconds, json.dumps(value))
+            except redis.RedisError as e:
+                self.logger.warning(f"Metadata cache write to Redis failed: {e}")
+
+    def _remember(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.memory_ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Returns the cached value for `key`, calling `loader` and caching its result on a miss
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    # Drops `key`, every key starting with `prefix`, or everything when neither is given
+    def invalidate(self, key: str = None, prefix: str = None):
+        with self._lock:
+            if key is not None:
+                keys = [key] if key in self._entries else []
+            else:
+                keys = [k for k in self._entries if prefix is None or k.startswith(prefix)]
+            for k in keys:
+                del self._entries[k]
+            self.stats.invalidations += 1
+        if self.redis is None:
+            return
+        try:
+            if key is not None:
+                self.redis.delete(self._redis_key(key))
+            else:
+                redis_keys = list(self.redis.scan_iter(match=f"{self._redis_key(prefix or '')}*"))
+                if redis_keys:
+                    self.redis.delete(*redis_keys)
+        except redis.RedisError as e:
+            self.logger.warning(f"Metadata cache invalidation in Redis failed: {e}")
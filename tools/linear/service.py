@@ -1,24 +1,378 @@
 import os
-import requests
 import sys
 import logging
-from typing import List
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, List, Optional, Union
 sys.path.append(os.environ['PROJECT_PATH'])
-from models.linear import Project, Ticket, TicketState, Team
+from models.linear import Project, ProjectSummary, ProjectStates, Ticket, TicketState, Team, Connection
+from tools.linear.transport import LinearTransport, RequestPriority, LinearAPIError, response_type
+from tools.linear.cache import MetadataCache
 import json
 
 
-LINEAR_API_URL = "https://api.linear.app/graphql"
+# Projects per page for detailed project fetches, kept small as every project carries nested connections
+PROJECT_PAGE_SIZE = 20
+# Projects per page for project summaries, which are cheap enough for large pages
+PROJECT_SUMMARY_PAGE_SIZE = 100
+
+# Shapes of the `data` of project responses, which are decoded into models by the transport. Project details are decoded
+# straight from the response bytes, which uses about a third less peak memory, and summaries from the parsed JSON, which
+# is faster for them.
+PROJECT_DATA = dict[str, Optional[Project]]
+PROJECTS_DATA = dict[str, Connection[Project]]
+PROJECT_SUMMARIES_DATA = dict[str, Connection[ProjectSummary]]
+
+PROJECT_FIELDS_FRAGMENT = '''
+    fragment ProjectFields on Project {
+        id
+        name
+        description
+        state
+        targetDate
+        progress
+        url
+        teams {
+            nodes {
+                id
+                name
+            }
+        }
+        projectUpdates {
+            nodes {
+                id
+                createdAt
+                body
+                url
+                diffMarkdown
+                user {
+                    name
+                    id
+                    email
+                }
+            }
+        }
+        projectMilestones {
+            nodes {
+                id
+                name
+                description
+                targetDate
+                createdAt
+            }
+        }
+        lead {
+            name
+            id
+            email
+        }
+    }
+'''
+
+PROJECT_QUERY = PROJECT_FIELDS_FRAGMENT + '''
+    query($id: String!) {
+        project(id: $id) {
+            ...ProjectFields
+        }
+    }
+'''
+
+PROJECTS_QUERY = '''
+    query($filter: ProjectFilter, $after: String, $first: Int) {
+        projects(filter: $filter, after: $after, first: $first) {
+            nodes {
+                id
+                name
+                description
+                state
+                targetDate
+            }
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+        }
+    }
+'''
+
+PROJECTS_WITH_DETAILS_QUERY = PROJECT_FIELDS_FRAGMENT + '''
+    query($filter: ProjectFilter, $after: String, $first: Int) {
+        projects(filter: $filter, after: $after, first: $first) {
+            nodes {
+                ...ProjectFields
+            }
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+        }
+    }
+'''
+
+TEAMS_QUERY = '''
+    query {
+        teams {
+            nodes {
+                id
+                name
+            }
+        }
+    }
+'''
+
+WORKFLOW_STATES_QUERY = '''
+    query ($filter: WorkflowStateFilter!){
+        workflowStates(filter: $filter) {
+            nodes {
+                id
+                name
+                team {
+                    id
+                    name
+                }
+            }
+        }
+    }
+'''
+
+ALL_WORKFLOW_STATES_QUERY = '''
+    query {
+        workflowStates(first: 250) {
+            nodes {
+                id
+                name
+                team {
+                    id
+                    name
+                }
+            }
+        }
+    }
+'''
+
+LABELS_QUERY = '''
+    query ($filter: LabelFilter!){
+        labels(filter: $filter) {
+            nodes {
+                id
+                name
+            }
+        }
+    }
+'''
+
+ISSUE_QUERY = '''
+    query($id: String!) {
+        issue(id: $id) {
+            id
+            title
+            description
+            url
+        }
+    }
+'''
+
+ISSUE_CREATE_MUTATION = '''
+    mutation($input: IssueCreateInput!) {
+        issueCreate(input: $input) {
+            issue {
+                id
+                title
+                description
+                state {
+                    name
+                }
+                priority
+                labelIds
+                url
+                team {
+                    id
+                }
+            }
+        }
+    }
+'''
+
+ATTACHMENT_LINK_SLACK_MUTATION = '''
+    mutation($issueId: String!, $url: String!) {
+        attachmentLinkSlack(issueId: $issueId, url: $url) {
+            success
+        }
+    }
+'''
+
+
+def project_filter_variables(states: List[ProjectStates] = None, team_names: List[str] = None) -> Optional[dict]:
+    project_filter = {}
+    if states:
+        project_filter['state'] = {'in': [state.value for state in states]}
+    if team_names:
+        project_filter['accessibleTeams'] = {'some': {'name': {'in': team_names}}}
+    return project_filter or None
+
+def team_filter_variables(team: Team) -> dict:
+    return {
+        "filter": {
+            "team": {
+                "id": {
+                    'eq': team.id
+                }
+            }
+        }
+    }
+
+def issue_create_variables(ticket: Ticket) -> dict:
+    return {
+        'input': {
+            'id': ticket.id,
+            'title': ticket.title,
+            'description': ticket.description,
+            'priority': ticket.priority,
+            # 'labelIds': ['bug'],
+            'stateId': ticket.state.id,
+            'teamId': ticket.team.id
+        }
+    }
+
+# Default wait for more operations to join a batch before it is sent
+BATCH_WINDOW_SECONDS = 0.01
+MAX_BATCH_SIZE = 20
+# How long a caller waits for its batched operation. Longer than a request can take through the transport's retries, so
+# it only fails a caller whose batch is stuck.
+BATCH_RESULT_TIMEOUT_SECONDS = 300
+
+class GraphQLOperation:
+    def __init__(self, kind: str, field: str, arguments: dict[str, tuple[str, object]], selection: str):
+        # "query" or "mutation"; operations of different kinds never share a document
+        self.kind = kind
+        self.field = field
+        # argument name -> (GraphQL type, value)
+        self.arguments = arguments
+        self.selection = selection
+
+def issue_operation(id: str) -> GraphQLOperation:
+    return GraphQLOperation("query", "issue", {'id': ("String!", id)}, "id title description url")
+
+def issue_create_operation(ticket: Ticket) -> GraphQLOperation:
+    return GraphQLOperation("mutation", "issueCreate", {'input': ("IssueCreateInput!", issue_create_variables(ticket)['input'])},
+                            "issue { id title description url }")
+
+def attachment_link_slack_operation(ticket: Ticket) -> GraphQLOperation:
+    return GraphQLOperation("mutation", "attachmentLinkSlack",
+                            {'issueId': ("String!", ticket.id), 'url': ("String!", ticket.slack_message_url)}, "success")
+
+# Merges operations into one GraphQL document, giving each an alias and its own variable names
+def merge_operations(kind: str, operations: list[GraphQLOperation]) -> tuple[str, dict, list[str]]:
+    variable_definitions, fields, variables, aliases = [], [], {}, []
+    for idx, operation in enumerate(operations):
+        alias = f"op{idx}"
+        arguments = []
+        for name, (graphql_type, value) in operation.arguments.items():
+            variable_name = f"{alias}_{name}"
+            variable_definitions.append(f"${variable_name}: {graphql_type}")
+            arguments.append(f"{name}: ${variable_name}")
+            variables[variable_name] = value
+        fields.append(f"{alias}: {operation.field}({', '.join(arguments)}) {{ {operation.selection} }}")
+        aliases.append(alias)
+    document = f"{kind}({', '.join(variable_definitions)}) {{\n" + "\n".join(fields) + "\n}"
+    return document, variables, aliases
+
+# Coalesces operations issued within a short window into a single GraphQL request, in the spirit of DataLoader.
+# Each caller gets a future for its own operation, which fails on its own if Linear reports an error for it.
+# Mutations in a batch run in the order they were submitted, as GraphQL runs top-level mutation fields serially.
+class LinearBatcher:
+    def __init__(self, transport: LinearTransport, logger=logging.getLogger(__name__), priority: RequestPriority = RequestPriority.INTERACTIVE,
+                 window_seconds: float = BATCH_WINDOW_SECONDS, max_batch_size: int = MAX_BATCH_SIZE):
+        self.transport = transport
+        self.logger = logger
+        self.priority = priority
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self.lock = threading.Lock()
+        self.pending = {"query": [], "mutation": []}
+        self.timers = {}
+
+    def submit(self, operation: GraphQLOperation) -> Future:
+        future = Future()
+        with self.lock:
+            pending = self.pending[operation.kind]
+            pending.append((operation, future))
+            if len(pending) >= self.max_batch_size:
+                batch = self._take(operation.kind)
+            else:
+                batch = None
+                if operation.kind not in self.timers:
+                    timer = threading.Timer(self.window_seconds, self._flush, args=(operation.kind,))
+                    timer.daemon = True
+                    self.timers[operation.kind] = timer
+                    timer.start()
+        if batch:
+            self._send(operation.kind, batch)
+        return future
+
+    def _take(self, kind: str) -> list:
+        batch = self.pending[kind]
+        self.pending[kind] = []
+        timer = self.timers.pop(kind, None)
+        if timer:
+            timer.cancel()
+        return batch
+
+    def _flush(self, kind: str):
+        with self.lock:
+            batch = self._take(kind)
+        if batch:
+            self._send(kind, batch)
+
+    # Resolves every future in the batch, with an exception if anything goes wrong, so no caller is left waiting.
+    # Operations that can't be merged, and responses that aren't a GraphQL response, fail with a LinearAPIError.
+    def _send(self, kind: str, batch: list):
+        try:
+            try:
+                document, variables, aliases = merge_operations(kind, [operation for operation, _ in batch])
+            except (TypeError, ValueError) as e:
+                raise LinearAPIError([{"message": f"Could not merge batched operations: {e}"}])
+            self.logger.debug(f"Sending {len(batch)} batched {kind} operations")
+            response = self.transport.execute(document, variables, priority=self.priority, raise_on_errors=False)
+            if not isinstance(response, dict) or not isinstance(response.get('data') or {}, dict) or not isinstance(response.get('errors') or [], list):
+                raise LinearAPIError([{"message": f"Unexpected response to batched operations: {str(response)[:200]}"}])
+            data = response.get('data') or {}
+            errors_by_alias, unattributed_errors = {}, []
+            for error in response.get('errors') or []:
+                path = error.get('path') or []
+                if path and path[0] in aliases:
+                    errors_by_alias.setdefault(path[0], []).append(error)
+                else:
+                    unattributed_errors.append(error)
+            for alias, (_, future) in zip(aliases, batch):
+                if alias in errors_by_alias:
+                    future.set_exception(LinearAPIError(errors_by_alias[alias]))
+                elif unattributed_errors and data.get(alias) is None:
+                    future.set_exception(LinearAPIError(unattributed_errors))
+                else:
+                    future.set_result(data.get(alias))
+        except Exception as e:
+            self.logger.error(f"Error sending {len(batch)} batched {kind} operations: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
 
 class LinearClient:
-    def __init__(self, logger=logging.getLogger(__name__)):
+    def __init__(self, logger=logging.getLogger(__name__), transport: LinearTransport = None,
+                 priority: RequestPriority = RequestPriority.INTERACTIVE, metadata_cache: MetadataCache = None):
         self.api_key = os.getenv('LINEAR_API_KEY')
         self.logger = logger
+        self.transport = transport or LinearTransport(self.api_key, logger)
+        self.priority = priority
+        self.metadata_cache = metadata_cache
+        self.batcher = LinearBatcher(self.transport, logger, priority)
 
-    def _query(self, query, variables) -> dict:
-        headers = {'Authorization': self.api_key}
-        response = requests.post(LINEAR_API_URL, json={'query': query, 'variables': variables}, headers=headers)
-        return response.json()
+    # Returns the response body, or only its `data` decoded into data_type when one is given
+    def _query(self, query, variables, data_type=None, from_bytes=False):
+        if data_type is None:
+            return self.transport.execute(query, variables, priority=self.priority)
+        return self.transport.execute(query, variables, priority=self.priority, response_type=response_type(data_type, from_bytes)).data
 
     # def list_projects(self) -> list[Project]:
     #     query = """
@@ -39,238 +393,145 @@ class LinearClient:
     #     return projects
 
     def get_project_by_id(self, id) -> Project:
-        query = '''
-            query($id: String!) {
-                project(id: $id) {
-                    id
-                    name
-                    description
-                    state
-                    targetDate
-                    progress
-                    url
-                    teams {
-                        nodes {
-                            id
-                            name
-                        }
-                    }
-                    projectUpdates {
-                        nodes {
-                            id
-                            createdAt
-                            body
-                            url
-                            diffMarkdown
-                            user {
-                                name
-                                id
-                                email
-                            }
-                        }
-                    }
-                    projectMilestones {
-                        nodes {
-                            id
-                            name
-                            description
-                            targetDate
-                            createdAt
-                        }
-                    }
-                    lead {
-                        name
-                        id
-                        email
-                    }
-                }
-            }
-        '''
         variables = {'id': id}
         try:
-            json_response = self._query(query, variables)
+            data = self._query(PROJECT_QUERY, variables, PROJECT_DATA, from_bytes=True)
         except Exception as e:
             self.logger.error(f"Error fetching project by id: {e}")
-            self.logger.error(json_response)
             raise e
+        if data['project'] is None:
+            raise LinearAPIError([{"message": f"Project not found: {id}"}])
+        return data['project']
+
+    # Yields the projects matching the filters, which Linear applies, as each page arrives. The next page is fetched in
+    # the background while the caller works on the current one. Summaries are yielded, or full projects with details.
+    def iter_projects(self, states: List[ProjectStates] = None, team_names: List[str] = None, page_size: int = None,
+                      details: bool = False) -> Iterator[Union[ProjectSummary, Project]]:
+        if details:
+            query, data_type, page_size = PROJECTS_WITH_DETAILS_QUERY, PROJECTS_DATA, page_size or PROJECT_PAGE_SIZE
+        else:
+            query, data_type, page_size = PROJECTS_QUERY, PROJECT_SUMMARIES_DATA, page_size or PROJECT_SUMMARY_PAGE_SIZE
+        project_filter = project_filter_variables(states, team_names)
+
+        def fetch_page(cursor: Optional[str]):
+            try:
+                return self._query(query, {'filter': project_filter, 'after': cursor, 'first': page_size}, data_type, from_bytes=details)['projects']
+            except Exception as e:
+                self.logger.error(f"Error fetching projects: {e}")
+                raise e
+
+        prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="linear-prefetch")
         try:
-            json_project = json_response['data']['project']
-            project = Project(**json_project)
-        except Exception as e:
-            self.logger.error(f"Error parsing project: {e}")
-            self.logger.error(json_response)
-            raise e
-        return project
-
-    def list_projects(self) -> List[Project]:
-        query = '''
-            query($after: String, $first: Int) {
-                projects(after: $after, first: $first) {
-                    nodes {
-                        id
-                        name
-                        description
-                        state
-                        targetDate
-                    }
-                    pageInfo {
-                        hasNextPage
-                        endCursor
-                    }
-                }
-            }
-        '''
-        projects = []
-        has_next_page = True
-        cursor = None
-        while has_next_page:
-            variables = {'after': cursor, 'first': 10} if cursor else {}
-            json_response = self._query(query, variables)
-            json_projects = json_response['data']['projects']['nodes']
-            projects += [Project(**project) for project in json_projects]
-            has_next_page = json_response['data']['projects']['pageInfo']['hasNextPage']
-            cursor = json_response['data']['projects']['pageInfo']['endCursor']
+            next_page = prefetcher.submit(fetch_page, None)
+            while next_page is not None:
+                page = next_page.result()
+                next_page = prefetcher.submit(fetch_page, page.page_info.end_cursor) if page.page_info.has_next_page else None
+                yield from page.nodes
+        finally:
+            # a caller that stops early leaves at most one page in flight, which is discarded
+            prefetcher.shutdown(wait=False, cancel_futures=True)
+
+    # Lists every project, with only the fields list views need
+    def list_projects(self, states: List[ProjectStates] = None, team_names: List[str] = None) -> List[ProjectSummary]:
+        return list(self.iter_projects(states, team_names))
+
+    # Fetches full project details for all projects matching the filters
+    def list_projects_with_details(self, states: List[ProjectStates], team_names: List[str] = None) -> List[Project]:
+        projects = list(self.iter_projects(states, team_names, details=True))
+        self.logger.info(f"Fetched {len(projects)} projects with details")
         return projects
-    
+
+    # Teams, states and labels are read through the metadata cache when one is configured
+    def _cached(self, key: str, loader):
+        if self.metadata_cache is None:
+            return loader()
+        return self.metadata_cache.get_or_load(key, loader)
+
     def list_teams(self) -> list[Team]:
-        query = """
-            query {
-                teams {
-                    nodes {
-                        id
-                        name
-                    }
-                }
-            }
-            """
-        json_response = self._query(query, {})
-        response = json_response['data']['teams']['nodes']
-        teams = [Team(**team) for team in response]
+        def load():
+            json_response = self._query(TEAMS_QUERY, {})
+            return json_response['data']['teams']['nodes']
+        teams = [Team(**team) for team in self._cached("teams", load)]
         return teams
-    
+
     def list_states_for_team(self, team: Team) -> list[TicketState]:
-        query = """
-            query ($filter: WorkflowStateFilter!){
-                workflowStates(filter: $filter) {
-                    nodes {
-                        id
-                        name
-                        team {
-                            id
-                            name
-                        }
-                    }
-                }
-            }
-            """
-        variables = {
-            "filter": {
-                "team": {
-                    "id": {
-                        'eq': team.id
-                    }
-                }
-            }
-        }
-        json_response = self._query(query, variables)
-        states = json_response['data']['workflowStates']['nodes']
-        ticket_states = [TicketState(**state) for state in states]
+        def load():
+            json_response = self._query(WORKFLOW_STATES_QUERY, team_filter_variables(team))
+            return json_response['data']['workflowStates']['nodes']
+        ticket_states = [TicketState(**state) for state in self._cached(f"states:{team.id}", load)]
         team_states = [state for state in ticket_states if state.team.id == team.id]
         return team_states
-    
+
     def list_labels_for_team(self, team: Team) -> list[str]:
-        query = """
-            query ($filter: LabelFilter!){
-                labels(filter: $filter) {
-                    nodes {
-                        id
-                        name
-                    }
-                }
-            }
-            """
-        variables = {
-            "filter": {
-                "team": {
-                    "id": {
-                        'eq': team.id
-                    }
-                }
-            }
-        }
-        json_response = self._query(query, variables)
-        labels = json_response['data']['labels']['nodes']
-        label_names = [label['name'] for label in labels]
+        def load():
+            json_response = self._query(LABELS_QUERY, team_filter_variables(team))
+            return json_response['data']['labels']['nodes']
+        label_names = [label['name'] for label in self._cached(f"labels:{team.id}", load)]
         return label_names
-    
+
+    # Fills the metadata cache with every team and workflow state in two requests, and labels per team
+    def prefetch_metadata(self, include_labels: bool = True):
+        if self.metadata_cache is None:
+            return
+        teams = self._query(TEAMS_QUERY, {})['data']['teams']['nodes']
+        self.metadata_cache.set("teams", teams)
+        states = self._query(ALL_WORKFLOW_STATES_QUERY, {})['data']['workflowStates']['nodes']
+        for team in teams:
+            team_states = [state for state in states if state['team']['id'] == team['id']]
+            # teams beyond the first page of states are left to load on first use
+            if team_states:
+                self.metadata_cache.set(f"states:{team['id']}", team_states)
+            if include_labels:
+                labels = self._query(LABELS_QUERY, team_filter_variables(Team(**team)))['data']['labels']['nodes']
+                self.metadata_cache.set(f"labels:{team['id']}", labels)
+        self.logger.info(f"Prefetched metadata for {len(teams)} teams")
+
+    # Drops cached metadata, e.g. after a team or workflow change in Linear
+    def invalidate_metadata(self, team: Team = None):
+        if self.metadata_cache is None:
+            return
+        if team is None:
+            self.metadata_cache.invalidate()
+            return
+        self.metadata_cache.invalidate(key=f"states:{team.id}")
+        self.metadata_cache.invalidate(key=f"labels:{team.id}")
+
+    # Ticket lookups and mutations go through the batcher, so concurrent callers share requests
     def get_ticket_by_id(self, id: str) -> Ticket:
         self.logger.debug(f"Getting ticket by id: {id}")
-        query = '''
-            query($id: String!) {
-                issue(id: $id) {
-                    id
-                    title
-                    description
-                    url
-                }
-            }
-        '''
-        variables = {'id': id}
-        json_response = self._query(query, variables)
-        self.logger.debug(f"Get ticket by ID response: {json_response}")
-        json_ticket = json_response['data']['issue']
+        json_ticket = self.batcher.submit(issue_operation(id)).result(timeout=BATCH_RESULT_TIMEOUT_SECONDS)
+        self.logger.debug(f"Get ticket by ID response: {json_ticket}")
         ticket= Ticket(**json_ticket)
         return ticket
-    
+
+    # Returns None if Linear has no ticket with the id, which it reports as an "Entity not found" error
+    def find_ticket_by_id(self, id: str) -> Optional[Ticket]:
+        try:
+            json_ticket = self.batcher.submit(issue_operation(id)).result(timeout=BATCH_RESULT_TIMEOUT_SECONDS)
+        except LinearAPIError as e:
+            if all("not found" in error.get("message", "").lower() for error in e.errors):
+                return None
+            raise e
+        return Ticket(**json_ticket) if json_ticket else None
+
     def create_ticket(self, ticket: Ticket):
         self.logger.debug(f"Creating ticket: {ticket.model_dump_json()}")
-        query = '''
-            mutation($input: IssueCreateInput!) {
-                issueCreate(input: $input) {
-                    issue {
-                        id
-                        title
-                        description
-                        state {
-                            name
-                        }
-                        priority
-                        labelIds
-                        team {
-                            id
-                        }
-                    }
-                }
-            }
-        '''
-        variables = {
-            'input': {
-                'id': ticket.id,
-                'title': ticket.title,
-                'description': ticket.description,
-                'priority': ticket.priority,
-                # 'labelIds': ['bug'],
-                'stateId': ticket.state.id,
-                'teamId': ticket.team.id
-            }
-        }
-        response = self._query(query, variables)
+        response = self.batcher.submit(issue_create_operation(ticket)).result(timeout=BATCH_RESULT_TIMEOUT_SECONDS)
         self.logger.debug(response)
+        ticket.url = response['issue']['url']
         return
-    
+
     def attach_slack_message_to_ticket(self, ticket: Ticket):
         self.logger.debug(f"Attaching Slack message to ticket: {ticket.model_dump_json()}")
-        query = '''
-            mutation($issueId: String!, $url: String!) {
-                attachmentLinkSlack(issueId: $issueId, url: $url) {
-                    success
-                }
-            }
-        '''
-        variables = {
-            'issueId': ticket.id,
-            'url': ticket.slack_message_url,
-        }
-        response = self._query(query, variables)
+        response = self.batcher.submit(attachment_link_slack_operation(ticket)).result(timeout=BATCH_RESULT_TIMEOUT_SECONDS)
         self.logger.debug(response)
         return
+
+    # Creates the ticket, attaches its Slack message and sets its URL, in a single request
+    def create_ticket_with_slack_message(self, ticket: Ticket):
+        self.logger.debug(f"Creating ticket with Slack message: {ticket.model_dump_json()}")
+        created = self.batcher.submit(issue_create_operation(ticket))
+        attached = self.batcher.submit(attachment_link_slack_operation(ticket))
+        ticket.url = created.result(timeout=BATCH_RESULT_TIMEOUT_SECONDS)['issue']['url']
+        attached.result(timeout=BATCH_RESULT_TIMEOUT_SECONDS)
+        return
@@ -0,0 +1,315 @@
+'''
+The Linear transport sends GraphQL requests for the Linear clients. It paces requests against Linear's request and
+complexity rate limits using local token buckets kept in sync with the rate limit response headers, retries rate limited
+and transient failures with jittered exponential backoff, and raises on GraphQL errors.
+'''
+import os
+import re
+import sys
+import json
+import time
+import random
+import logging
+import threading
+from enum import Enum
+from functools import lru_cache
+from typing import Generic, Optional, TypeVar, Union
+import httpx
+from pydantic import BaseModel, TypeAdapter
+sys.path.append(os.environ['PROJECT_PATH'])
+from tools.metrics import track, record_request, record_throttle, record_retry
+from tools.ratelimit import TokenBucket
+
+LINEAR_API_URL = os.environ.get("LINEAR_API_URL", "https://api.linear.app/graphql")
+
+# Linear's documented hourly budgets for API key authentication, used until the first response tells us otherwise
+DEFAULT_REQUESTS_PER_HOUR = 1500
+DEFAULT_COMPLEXITY_PER_HOUR = 250000
+# Complexity assumed for a query we haven't seen a response for yet
+DEFAULT_QUERY_COMPLEXITY = 100
+# Share of each bucket that background requests leave untouched for interactive ones
+BACKGROUND_RESERVE_RATIO = 0.1
+
+MAX_RETRIES = 4
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+MAX_SLEEP_SECONDS = 5.0
+DEFAULT_TIMEOUT_SECONDS = 30
+
+RETRYABLE_STATUS_CODES = [429, 500, 502, 503, 504]
+RATE_LIMITED_ERROR_CODE = "RATELIMITED"
+
+
+DataType = TypeVar("DataType")
+
+# A GraphQL response body, with `data` decoded into the given type
+class GraphQLResponse(BaseModel, Generic[DataType]):
+    data: Optional[DataType] = None
+    errors: Optional[list[dict]] = None
+
+# Decodes a response body into a GraphQLResponse, either straight from the raw bytes or from the parsed JSON. Validating
+# the bytes skips the intermediate dicts, which keeps peak memory down for large nested payloads, while validating the
+# parsed JSON is faster for these string-heavy models. See benchmarks/decoding.py.
+class ResponseType:
+    def __init__(self, data_type, from_bytes: bool = False):
+        self.adapter = TypeAdapter(GraphQLResponse[data_type])
+        self.from_bytes = from_bytes
+
+    # Raises a ValueError for a body that isn't JSON or doesn't match the type
+    def decode(self, content: bytes) -> GraphQLResponse:
+        if self.from_bytes:
+            return self.adapter.validate_json(content)
+        return self.adapter.validate_python(json.loads(content))
+
+# Response types are built once per data type, as building a TypeAdapter compiles its validator
+@lru_cache(maxsize=None)
+def response_type(data_type, from_bytes: bool = False) -> ResponseType:
+    return ResponseType(data_type, from_bytes)
+
+
+class RequestPriority(str, Enum):
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+
+
+class LinearAPIError(Exception):
+    def __init__(self, errors: list, status_code: int = None):
+        self.errors = errors
+        self.status_code = status_code
+        messages = "; ".join([error.get("message", str(error)) for error in errors])
+        super().__init__(f"Linear API error ({status_code}): {messages}")
+
+
+class TransportStats(BaseModel):
+    requests: int = 0
+    retries: int = 0
+    rate_limited_responses: int = 0
+    # time spent waiting for local buckets before sending, i.e. rejections we avoided
+    throttled_requests: int = 0
+    throttle_seconds: float = 0.0
+    # time spent backing off after the server rejected, or failed, a request
+    backoff_seconds: float = 0.0
+
+
+class RateLimitScheduler:
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self):
+        self.requests = TokenBucket(DEFAULT_REQUESTS_PER_HOUR)
+        self.complexity = TokenBucket(DEFAULT_COMPLEXITY_PER_HOUR)
+        self.stats = TransportStats()
+        self.lock = threading.Lock()
+        self._paused_until = 0
+        self._complexity_estimates = {}
+
+    # Rate limits are per API key, so every client using the same key in this process shares one scheduler
+    @classmethod
+    def for_api_key(cls, api_key: str) -> "RateLimitScheduler":
+        with cls._instances_lock:
+            if api_key not in cls._instances:
+                cls._instances[api_key] = cls()
+            return cls._instances[api_key]
+
+    def estimate_complexity(self, query: str) -> int:
+        return self._complexity_estimates.get(query, DEFAULT_QUERY_COMPLEXITY)
+
+    # Takes tokens for a request if both buckets allow it, otherwise returns how long to wait before trying again.
+    # Background requests keep a reserve free, so interactive requests overtake them when the budget runs low.
+    def try_acquire(self, complexity: int, priority: RequestPriority) -> float:
+        with self.lock:
+            now = time.monotonic()
+            reserve_ratio = BACKGROUND_RESERVE_RATIO if priority == RequestPriority.BACKGROUND else 0
+            wait = max(
+                self._paused_until - now,
+                self.requests.wait_time(1, reserve_ratio * self.requests.capacity, now),
+                self.complexity.wait_time(complexity, reserve_ratio * self.complexity.capacity, now),
+            )
+            if wait <= 0:
+                self.requests.consume(1)
+                self.complexity.consume(complexity)
+                self.stats.requests += 1
+                record_request("linear")
+                return 0
+            return wait
+
+    def record_response(self, query: str, headers: httpx.Headers):
+        with self.lock:
+            if "x-complexity" in headers:
+                self._complexity_estimates[query] = int(headers["x-complexity"])
+            self.requests.sync(_header_float(headers, "x-ratelimit-requests-limit"),
+                               _header_float(headers, "x-ratelimit-requests-remaining"))
+            self.complexity.sync(_header_float(headers, "x-ratelimit-complexity-limit"),
+                                 _header_float(headers, "x-ratelimit-complexity-remaining"))
+
+    # Holds back every request until `delay` has passed, after the server has rejected one
+    def pause(self, delay: float):
+        with self.lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def record_throttle(self, seconds: float):
+        with self.lock:
+            self.stats.throttled_requests += 1
+            self.stats.throttle_seconds += seconds
+        record_throttle("linear", seconds)
+
+    def record_retry(self, backoff_seconds: float, rate_limited: bool):
+        with self.lock:
+            self.stats.retries += 1
+            self.stats.backoff_seconds += backoff_seconds
+            if rate_limited:
+                self.stats.rate_limited_responses += 1
+        record_retry("linear", backoff_seconds, rate_limited)
+
+
+def _header_float(headers: httpx.Headers, name: str) -> Optional[float]:
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def _body_errors(body: Union[dict, GraphQLResponse, None]) -> list:
+    if isinstance(body, GraphQLResponse):
+        return body.errors or []
+    return (body or {}).get("errors") or []
+
+def _body_data(body: Union[dict, GraphQLResponse, None]):
+    if isinstance(body, GraphQLResponse):
+        return body.data
+    return (body or {}).get("data")
+
+def _is_rate_limited(response: httpx.Response, body: Union[dict, GraphQLResponse, None]) -> bool:
+    if response.status_code == 429:
+        return True
+    for error in _body_errors(body):
+        if (error.get("extensions") or {}).get("code") == RATE_LIMITED_ERROR_CODE:
+            return True
+    return False
+
+# Full jitter backoff, stretched to the reset time Linear reports when a budget is exhausted
+def _backoff_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+    if response is not None:
+        retry_after = _header_float(response.headers, "retry-after")
+        if retry_after is not None:
+            return retry_after + delay
+        for limit in ["requests", "complexity"]:
+            if _header_float(response.headers, f"x-ratelimit-{limit}-remaining") == 0:
+                reset_at_ms = _header_float(response.headers, f"x-ratelimit-{limit}-reset")
+                if reset_at_ms:
+                    return max(0, reset_at_ms / 1000 - time.time()) + delay
+    return delay
+
+OPERATION_START = re.compile(r"^\s*(query|mutation)\b[^{]*\{", re.MULTILINE)
+FIELD_NAME = re.compile(r"(?:\w+\s*:\s*)?(\w+)")
+
+# Names a GraphQL document by its top-level fields, e.g. "attachmentLinkSlack+issueCreate" for a batch, for metrics
+@lru_cache(maxsize=256)
+def graphql_operation_name(query: str) -> str:
+    match = OPERATION_START.search(query)
+    if not match:
+        return "unknown"
+    body, fields, depth, idx = query[match.end():], set(), 0, 0
+    while idx < len(body):
+        char = body[idx]
+        if char in "{(":
+            depth += 1
+        elif char in "})":
+            if depth == 0:
+                break
+            depth -= 1
+        elif depth == 0 and (char.isalpha() or char == "_"):
+            field = FIELD_NAME.match(body, idx)
+            fields.add(field.group(1))
+            idx = field.end()
+            continue
+        idx += 1
+    return "+".join(sorted(fields)) or "unknown"
+
+# Decodes the body into the response type when one is given. A body that doesn't match the type, e.g. when errors null
+# out required fields, is decoded as plain JSON to report the errors.
+def _parse_body(response: httpx.Response, response_type: ResponseType = None) -> Union[dict, GraphQLResponse, None]:
+    if response_type is not None:
+        try:
+            return response_type.decode(response.content)
+        except ValueError:
+            pass
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+class LinearTransport:
+    # The client keeps its connections alive, and multiplexes concurrent requests over them with HTTP/2. Callers running
+    # requests from several threads can bound how many connections they open with max_connections.
+    def __init__(self, api_key: str = None, logger=logging.getLogger(__name__), scheduler: RateLimitScheduler = None,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS, http2: bool = True, max_connections: int = None):
+        self.api_key = api_key or os.getenv('LINEAR_API_KEY')
+        self.logger = logger
+        self.scheduler = scheduler or RateLimitScheduler.for_api_key(self.api_key)
+        # httpx's default pool limits apply unless a limit is given
+        limits = {'limits': httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)} if max_connections else {}
+        self.client = httpx.Client(http2=http2, timeout=timeout, headers={'Authorization': self.api_key or ''}, **limits)
+
+    @property
+    def stats(self) -> TransportStats:
+        return self.scheduler.stats
+
+    def close(self):
+        self.client.close()
+
+    def _wait_for_budget(self, query: str, priority: RequestPriority):
+        complexity = self.scheduler.estimate_complexity(query)
+        waited = 0
+        while (wait := self.scheduler.try_acquire(complexity, priority)) > 0:
+            wait = min(wait, MAX_SLEEP_SECONDS)
+            time.sleep(wait)
+            waited += wait
+        if waited:
+            self.scheduler.record_throttle(waited)
+            self.logger.debug(f"Throttled Linear request for {waited:.2f}s")
+
+    # Returns the response body, as a dict, or as a GraphQLResponse when a response type from `response_type` is given.
+    # With raise_on_errors off, GraphQL errors are returned alongside partial data.
+    def execute(self, query: str, variables: dict, priority: RequestPriority = RequestPriority.INTERACTIVE,
+                raise_on_errors: bool = True, response_type: ResponseType = None):
+        with track("linear", graphql_operation_name(query)):
+            return self._execute(query, variables, priority, raise_on_errors, response_type)
+
+    def _execute(self, query: str, variables: dict, priority: RequestPriority, raise_on_errors: bool, response_type: ResponseType):
+        for attempt in range(MAX_RETRIES + 1):
+            self._wait_for_budget(query, priority)
+            response, body = None, None
+            try:
+                response = self.client.post(LINEAR_API_URL, json={'query': query, 'variables': variables})
+                self.scheduler.record_response(query, response.headers)
+                body = _parse_body(response, response_type)
+            except httpx.TransportError as e:
+                self.logger.warning(f"Linear request failed: {e}")
+                if attempt == MAX_RETRIES:
+                    raise e
+            rate_limited = response is not None and _is_rate_limited(response, body)
+            retryable = response is None or rate_limited or response.status_code in RETRYABLE_STATUS_CODES
+            if retryable and attempt < MAX_RETRIES:
+                delay = _backoff_delay(attempt, response)
+                if rate_limited:
+                    self.scheduler.pause(delay)
+                self.scheduler.record_retry(delay, rate_limited)
+                self.logger.warning(f"Retrying Linear request in {delay:.2f}s (attempt {attempt + 1} of {MAX_RETRIES})")
+                time.sleep(delay)
+                continue
+            return _check_body(response, body, raise_on_errors, response_type)
+
+
+def _check_body(response: httpx.Response, body: Union[dict, GraphQLResponse, None], raise_on_errors: bool = True,
+                response_type: ResponseType = None):
+    if body is None:
+        raise LinearAPIError([{"message": response.text[:500]}], response.status_code)
+    errors = _body_errors(body)
+    if errors and (raise_on_errors or _body_data(body) is None):
+        raise LinearAPIError(errors, response.status_code)
+    if response_type is not None and not isinstance(body, GraphQLResponse):
+        raise LinearAPIError([{"message": f"Unexpected response shape: {response.text[:500]}"}], response.status_code)
+    return body
@@ -0,0 +1 @@
+from .service import track, record_token_usage, record_event, record_request, record_throttle, record_retry, record_report_delivery, start_metrics_server, EVENT_BACKLOG
\ No newline at end of file
@@ -0,0 +1,87 @@
+'''
+Process-wide Prometheus metrics: latency and errors of calls to external services, how they're paced against rate
+limits, LLM token usage, and the outcomes of Slack events. Long-running processes expose them over HTTP with `start_metrics_server`.
+'''
+import time
+import logging
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+# LLM calls take seconds, so the buckets reach well beyond the usual web latencies
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+EXTERNAL_CALL_SECONDS = Histogram(
+    "taskie_external_call_seconds", "Latency of calls to external services, including retries",
+    ["service", "operation"], buckets=LATENCY_BUCKETS)
+EXTERNAL_CALL_ERRORS = Counter(
+    "taskie_external_call_errors_total", "Calls to external services that failed",
+    ["service", "operation", "error"])
+RATE_LIMITED_REQUESTS = Counter(
+    "taskie_rate_limited_requests_total", "Requests sent once the local rate limit budget allowed them",
+    ["service"])
+THROTTLED_REQUESTS = Counter(
+    "taskie_throttled_requests_total", "Requests held back by the local rate limit budget before being sent",
+    ["service"])
+THROTTLE_SECONDS = Counter(
+    "taskie_throttle_seconds_total", "Time requests waited for the local rate limit budget before being sent",
+    ["service"])
+# reason is rate_limited when the server rejected the request for its rate limit, error for other transient failures
+RETRIES = Counter(
+    "taskie_retries_total", "Requests retried after the server rejected, or failed, them",
+    ["service", "reason"])
+BACKOFF_SECONDS = Counter(
+    "taskie_backoff_seconds_total", "Time spent backing off before retrying requests",
+    ["service"])
+LLM_TOKENS = Counter(
+    "taskie_llm_tokens_total", "Tokens used by LLM calls, excluding responses served from the cache",
+    ["model", "kind"])
+# accepted, filtered and duplicate are counted by the consumer; reply, prefiltered, rejected and ticketed by the ticketer
+SLACK_EVENTS = Counter(
+    "taskie_slack_events_total", "Slack message events, by how far they got through the pipeline",
+    ["outcome"])
+REPORT_DELIVERY_SECONDS = Histogram(
+    "taskie_report_delivery_seconds", "Time from the start of a report run until a part of the report is in Slack",
+    ["stage"], buckets=LATENCY_BUCKETS + (160, 320, 640))
+EVENT_BACKLOG = Gauge(
+    "taskie_event_backlog", "Slack events queued, or being processed, by the consumer")
+
+# Times the enclosed call to an external service, counting it as an error if it raises
+@contextmanager
+def track(service: str, operation: str):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        EXTERNAL_CALL_ERRORS.labels(service, operation, type(e).__name__).inc()
+        raise
+    finally:
+        EXTERNAL_CALL_SECONDS.labels(service, operation).observe(time.perf_counter() - start)
+
+def record_request(service: str):
+    RATE_LIMITED_REQUESTS.labels(service).inc()
+
+def record_throttle(service: str, seconds: float):
+    THROTTLED_REQUESTS.labels(service).inc()
+    THROTTLE_SECONDS.labels(service).inc(seconds)
+
+def record_retry(service: str, backoff_seconds: float, rate_limited: bool):
+    RETRIES.labels(service, "rate_limited" if rate_limited else "error").inc()
+    BACKOFF_SECONDS.labels(service).inc(backoff_seconds)
+
+# Records the usage reported with an OpenAI completion, if any
+def record_token_usage(model: str, usage):
+    if usage is None:
+        return
+    LLM_TOKENS.labels(model, "prompt").inc(usage.prompt_tokens or 0)
+    LLM_TOKENS.labels(model, "completion").inc(usage.completion_tokens or 0)
+
+def record_event(outcome: str):
+    SLACK_EVENTS.labels(outcome).inc()
+
+def record_report_delivery(stage: str, seconds: float):
+    REPORT_DELIVERY_SECONDS.labels(stage).observe(seconds)
+
+# Serves the metrics in the Prometheus text format on a background thread
+def start_metrics_server(port: int, logger=logging.getLogger(__name__)):
+    start_http_server(port)
+    logger.info(f"Serving metrics on port {port}")
@@ -0,0 +1 @@
+from .service import PromptCompactor, CompactionStats, estimate_tokens, truncate_to_tokens
\ No newline at end of file
@@ -0,0 +1,59 @@
+'''
+Prompt compaction helpers. Token counts are estimated locally, from word and punctuation pieces the way BPE tokenizers
+roughly split text, so prompts can be kept within a token budget without a tokenizer dependency or a network call.
+'''
+import re
+import math
+import threading
+from pydantic import BaseModel
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# BPE vocabularies average around four characters per token for English words
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = " …"
+
+def estimate_tokens(text: str) -> int:
+    return sum(max(1, math.ceil(len(piece) / CHARS_PER_TOKEN)) for piece in TOKEN_PATTERN.findall(text))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    tokens = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        tokens += max(1, math.ceil(len(match.group()) / CHARS_PER_TOKEN))
+        if tokens > max_tokens:
+            return text[:match.start()].rstrip() + TRUNCATION_MARKER
+    return text
+
+class CompactionStats(BaseModel):
+    prompts: int = 0
+    tokens_kept: int = 0
+    tokens_trimmed: int = 0
+
+class PromptCompactor:
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+        self.stats = CompactionStats()
+        self.lock = threading.Lock()
+
+    # Joins sections, sorted by importance, within the token budget: sections are kept whole while they fit, the first
+    # one that doesn't is truncated to what's left, and the rest are dropped. Trimmed tokens are counted against
+    # `baseline`, the text the prompt would otherwise have carried, when given.
+    def fit(self, sections: list[str], separator: str = "\n\n", baseline: str = None) -> str:
+        kept, remaining, kept_tokens = [], self.token_budget, 0
+        for section in sections:
+            tokens = estimate_tokens(section)
+            if tokens <= remaining:
+                kept.append(section)
+                kept_tokens += tokens
+                remaining -= tokens
+                continue
+            if remaining > 0:
+                truncated = truncate_to_tokens(section, remaining)
+                kept.append(truncated)
+                kept_tokens += estimate_tokens(truncated)
+                remaining = 0
+        with self.lock:
+            self.stats.prompts += 1
+            self.stats.tokens_kept += kept_tokens
+            original_tokens = estimate_tokens(baseline) if baseline is not None else sum(estimate_tokens(section) for section in sections)
+            self.stats.tokens_trimmed += max(0, original_tokens - kept_tokens)
+        return separator.join(kept)
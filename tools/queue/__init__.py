@@ -0,0 +1 @@
+from .service import RedisStreamQueue, LocalQueue, WorkerPool
\ No newline at end of file
@@ -0,0 +1,174 @@
+'''
+Work queues decouple receiving an event from processing it. RedisStreamQueue is durable: entries survive restarts, and
+entries a crashed worker never acknowledged are redelivered. LocalQueue is an in-memory stand-in with the same interface,
+for running without Redis. Both drop duplicate deliveries of the same event.
+'''
+import os
+import sys
+import json
+import uuid
+import queue
+import time
+import socket
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+import redis
+sys.path.append(os.environ['PROJECT_PATH'])
+from models.queue import QueuedEvent
+
+DEDUPE_TTL_SECONDS = 24 * 60 * 60
+# the local queue remembers at most this many event ids, the oldest going first
+MAX_LOCAL_SEEN_EVENTS = 10000
+# entries left unacknowledged for this long are redelivered to another worker
+VISIBILITY_TIMEOUT_MS = 5 * 60 * 1000
+MAX_ATTEMPTS = 3
+
+class RedisStreamQueue:
+    def __init__(self, cache: redis.Redis, stream: str, group: str = "workers", logger=logging.getLogger(__name__),
+                 max_attempts: int = MAX_ATTEMPTS, visibility_timeout_ms: int = VISIBILITY_TIMEOUT_MS):
+        self.cache = cache
+        self.stream = stream
+        self.group = group
+        self.dead_letter_stream = f"{stream}:dead"
+        self.logger = logger
+        self.max_attempts = max_attempts
+        self.visibility_timeout_ms = visibility_timeout_ms
+        try:
+            self.cache.xgroup_create(stream, group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise e
+
+    # Returns False if the event was already enqueued, e.g. when Slack retries a delivery. The event is only marked as
+    # seen for good once it's in the stream, so that a delivery that failed to enqueue is accepted when Slack retries it.
+    def enqueue(self, event_id: str, body: dict) -> bool:
+        seen_key = f"{self.stream}:seen:{event_id}"
+        if not self.cache.set(seen_key, 1, nx=True, ex=DEDUPE_TTL_SECONDS):
+            return False
+        try:
+            self.cache.xadd(self.stream, {"event_id": event_id, "body": json.dumps(body)})
+        except Exception as e:
+            self.cache.delete(seen_key)
+            raise e
+        return True
+
+    def dequeue(self, consumer: str, block_ms: int = 1000) -> Optional[QueuedEvent]:
+        # entries abandoned by a crashed or failed worker come first
+        _, claimed, *_ = self.cache.xautoclaim(self.stream, self.group, consumer, min_idle_time=self.visibility_timeout_ms, count=1)
+        if claimed:
+            entry_id, fields = claimed[0]
+        else:
+            response = self.cache.xreadgroup(self.group, consumer, {self.stream: ">"}, count=1, block=block_ms)
+            if not response:
+                return None
+            entry_id, fields = response[0][1][0]
+        entry_id = entry_id.decode()
+        pending = self.cache.xpending_range(self.stream, self.group, min=entry_id, max=entry_id, count=1)
+        attempts = pending[0]["times_delivered"] if pending else 1
+        return QueuedEvent(id=entry_id, event_id=fields[b"event_id"].decode(), body=json.loads(fields[b"body"]), attempts=attempts)
+
+    def ack(self, event: QueuedEvent):
+        pipeline = self.cache.pipeline()
+        pipeline.xack(self.stream, self.group, event.id)
+        pipeline.xdel(self.stream, event.id)
+        pipeline.execute()
+
+    # Leaves the entry pending so it's redelivered after the visibility timeout, until it runs out of attempts
+    def nack(self, event: QueuedEvent):
+        if event.attempts < self.max_attempts:
+            return
+        self.logger.error(f"Giving up on event {event.event_id} after {event.attempts} attempts")
+        self.cache.xadd(self.dead_letter_stream, {"event_id": event.event_id, "body": json.dumps(event.body)})
+        self.ack(event)
+
+    # Entries waiting to be processed, including those in progress
+    def depth(self) -> int:
+        return self.cache.xlen(self.stream)
+
+class LocalQueue:
+    def __init__(self, logger=logging.getLogger(__name__), max_attempts: int = MAX_ATTEMPTS):
+        self.logger = logger
+        self.max_attempts = max_attempts
+        self.events = queue.Queue()
+        # event id -> when it was enqueued, oldest first
+        self.seen_event_ids = OrderedDict()
+        self.lock = threading.Lock()
+
+    # Forgets event ids older than the dedupe TTL, and the oldest ones beyond the size limit
+    def _forget_expired(self, now: float):
+        while self.seen_event_ids:
+            event_id, seen_at = next(iter(self.seen_event_ids.items()))
+            if now - seen_at < DEDUPE_TTL_SECONDS and len(self.seen_event_ids) < MAX_LOCAL_SEEN_EVENTS:
+                break
+            del self.seen_event_ids[event_id]
+
+    def enqueue(self, event_id: str, body: dict) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self._forget_expired(now)
+            if event_id in self.seen_event_ids:
+                return False
+            self.seen_event_ids[event_id] = now
+        self.events.put(QueuedEvent(id=str(uuid.uuid4()), event_id=event_id, body=body))
+        return True
+
+    def dequeue(self, consumer: str, block_ms: int = 1000) -> Optional[QueuedEvent]:
+        try:
+            return self.events.get(timeout=block_ms / 1000)
+        except queue.Empty:
+            return None
+
+    def ack(self, event: QueuedEvent):
+        return
+
+    def nack(self, event: QueuedEvent):
+        if event.attempts >= self.max_attempts:
+            self.logger.error(f"Giving up on event {event.event_id} after {event.attempts} attempts")
+            return
+        self.events.put(event.model_copy(update={"attempts": event.attempts + 1}))
+
+    def depth(self) -> int:
+        return self.events.qsize()
+
+class WorkerPool:
+    def __init__(self, work_queue, handler: Callable[[dict], None], size: int, logger=logging.getLogger(__name__)):
+        self.queue = work_queue
+        self.handler = handler
+        self.size = size
+        self.logger = logger
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def start(self):
+        for idx in range(self.size):
+            consumer = f"{socket.gethostname()}-{os.getpid()}-{idx}"
+            thread = threading.Thread(target=self._work, args=(consumer,), name=f"worker-{idx}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.logger.info(f"Started {self.size} workers")
+
+    def _work(self, consumer: str):
+        while not self.stop_event.is_set():
+            try:
+                event = self.queue.dequeue(consumer)
+            except Exception as e:
+                self.logger.error(f"Dequeue failed: {e}")
+                self.stop_event.wait(1)
+                continue
+            if event is None:
+                continue
+            try:
+                self.handler(event.body)
+                self.queue.ack(event)
+            except Exception as e:
+                self.logger.error(f"Processing event {event.event_id} failed (attempt {event.attempts}): {e}")
+                self.queue.nack(event)
+
+    # Stops taking new events and waits for the events in progress to finish
+    def stop(self, timeout: float = 30):
+        self.logger.info(f"Stopping workers, {self.queue.depth()} events in the backlog")
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout)
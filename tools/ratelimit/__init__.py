@@ -0,0 +1 @@
+from .service import TokenBucket
\ No newline at end of file
@@ -0,0 +1,42 @@
+'''
+A token bucket paces calls against a rate limit: it holds up to a budget of tokens, refilled evenly over the limit's
+period, and a call waits until there are enough tokens for its cost. Used by the Linear transport and the Slack
+scheduler.
+'''
+import time
+from typing import Optional
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_period_seconds: float = 3600):
+        self.capacity = capacity
+        self.refill_period_seconds = refill_period_seconds
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.refill_period_seconds
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    # Seconds until `cost` tokens can be taken without dipping below `reserve`
+    def wait_time(self, cost: float, reserve: float = 0, now: float = None) -> float:
+        self._refill(now or time.monotonic())
+        # never ask for more than the bucket can ever hold, or we'd wait forever
+        needed = min(cost + reserve, self.capacity) - self.tokens
+        if needed <= 0:
+            return 0
+        return needed / self.refill_rate
+
+    def consume(self, cost: float):
+        self.tokens -= cost
+
+    # For APIs that report the authoritative budget on every response, like Linear
+    def sync(self, limit: Optional[float], remaining: Optional[float]):
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.tokens = min(self.capacity, remaining)
+        self.updated_at = time.monotonic()
@@ -1 +1,2 @@
-from .service import SlackClient
\ No newline at end of file
+from .service import SlackClient
+from .directory import UserDirectory
\ No newline at end of file
@@ -0,0 +1,137 @@
+'''
+UserDirectory is a local index of the Slack workspace's users, bulk-loaded with users.list and shared through Redis,
+so user lookups by email are resolved in memory instead of one users.lookupByEmail round trip per candidate email.
+'''
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Optional
+import redis
+from slack_sdk import WebClient
+sys.path.append(os.environ['PROJECT_PATH'])
+from models.report import EmailConfig
+
+DEFAULT_REFRESH_INTERVAL_SECONDS = 6 * 60 * 60
+USERS_PAGE_SIZE = 200
+DIRECTORY_KEY = "taskie:slack:users"
+REFRESHED_AT_KEY = f"{DIRECTORY_KEY}:refreshed_at"
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+class UserDirectory:
+    def __init__(self, client: WebClient, cache: redis.Redis = None, logger=logging.getLogger(__name__),
+                 refresh_interval_seconds: int = DEFAULT_REFRESH_INTERVAL_SECONDS):
+        self.client = client
+        self.cache = cache
+        self.logger = logger
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._users_by_email = None
+        self._loaded_at = 0
+        self._variant_indexes = {}
+        # the error of the last failed fetch, and when it failed
+        self._failure = None
+        self._failed_at = 0
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, loaded_at: float) -> bool:
+        return time.time() - loaded_at < self.refresh_interval_seconds
+
+    def _fetch_users(self) -> dict:
+        users_by_email = {}
+        cursor = None
+        while True:
+            response = self.client.users_list(limit=USERS_PAGE_SIZE, cursor=cursor)
+            for user in response["members"]:
+                email = user.get("profile", {}).get("email")
+                if user.get("deleted") or user.get("is_bot") or not email:
+                    continue
+                users_by_email[normalize_email(email)] = user["id"]
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                break
+        self.logger.info(f"Fetched {len(users_by_email)} Slack users")
+        return users_by_email
+
+    def _read_cache(self) -> Optional[tuple[dict, float]]:
+        if self.cache is None:
+            return None
+        try:
+            refreshed_at = self.cache.get(REFRESHED_AT_KEY)
+            if refreshed_at is None or not self._is_fresh(float(refreshed_at)):
+                return None
+            users = self.cache.hgetall(DIRECTORY_KEY)
+        except redis.RedisError as e:
+            self.logger.warning(f"Reading Slack user directory from Redis failed: {e}")
+            return None
+        return {email.decode(): user_id.decode() for email, user_id in users.items()}, float(refreshed_at)
+
+    def _write_cache(self, users_by_email: dict, refreshed_at: float):
+        if self.cache is None or not users_by_email:
+            return
+        try:
+            pipeline = self.cache.pipeline()
+            pipeline.delete(DIRECTORY_KEY)
+            pipeline.hset(DIRECTORY_KEY, mapping=users_by_email)
+            pipeline.set(REFRESHED_AT_KEY, refreshed_at)
+            pipeline.execute()
+        except redis.RedisError as e:
+            self.logger.warning(f"Writing Slack user directory to Redis failed: {e}")
+
+    # Loads the directory from memory, then Redis, then Slack, whichever is the first to be fresh. A failed fetch, e.g.
+    # when the token lacks users:read, is remembered for the refresh interval and raised again without calling Slack,
+    # so that every lookup in the meantime doesn't wait for another users.list.
+    def load(self, force_refresh: bool = False) -> dict:
+        with self._lock:
+            if not force_refresh and self._users_by_email is not None and self._is_fresh(self._loaded_at):
+                return self._users_by_email
+            cached = None if force_refresh else self._read_cache()
+            if cached is not None:
+                users_by_email, loaded_at = cached
+            else:
+                if not force_refresh and self._failure is not None and self._is_fresh(self._failed_at):
+                    raise self._failure.with_traceback(None)
+                try:
+                    users_by_email, loaded_at = self._fetch_users(), time.time()
+                except Exception as e:
+                    self._failure, self._failed_at = e, time.time()
+                    raise e
+                self._failure = None
+                self._write_cache(users_by_email, loaded_at)
+            self._users_by_email = users_by_email
+            self._loaded_at = loaded_at
+            self._variant_indexes = {}
+            return users_by_email
+
+    # Indexes users in the configured domains by the local part of their email, e.g. "jane" for "jane@acme.com"
+    def _variant_index(self, email_config: EmailConfig) -> dict:
+        index_key = tuple(domain.lower() for domain in email_config.domains)
+        if index_key not in self._variant_indexes:
+            index = {}
+            for email, user_id in self.load().items():
+                user_name, _, domain = email.partition('@')
+                if domain in index_key:
+                    index.setdefault(user_name, user_id)
+            self._variant_indexes[index_key] = index
+        return self._variant_indexes[index_key]
+
+    def get_user_id(self, email: str) -> Optional[str]:
+        return self.load().get(normalize_email(email))
+
+    # Resolves an email to a Slack user id, trying the same domain and suffix variants as EmailConfig describes
+    def resolve(self, email: str, email_config: EmailConfig) -> Optional[str]:
+        user_id = self.get_user_id(email)
+        if user_id:
+            return user_id
+        index = self._variant_index(email_config)
+        user_name = normalize_email(email).split('@')[0]
+        if user_name in index:
+            return index[user_name]
+        for suffix in email_config.suffixes:
+            if user_name.endswith(suffix.lower()):
+                stripped_user_name = user_name[:-len(suffix)]
+                if stripped_user_name in index:
+                    return index[stripped_user_name]
+        return None
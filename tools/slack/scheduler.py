@@ -0,0 +1,109 @@
+'''
+The Slack rate limit scheduler paces Web API calls against Slack's per-method rate limit tiers. Every method has its own
+token bucket, and calls to a method queue behind each other, so a burst of calls to one method never holds up calls to
+another. Messages are also limited per channel. Rate limited calls are retried once Slack's Retry-After has passed, and
+hold back every other call to the same method until then.
+'''
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Callable
+from slack_sdk.errors import SlackApiError
+sys.path.append(os.environ['PROJECT_PATH'])
+from tools.ratelimit import TokenBucket
+
+# Calls per minute allowed by each of Slack's rate limit tiers
+TIER_CALLS_PER_MINUTE = {1: 1, 2: 20, 3: 50, 4: 100}
+# Tiers of the methods we call; see the "Rate limits" section of each method's documentation
+METHOD_TIERS = {
+    "chat.update": 3,
+    "chat.getPermalink": 4,
+    "conversations.info": 3,
+    "conversations.history": 3,
+    "users.list": 2,
+    "users.lookupByEmail": 3,
+}
+DEFAULT_TIER = 3
+# Posting messages is limited per channel instead, to about one a second with short bursts allowed
+MESSAGE_METHODS = ["chat.postMessage"]
+MESSAGE_BURST = 5
+MESSAGE_BURST_SECONDS = 5
+
+MAX_RETRIES = 3
+# Used when a rate limited response doesn't say how long to wait
+DEFAULT_RETRY_AFTER_SECONDS = 30
+
+class MethodQueue:
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        # held by the call waiting for its turn, so that later calls queue behind it
+        self.lock = threading.Lock()
+        self.paused_until = 0
+
+    def wait_time(self) -> float:
+        return max(self.paused_until - time.monotonic(), self.bucket.wait_time(1))
+
+class SlackRateLimitScheduler:
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, logger=logging.getLogger(__name__)):
+        self.logger = logger
+        self.queues = {}
+        self.lock = threading.Lock()
+
+    # Rate limits are per token, so every client using the same token in this process shares one scheduler
+    @classmethod
+    def for_token(cls, token: str, logger=logging.getLogger(__name__)) -> "SlackRateLimitScheduler":
+        with cls._instances_lock:
+            if token not in cls._instances:
+                cls._instances[token] = cls(logger)
+            return cls._instances[token]
+
+    def _queue(self, api_method: str, channel: str = None) -> MethodQueue:
+        key = (api_method, channel) if api_method in MESSAGE_METHODS else api_method
+        with self.lock:
+            if key not in self.queues:
+                if api_method in MESSAGE_METHODS:
+                    bucket = TokenBucket(MESSAGE_BURST, refill_period_seconds=MESSAGE_BURST_SECONDS)
+                else:
+                    bucket = TokenBucket(TIER_CALLS_PER_MINUTE[METHOD_TIERS.get(api_method, DEFAULT_TIER)], refill_period_seconds=60)
+                self.queues[key] = MethodQueue(bucket)
+            return self.queues[key]
+
+    # Waits for the method's turn and budget, then takes a token
+    def _acquire(self, queue: MethodQueue, api_method: str):
+        with queue.lock:
+            waited = 0
+            while (wait := queue.wait_time()) > 0:
+                time.sleep(wait)
+                waited += wait
+            queue.bucket.consume(1)
+        if waited:
+            self.logger.debug(f"Throttled Slack {api_method} call for {waited:.2f}s")
+
+    # Makes the call once the method's rate limit allows it, retrying after Retry-After if Slack rate limits it anyway
+    def call(self, api_method: str, send: Callable, channel: str = None):
+        queue = self._queue(api_method, channel)
+        for attempt in range(MAX_RETRIES + 1):
+            self._acquire(queue, api_method)
+            try:
+                return send()
+            except SlackApiError as e:
+                if e.response.status_code != 429 or attempt == MAX_RETRIES:
+                    raise e
+                retry_after = _retry_after(e.response.headers)
+                with queue.lock:
+                    queue.paused_until = max(queue.paused_until, time.monotonic() + retry_after)
+                self.logger.warning(f"Slack rate limited {api_method}, retrying in {retry_after:.0f}s (attempt {attempt + 1} of {MAX_RETRIES})")
+
+def _retry_after(headers: dict) -> float:
+    for name, value in (headers or {}).items():
+        if name.lower() == "retry-after":
+            try:
+                return float(value)
+            except ValueError:
+                break
+    return DEFAULT_RETRY_AFTER_SECONDS
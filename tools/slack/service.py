@@ -1,28 +1,75 @@
 import os
 import sys
 import logging
-import redis
-from ratelimit import limits, sleep_and_retry
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cached_property
 sys.path.append(os.environ['PROJECT_PATH'])
 from models.slack import Message
 from models.report import EmailConfig
 from slack_sdk import WebClient
+from tools.slack.directory import UserDirectory
+from tools.slack.scheduler import SlackRateLimitScheduler
+from tools.metrics import track
+from tools.cache import redis_client
+
+# Paces every Slack Web API call, including the ones made by the user directory, against the method's rate limit,
+# and times it including any wait
+class InstrumentedWebClient(WebClient):
+    def __init__(self, *args, scheduler: SlackRateLimitScheduler = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler or SlackRateLimitScheduler.for_token(self.token)
+
+    def api_call(self, api_method: str, **kwargs):
+        send = super().api_call
+        channel = (kwargs.get("json") or kwargs.get("params") or {}).get("channel")
+        with track("slack", api_method):
+            return self.scheduler.call(api_method, lambda: send(api_method, **kwargs), channel=channel)
 
 class SlackClient:
     def __init__(self, logger=logging.getLogger(__name__)):
         self.logger = logger
-        self.client = WebClient(token=os.environ["SLACK_BOT_TOKEN"])
-        self.cache = redis.Redis()
+        token = os.environ["SLACK_BOT_TOKEN"]
+        self.client = InstrumentedWebClient(token=token, base_url=os.environ.get("SLACK_API_URL", WebClient.BASE_URL),
+                                            scheduler=SlackRateLimitScheduler.for_token(token, logger))
+        self.cache = redis_client()
+        self.directory = UserDirectory(self.client, cache=self.cache, logger=logger)
+
+    # Replies are sent one at a time, in the order they were queued. Queued replies are still sent when the process
+    # exits, as the executor's thread is joined at exit.
+    @cached_property
+    def reply_queue(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="slack-replies")
     
-    def post_message(self, channel_id: str, message=None, blocks=None):
+    # Returns the timestamp of the posted message, which identifies it for updates
+    def post_message(self, channel_id: str, message=None, blocks=None) -> str:
+        response = None
+        if message:
+            response = self.client.chat_postMessage(channel=channel_id, text=message)
+        elif blocks:
+            response = self.client.chat_postMessage(channel=channel_id, blocks=blocks, mrkdwn=True, link_names=True)
+        return response["ts"] if response else None
+
+    def update_message(self, channel_id: str, message_ts: str, message=None, blocks=None):
         if message:
-            self.client.chat_postMessage(channel=channel_id, text=message)
+            self.client.chat_update(channel=channel_id, ts=message_ts, text=message)
         elif blocks:
-            self.client.chat_postMessage(channel=channel_id, blocks=blocks, mrkdwn=True, link_names=True)
+            self.client.chat_update(channel=channel_id, ts=message_ts, blocks=blocks, link_names=True)
         
     def reply_in_thread(self, channel_id: str, message: str, thread_ts: float):
         print(f"Replying in thread {thread_ts}")
         self.client.chat_postMessage(channel=channel_id, text=message, thread_ts=str(thread_ts))
+
+    # Queues the reply and returns right away, so that the caller never waits on Slack's rate limits.
+    # A reply that fails is logged, and the returned future holds the error.
+    def queue_reply(self, channel_id: str, message: str, thread_ts: float) -> Future:
+        future = self.reply_queue.submit(self.reply_in_thread, channel_id, message, thread_ts)
+        future.add_done_callback(lambda done: self._log_failed_reply(done, thread_ts))
+        return future
+
+    def _log_failed_reply(self, future: Future, thread_ts: float):
+        error = future.exception()
+        if error:
+            self.logger.error(f"Replying in thread {thread_ts} failed: {error}")
     
     def get_channel_by_id(self, channel_id: str):
         response = self.client.conversations_info(channel=channel_id)
@@ -56,6 +103,17 @@ class SlackClient:
             return f"<@{email_config.mappings[email]}>"
         
         user_name = email.split('@')[0]
+        try:
+            user_id = self.directory.resolve(email, email_config)
+        except Exception as e:
+            # e.g. the bot token lacks users:read, fall back to looking candidates up one by one
+            self.logger.warning(f"Slack user directory unavailable: {e}")
+            user_id = self._lookup_user_id(user_name, email_config)
+        if user_id:
+            return f"<@{user_id}>"
+        return user_name
+
+    def _lookup_user_id(self, user_name: str, email_config: EmailConfig) -> str:
         options = []
 
         for domain in email_config.domains:
@@ -71,8 +129,8 @@ class SlackClient:
             try:
                 response = self.client.users_lookupByEmail(email=option)
                 if response["ok"] and response["user"] is not None:
-                    return f"<@{response['user']['id']}>"
+                    return response['user']['id']
             except Exception as e:
                 continue
         
-        return user_name
+        return None
@@ -2,15 +2,51 @@
 Writer is an intelligent service, capable of generating, and re-writing content for various purposes.
 '''
 import os
+import sys
 import openai
-import instructor
 import logging
+import threading
+from contextlib import nullcontext
+from functools import cached_property
+sys.path.append(os.environ['PROJECT_PATH'])
+from tools.cache import ResponseCache
+from tools.metrics import track, record_token_usage
 
 class Writer:
-    def __init__(self, model="gpt-3.5-turbo", logger=logging.getLogger(__name__)):
+    # `limit` is held while calling OpenAI, so that the clients sharing it keep at most its value of calls in flight
+    def __init__(self, model="gpt-3.5-turbo", logger=logging.getLogger(__name__), cache: ResponseCache = None,
+                 limit: threading.Semaphore = None):
         self.model = model
         self.logger = logger
-        self.instructor = instructor.patch(openai.OpenAI(api_key=os.environ['OPENAI_API_KEY']))
+        self.cache = cache
+        self.limit = limit or nullcontext()
+
+    # instructor is slow to import, and only structured outputs need it
+    @cached_property
+    def instructor(self):
+        import instructor
+        return instructor.patch(openai.OpenAI(api_key=os.environ['OPENAI_API_KEY']))
+
+    # Returns the completion for the given messages, from the response cache when possible
+    def _complete(self, messages: list[dict], temperature: float, operation: str) -> str:
+        cache_key = None
+        if self.cache:
+            cache_key = ResponseCache.key(self.model, messages, temperature)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        with self.limit, track("openai", operation):
+            response = openai.chat.completions.create(
+                model = self.model,
+                messages = messages,
+                temperature=temperature
+            )
+        record_token_usage(self.model, response.usage)
+        self.logger.debug(f"Response: {response}")
+        content = response.choices[0].message.content
+        if cache_key:
+            self.cache.set(cache_key, content)
+        return content
 
     def summarize(self, context: str, word_limit: int, input: str) -> str:
         system_instruction = f'''
@@ -30,13 +66,7 @@ with you into a concise, coherent, and comprehensive output within the given wor
             {"role": "system", "content": system_instruction},
             {"role": "user", "content": input}]
         self.logger.debug(f"Messages: {messages}")
-        response = openai.chat.completions.create(
-            model = self.model,
-            messages = messages,
-            temperature=0
-        )
-        self.logger.debug(f"Response: {response}")
-        return response.choices[0].message.content
+        return self._complete(messages, temperature=0, operation="summarize")
     
     def parse(self, context: str, input: str, output_model):
         system_instruction = f'''
@@ -52,10 +82,23 @@ output in the provided format based on the context given.
             {"role": "system", "content": system_instruction},
             {"role": "user", "content": input}]
         
-        output = self.instructor.chat.completions.create(
-            model=self.model,
-            temperature=0,
-            messages=messages,
-            response_model=output_model
-        )
+        # the response schema is part of the key, so changing the output model invalidates earlier responses
+        cache_key = None
+        if self.cache:
+            cache_key = ResponseCache.key(self.model, messages, 0, schema=output_model.model_json_schema())
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return output_model.model_validate_json(cached)
+        with self.limit, track("openai", "parse"):
+            output = self.instructor.chat.completions.create(
+                model=self.model,
+                temperature=0,
+                messages=messages,
+                response_model=output_model
+            )
+        # instructor keeps the raw completion, with its usage, on the parsed output
+        raw_response = getattr(output, "_raw_response", None)
+        record_token_usage(self.model, getattr(raw_response, "usage", None))
+        if cache_key:
+            self.cache.set(cache_key, output.model_dump_json(by_alias=True))
         return output
\ No newline at end of file
@@ -0,0 +1,40 @@
+'''
+This script sends a signed, Linear-style project update webhook to a locally running webhook trigger, for testing.
+It signs with LINEAR_WEBHOOK_SECRET, which must match the trigger's. Without a secret, the trigger has to run with
+LINEAR_WEBHOOK_ALLOW_UNSIGNED=1.
+Usage: python3 fake_webhook.py <project_id> [<project_update_id>]
+'''
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import hashlib
+import requests
+
+WEBHOOK_URL = os.environ.get("LINEAR_WEBHOOK_URL", f"http://localhost:{os.environ.get('LINEAR_WEBHOOK_PORT', 3001)}/webhooks/linear")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 fake_webhook.py <project_id> [<project_update_id>]")
+        sys.exit(1)
+    project_id = sys.argv[1]
+    payload = {
+        "action": "create",
+        "type": "ProjectUpdate",
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        "webhookTimestamp": int(time.time() * 1000),
+        "data": {
+            "id": sys.argv[2] if len(sys.argv) > 2 else str(uuid.uuid4()),
+            "projectId": project_id,
+            "body": "Fake project update sent for testing.",
+        },
+    }
+    body = json.dumps(payload).encode()
+    headers = {"Content-Type": "application/json"}
+    secret = os.environ.get("LINEAR_WEBHOOK_SECRET")
+    if secret:
+        headers["Linear-Signature"] = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    response = requests.post(WEBHOOK_URL, data=body, headers=headers)
+    print(f"Webhook delivered: {response.status_code}")
@@ -0,0 +1,126 @@
+'''
+This script receives Linear webhooks for project updates, and precomputes the project's status and risk as soon as an
+update is posted, so that the report only has to read the stored results. It precomputes for every report config whose
+scope covers the project.
+Usage: python3 webhook.py [<config path> ...], relative to the project path, config/report.yaml by default
+'''
+import os
+import sys
+import hmac
+import json
+import time
+import queue
+import hashlib
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.environ['PROJECT_PATH'])
+from tasks.report import Reporter, SharedClients, load_config, DEFAULT_CONFIG_PATH
+
+WEBHOOK_PATH = "/webhooks/linear"
+# Linear signs every delivery; deliveries older than this are rejected as replays
+MAX_WEBHOOK_AGE_SECONDS = 60
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Without a secret nothing can be verified, so every delivery is rejected
+def is_valid_signature(body: bytes, signature: str, secret: str) -> bool:
+    if not secret:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or "")
+
+def get_project_id(payload: dict) -> str:
+    data = payload.get("data", {})
+    return data.get("projectId") or data.get("project", {}).get("id")
+
+class ProjectUpdateWorker(threading.Thread):
+    def __init__(self, reporters: list[Reporter]):
+        super().__init__(daemon=True)
+        self.reporters = reporters
+        self.project_ids = queue.Queue()
+
+    def run(self):
+        while True:
+            project_id = self.project_ids.get()
+            try:
+                self.precompute(project_id)
+            finally:
+                self.project_ids.task_done()
+
+    # Fetches the project once for every config. The configs share the stored analyses, so the first config covering
+    # the project analyses it, and the others reuse that analysis.
+    def precompute(self, project_id: str):
+        try:
+            project = self.reporters[0].linear.get_project_by_id(project_id)
+        except Exception as e:
+            logger.error(f"Fetching project {project_id} for precomputation failed: {e}")
+            return
+        for reporter in self.reporters:
+            try:
+                reporter.precompute_project(project_id, project=project)
+            except Exception as e:
+                reporter.logger.error(f"Precomputation failed for project {project_id}: {e}")
+
+# With allow_unsigned, deliveries are accepted without a signature, for local testing with fake_webhook.py only
+def make_handler(worker: ProjectUpdateWorker, secret: str, allow_unsigned: bool = False):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != WEBHOOK_PATH:
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not allow_unsigned and not is_valid_signature(body, self.headers.get("Linear-Signature"), secret):
+                logger.warning("Rejecting webhook with invalid signature")
+                self.send_response(401)
+                self.end_headers()
+                return
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                payload = None
+            if not isinstance(payload, dict):
+                logger.warning("Rejecting webhook with a malformed body")
+                self.send_response(400)
+                self.end_headers()
+                return
+            webhook_timestamp = payload.get("webhookTimestamp")
+            if webhook_timestamp and abs(time.time() - webhook_timestamp / 1000) > MAX_WEBHOOK_AGE_SECONDS:
+                logger.warning("Rejecting stale webhook")
+                self.send_response(401)
+                self.end_headers()
+                return
+            # respond right away, the analysis runs on the worker
+            self.send_response(200)
+            self.end_headers()
+            if payload.get("type") == "ProjectUpdate" and payload.get("action") in ["create", "update"]:
+                project_id = get_project_id(payload)
+                if project_id:
+                    logger.info(f"Queueing precomputation for project {project_id}")
+                    worker.project_ids.put(project_id)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return WebhookHandler
+
+if __name__ == "__main__":
+    secret = os.environ.get("LINEAR_WEBHOOK_SECRET")
+    # only for local testing, as anyone who can reach the server could then trigger Linear fetches and LLM calls
+    allow_unsigned = os.environ.get("LINEAR_WEBHOOK_ALLOW_UNSIGNED") == "1"
+    if not secret and not allow_unsigned:
+        logger.error("LINEAR_WEBHOOK_SECRET is not set, refusing to start. Set LINEAR_WEBHOOK_ALLOW_UNSIGNED=1 to test locally without one.")
+        sys.exit(1)
+    if allow_unsigned:
+        logger.warning("Accepting unsigned webhooks, for local testing only")
+    configs = {os.path.splitext(path)[0]: load_config(path) for path in sys.argv[1:] or [DEFAULT_CONFIG_PATH]}
+    shared = SharedClients(logger, llm_concurrency=min([config.llm_concurrency for config in configs.values()]))
+    reporters = [Reporter(logger=logger.getChild(config_name), config=config, shared=shared) for config_name, config in configs.items()]
+    worker = ProjectUpdateWorker(reporters)
+    worker.start()
+    server = ThreadingHTTPServer(("", int(os.environ.get("LINEAR_WEBHOOK_PORT", 3001))),
+                                 make_handler(worker, secret, allow_unsigned))
+    logger.info(f"Listening for Linear webhooks on {server.server_address}")
+    server.serve_forever()
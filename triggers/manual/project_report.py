@@ -2,7 +2,6 @@ import sys
 import os
 import logging
 sys.path.append(os.environ['PROJECT_PATH'])
-from tasks.report import Reporter
 from models.report import ReminderType
 
 def send_reminder():
@@ -16,16 +15,32 @@ console_handler = logging.StreamHandler()
 console_handler.setLevel(logging.DEBUG)
 logger.addHandler(console_handler)
 
-reporter = Reporter(logger=logger)
+# Every subcommand takes the report configs to run for, relative to the project path, config/report.yaml by default.
+# Several configs run concurrently in this process. The reporter is imported once a valid subcommand is given, so
+# that usage errors return right away.
+def run_for_configs(task, config_paths: list[str]):
+    from tasks.report import run_reports, load_config, DEFAULT_CONFIG_PATH
+    config_paths = config_paths or [DEFAULT_CONFIG_PATH]
+    configs = {os.path.splitext(path)[0]: load_config(path) for path in config_paths}
+    runs = run_reports(configs, task, logger=logger)
+    if any(run.error for run in runs):
+        sys.exit(1)
+
+USAGE = "Please use 'trigger-report', 'send-update-reminder', 'send-planning-reminder', 'resume-report <run id>' or 'repost-report <run id>'."
 
 if len(sys.argv) > 1:
     if sys.argv[1] == "trigger-report":
-        reporter.trigger_report()
+        run_for_configs(lambda reporter: reporter.trigger_report(), sys.argv[2:])
     elif sys.argv[1] == "send-update-reminder":
-        reporter.send_reminder(type=ReminderType.UPDATE)
+        run_for_configs(lambda reporter: reporter.send_reminder(type=ReminderType.UPDATE), sys.argv[2:])
     elif sys.argv[1] == "send-planning-reminder":
-        reporter.send_reminder(type=ReminderType.PLANNING)
+        run_for_configs(lambda reporter: reporter.send_reminder(type=ReminderType.PLANNING), sys.argv[2:])
+    # a run is resumed, or its report posted again, with the config it ran with
+    elif sys.argv[1] == "resume-report" and len(sys.argv) in [3, 4]:
+        run_for_configs(lambda reporter: reporter.trigger_report(run_id=sys.argv[2]), sys.argv[3:])
+    elif sys.argv[1] == "repost-report" and len(sys.argv) in [3, 4]:
+        run_for_configs(lambda reporter: reporter.repost_report(run_id=sys.argv[2]), sys.argv[3:])
     else:
-        print("Invalid argument. Please use 'trigger-report' or 'send-reminder'.")
+        print(f"Invalid argument. {USAGE}")
 else:
-    print("No argument provided. Please specify 'trigger-report' or 'send-reminder'.")
+    print(f"No argument provided. {USAGE}")
@@ -1,10 +1,19 @@
 import os
 import sys
+import signal
+import threading
 import slack_bolt
 import logging
 sys.path.append(os.environ['PROJECT_PATH'])
 from tasks.ticket import Ticketer
 from models.slack import Message
+from models.ticket import QueueBackend
+from tools.queue import RedisStreamQueue, LocalQueue, WorkerPool
+from tools.cache import redis_client
+from tools.metrics import record_event, start_metrics_server, EVENT_BACKLOG
+
+EVENT_STREAM = "taskie:slack:events"
+BACKLOG_LOG_INTERVAL_SECONDS = 60
 
 app = slack_bolt.App(
     token=os.environ["SLACK_BOT_TOKEN"],
@@ -15,23 +24,66 @@ logger = logging.getLogger(__name__)
 
 ticketer = Ticketer(logger=logger)
 
+if ticketer.config.queue_backend == QueueBackend.REDIS:
+    event_queue = RedisStreamQueue(redis_client(), EVENT_STREAM, group="ticketers", logger=logger)
+else:
+    event_queue = LocalQueue(logger=logger)
+
+# The Bolt handler only filters and enqueues, so Slack gets its ack well within 3 seconds
 @app.event("message")
-def handle_message_events(body):
+def handle_message_events(body, request):
     logger.info("Handling message event")
     logger.debug(f"Event: {body}")
-    
+
     event_subtype = None
     if "subtype" in body["event"]:
         event_subtype = body["event"]["subtype"]
     if event_subtype and event_subtype in ["bot_message", "message_changed","message_deleted"]:
+        record_event("filtered")
         return
-    
+
     event = body["event"]
     message = Message.get_message_from_event(event)
-    if ticketer.is_relevant(message):
-        logger.info("Message is relevant")
-        ticketer.trigger_ticket_creation(message)
+    if not ticketer.is_relevant(message):
+        record_event("filtered")
+        return
+    retry_num = request.headers.get("x-slack-retry-num", [None])[0]
+    if not event_queue.enqueue(body["event_id"], body):
+        logger.info(f"Dropping duplicate delivery of event {body['event_id']} (retry {retry_num})")
+        record_event("duplicate")
+        return
+    record_event("accepted")
+    logger.info(f"Queued relevant message, backlog: {event_queue.depth()}")
     return
 
+def process_event(body: dict):
+    message = Message.get_message_from_event(body["event"])
+    try:
+        ticketer.trigger_ticket_creation(message, event_id=body["event_id"])
+    except Exception as e:
+        record_event("failed")
+        raise e
+
+def log_backlog(stop_event: threading.Event):
+    while not stop_event.wait(BACKLOG_LOG_INTERVAL_SECONDS):
+        backlog = event_queue.depth()
+        EVENT_BACKLOG.set(backlog)
+        logger.info(f"Event backlog: {backlog}")
+
+def handle_shutdown(signum, frame):
+    raise SystemExit(0)
+
 if __name__ == "__main__":
-    app.start(port=int(os.environ.get("PORT", 3000)))
\ No newline at end of file
+    start_metrics_server(int(os.environ.get("METRICS_PORT", 9464)), logger=logger)
+    try:
+        ticketer.prefetch_metadata()
+    except Exception as e:
+        logger.warning(f"Prefetching Linear metadata failed, it's loaded on first use instead: {e}")
+    workers = WorkerPool(event_queue, process_event, size=ticketer.config.worker_count, logger=logger)
+    workers.start()
+    threading.Thread(target=log_backlog, args=(workers.stop_event,), daemon=True).start()
+    signal.signal(signal.SIGTERM, handle_shutdown)
+    try:
+        app.start(port=int(os.environ.get("PORT", 3000)))
+    finally:
+        workers.stop()